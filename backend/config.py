@@ -27,6 +27,35 @@ class Settings:
     symbol: str = os.getenv("TS_SYMBOL", "1579")
     exchange: int = int(os.getenv("TS_EXCHANGE", "1"))
     sleep_interval: float = float(os.getenv("TS_SLEEP_INTERVAL", "0.3"))
+    # runner loop: seconds of work per iteration before it counts as an overrun
+    loop_budget: float = float(os.getenv("TS_LOOP_BUDGET", "0.3"))
+    price_feed: str = os.getenv("TS_PRICE_FEED", "push")  # push | poll
+    push_timeout: float = float(os.getenv("TS_PUSH_TIMEOUT", "1.0"))
+    http_pool_size: int = int(os.getenv("TS_HTTP_POOL_SIZE", "8"))
+    http_connect_timeout: float = float(os.getenv("TS_HTTP_CONNECT_TIMEOUT", "2.0"))
+    http_read_timeout: float = float(os.getenv("TS_HTTP_READ_TIMEOUT", "10.0"))
+    api_concurrency: int = int(os.getenv("TS_API_CONCURRENCY", "8"))
+    api_rate: float = float(os.getenv("TS_API_RATE", "10"))
+    api_burst: int = int(os.getenv("TS_API_BURST", "10"))
+    # shared /board cache: max age (seconds) each consumer accepts
+    board_ttl_runner: float = float(os.getenv("TS_BOARD_TTL_RUNNER", "0.1"))
+    board_ttl_ui: float = float(os.getenv("TS_BOARD_TTL_UI", "1.0"))
+    board_ttl_indices: float = float(os.getenv("TS_BOARD_TTL_INDICES", "5.0"))
+    board_ttl_watchlist: float = float(os.getenv("TS_BOARD_TTL_WATCHLIST", "10.0"))
+    # per-symbol, per-day binary tick files (empty TS_TICK_DIR disables recording)
+    tick_dir: str = os.getenv("TS_TICK_DIR", str(Path(__file__).resolve().parent / "ticks"))
+    # previous-session H/L/C and pivot levels cached per symbol and day
+    reference_dir: str = os.getenv("TS_REFERENCE_DIR", str(Path(__file__).resolve().parent / "reference"))
+    # order lifecycle tracking by OrderId: /orders poll interval while orders are live, fill wait limit
+    order_poll_interval: float = float(os.getenv("TS_ORDER_POLL_INTERVAL", "0.1"))
+    order_fill_timeout: float = float(os.getenv("TS_ORDER_FILL_TIMEOUT", "10"))
+    entry_mode: str = os.getenv("TS_ENTRY_MODE", "parallel")  # parallel | sequential
+    # P&L snapshots: heartbeat when nothing changes, raw/1-minute retention (0 keeps forever)
+    pl_snapshot_heartbeat: float = float(os.getenv("TS_PL_HEARTBEAT", "300"))
+    pl_raw_retention_days: int = int(os.getenv("TS_PL_RAW_RETENTION_DAYS", "7"))
+    pl_minute_retention_days: int = int(os.getenv("TS_PL_MINUTE_RETENTION_DAYS", "90"))
+    # dashboard API: gzip responses of at least this many bytes (0 disables)
+    gzip_min_size: int = int(os.getenv("TS_GZIP_MIN_SIZE", "1024"))
     force_close_time: str = os.getenv("TS_FORCE_CLOSE_TIME", "14:55")
     max_daily_loss: float = float(os.getenv("TS_MAX_DAILY_LOSS", "1.0"))
 
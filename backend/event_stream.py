@@ -0,0 +1,216 @@
+import asyncio
+import inspect
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+SSE_HEARTBEAT = 15.0  # seconds between keep-alive comments on an idle stream
+
+
+class Subscription:
+    """One connected client. Wake-ups are coalesced: however many topics change
+    while the client is busy, it is woken once and then reads the latest values."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.versions: Dict[str, int] = {}
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def notify(self) -> None:
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._pending = False
+            self.event.clear()
+        return True
+
+
+class EventHub:
+    """Latest value per topic, shared by every connected UI.
+
+    publish() serialises the payload once and drops it if it is identical to
+    the current value, so clients only hear about real changes and the cost of
+    a change does not depend on how many tabs are open. Append-only sources
+    (logs) use touch() and are read incrementally by each subscriber.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics: Dict[str, Tuple[int, str]] = {}
+        self._subscribers: List[Subscription] = []
+        self._version = 0
+        self._on_first: List[Callable[[], None]] = []
+        self.published = 0
+        self.suppressed = 0
+
+    def on_first_subscriber(self, callback: Callable[[], None]) -> None:
+        self._on_first.append(callback)
+
+    def publish(self, topic: str, data: Any) -> bool:
+        payload = json.dumps(data, default=str, ensure_ascii=False)
+        with self._lock:
+            current = self._topics.get(topic)
+            if current is not None and current[1] == payload:
+                self.suppressed += 1
+                return False
+            self._version += 1
+            self._topics[topic] = (self._version, payload)
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.notify()
+        return True
+
+    def touch(self, topic: str) -> None:
+        """Mark an append-only topic as changed without storing a payload."""
+        with self._lock:
+            self._version += 1
+            self._topics[topic] = (self._version, "")
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.notify()
+
+    def changed_since(self, versions: Dict[str, int]) -> List[Tuple[str, int, str]]:
+        with self._lock:
+            return [
+                (topic, version, payload)
+                for topic, (version, payload) in sorted(self._topics.items(), key=lambda item: item[1][0])
+                if versions.get(topic, 0) < version
+            ]
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        sub = Subscription(loop or asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(sub)
+            first = len(self._subscribers) == 1
+        if first:
+            for callback in self._on_first:
+                callback()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "topics": len(self._topics),
+                "published": self.published,
+                "suppressed": self.suppressed,
+            }
+
+
+def format_sse(event: str, data: str, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(hub: EventHub, log_reader: Optional[Callable[[int], Tuple[int, List[str]]]] = None,
+                     heartbeat: float = SSE_HEARTBEAT, is_disconnected=None) -> AsyncIterator[str]:
+    """Yield SSE frames for one client: every current topic first, then changes.
+
+    log_reader(seq) returns (new_seq, lines appended after seq); the "logs"
+    topic is sent as those new lines only.
+    """
+    sub = hub.subscribe()
+    log_seq = 0
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            for topic, version, payload in hub.changed_since(sub.versions):
+                sub.versions[topic] = version
+                if topic == "logs":
+                    if log_reader is None:
+                        continue
+                    new_seq, lines = log_reader(log_seq)
+                    if not lines:
+                        continue
+                    payload = json.dumps({"reset": log_seq == 0, "lines": lines}, ensure_ascii=False)
+                    log_seq = new_seq
+                yield format_sse(topic, payload, version)
+            if not await sub.wait(heartbeat):
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield ": ping\n\n"
+    finally:
+        hub.unsubscribe(sub)
+
+
+class StreamSource:
+    def __init__(self, topic: str, interval: float, fetch: Callable[[], Any]):
+        self.topic = topic
+        self.interval = interval
+        self.fetch = fetch
+
+
+class StreamPublisher:
+    """Refreshes each source on its own interval while anyone is subscribed.
+
+    There is one refresh loop per source per process, not per browser tab;
+    sync fetchers run in a worker thread, async ones on the event loop. A
+    fetch error keeps the previous value. Fetchers that return None publish
+    nothing.
+    """
+
+    def __init__(self, hub: EventHub, logger: Optional[logging.Logger] = None):
+        self.hub = hub
+        self.logger = logger or logging.getLogger(__name__)
+        self.sources: List[StreamSource] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+        hub.on_first_subscriber(self._start)
+
+    def add(self, topic: str, interval: float, fetch: Callable[[], Any]) -> None:
+        self.sources.append(StreamSource(topic, interval, fetch))
+
+    async def refresh(self, source: StreamSource) -> None:
+        try:
+            if inspect.iscoroutinefunction(source.fetch):
+                data = await source.fetch()
+            else:
+                data = await asyncio.to_thread(source.fetch)
+        except Exception:
+            self.logger.debug("stream source %s failed", source.topic, exc_info=True)
+            return
+        if data is not None:
+            self.hub.publish(source.topic, data)
+
+    async def _loop(self, source: StreamSource) -> None:
+        try:
+            while self.hub.subscriber_count():
+                await self.refresh(source)
+                await asyncio.sleep(source.interval)
+        finally:
+            self._tasks.pop(source.topic, None)
+
+    def _start(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for source in self.sources:
+            task = self._tasks.get(source.topic)
+            if task is None or task.done():
+                self._tasks[source.topic] = loop.create_task(self._loop(source))
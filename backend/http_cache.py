@@ -0,0 +1,72 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Iterable, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+Version = Tuple[str, float]  # (tag, last-modified epoch seconds)
+
+
+def _etag(tag: str) -> str:
+    # weak: the same representation may be sent gzipped or not
+    return f'W/"{tag}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """RFC 9110 evaluation order: If-None-Match wins, If-Modified-Since is the fallback."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since
+    return False
+
+
+def conditional_json(request: Request, version: Version, build: Callable[[], Any]) -> Response:
+    """JSON response with ETag/Last-Modified, or an empty 304 if the client is current.
+
+    build() is only called when the body is actually sent, so a matching
+    poll costs no query and no serialization.
+    """
+    tag, last_modified = version
+    etag = _etag(tag)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(build()), headers=headers)
+
+
+class CompressionMiddleware:
+    """GZipMiddleware for everything except paths that stream (gzip would hold back SSE frames)."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 6,
+                 exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(self.exclude_paths):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
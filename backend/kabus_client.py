@@ -1,15 +1,27 @@
+import asyncio
+import sys
 import time
-import requests
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from kabus_transport import transport
+from board_cache import BoardCache
+from rate_limiter import ORDER, UI, RateLimited
+
 try:
     from .config import Settings
 except ImportError:
     from config import Settings
 
 class KabuClient:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, board_cache: Optional[BoardCache] = None, priority: int = UI):
         self.settings = settings
+        self.board_cache = board_cache
+        self.priority = priority
         self._token: Optional[str] = None
         self._token_ts: float = 0.0
 
@@ -17,7 +29,7 @@ class KabuClient:
         if self._token:
             return self._token
         url = f"{self.settings.api_base_url}/token"
-        resp = requests.post(url, json={"APIPassword": self.settings.api_password})
+        resp = transport.request("POST", url, json={"APIPassword": self.settings.api_password}, priority=ORDER)
         resp.raise_for_status()
         token = resp.json().get("Token")
         if not token:
@@ -29,14 +41,12 @@ class KabuClient:
     def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None):
         token = self._get_token()
         url = f"{self.settings.api_base_url}{path}"
-        headers = {"X-API-KEY": token}
-        resp = requests.request(method, url, params=params, headers=headers)
+        resp = transport.request(method, url, token=token, params=params, priority=self.priority)
         if resp.status_code == 401:
             # refresh token once
             self._token = None
             token = self._get_token()
-            headers["X-API-KEY"] = token
-            resp = requests.request(method, url, params=params, headers=headers)
+            resp = transport.request(method, url, token=token, params=params, priority=self.priority)
         resp.raise_for_status()
         return resp.json()
 
@@ -63,8 +73,57 @@ class KabuClient:
     def symbol_info(self, symbol: str, exchange: int = 1) -> Dict[str, Any]:
         return self._request("GET", f"/symbol/{symbol}@{exchange}")
 
-    def board(self, symbol: str, exchange: int = 1) -> Dict[str, Any]:
-        return self._request("GET", f"/board/{symbol}@{exchange}")
+    def board(self, symbol: str, exchange: int = 1, max_age: float = 0.0) -> Dict[str, Any]:
+        if self.board_cache is None:
+            return self._request("GET", f"/board/{symbol}@{exchange}")
+        return self.board_cache.get(
+            symbol, exchange,
+            lambda: self._request("GET", f"/board/{symbol}@{exchange}"),
+            max_age=max_age,
+            stale_on=(RateLimited,),
+        )
 
     def exchange_rate(self, symbol: str = "USD/JPY") -> Dict[str, Any]:
         return self._request("GET", f"/exchange/{symbol}")
+
+
+class AsyncKabuClient:
+    """Async facade over KabuClient for fanning out independent requests.
+
+    Each call runs the blocking KabuClient method on a worker thread so it
+    shares the pooled transport and token; a semaphore bounds how many
+    upstream requests are in flight at once.
+    """
+
+    def __init__(self, client: KabuClient, concurrency: int = 8):
+        self.client = client
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _call(self, fn, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def gather(self, *calls) -> List[Any]:
+        """Await calls concurrently; failed calls yield their exception instead of raising."""
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    async def wallet_cash(self) -> Dict[str, Any]:
+        return await self._call(self.client.wallet_cash)
+
+    async def wallet_margin(self) -> Dict[str, Any]:
+        return await self._call(self.client.wallet_margin)
+
+    async def positions(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._call(self.client.positions, symbol)
+
+    async def orders(self, symbol: Optional[str] = None, details: bool = False) -> List[Dict[str, Any]]:
+        return await self._call(self.client.orders, symbol, details)
+
+    async def symbol_info(self, symbol: str, exchange: int = 1) -> Dict[str, Any]:
+        return await self._call(self.client.symbol_info, symbol, exchange)
+
+    async def board(self, symbol: str, exchange: int = 1, max_age: float = 0.0) -> Dict[str, Any]:
+        return await self._call(self.client.board, symbol, exchange, max_age)
+
+    async def exchange_rate(self, symbol: str = "USD/JPY") -> Dict[str, Any]:
+        return await self._call(self.client.exchange_rate, symbol)
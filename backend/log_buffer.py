@@ -1,6 +1,8 @@
 import logging
 import threading
+import time
 from collections import deque
+from typing import Callable, List, Optional, Tuple
 
 class MemoryLogHandler(logging.Handler):
     def __init__(self, capacity: int = 500):
@@ -8,11 +10,31 @@ class MemoryLogHandler(logging.Handler):
         self.capacity = capacity
         self._lock = threading.Lock()
         self._records = deque(maxlen=capacity)
+        self._seq = 0  # number of records ever emitted
+        self._epoch = int(time.time() * 1000)
+        self._modified = time.time()
+        self.on_emit: Optional[Callable[[], None]] = None
 
     def emit(self, record: logging.LogRecord) -> None:
         msg = self.format(record)
         with self._lock:
             self._records.append(msg)
+            self._seq += 1
+            self._modified = time.time()
+        if self.on_emit is not None:
+            self.on_emit()
+
+    def get_logs_since(self, seq: int, limit: int = 200) -> Tuple[int, List[str]]:
+        """Records emitted after seq (at most limit, newest kept) and the new seq."""
+        with self._lock:
+            new = min(self._seq - seq, len(self._records), limit)
+            records = list(self._records)[-new:] if new > 0 else []
+            return self._seq, records
+
+    def version(self) -> Tuple[str, float]:
+        """Tag and time of the last emitted record, for HTTP validators."""
+        with self._lock:
+            return f"{self._epoch:x}-{self._seq}", self._modified
 
     def get_logs(self, limit: int = 200):
         with self._lock:
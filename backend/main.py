@@ -5,9 +5,9 @@ from pathlib import Path
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
@@ -15,16 +15,25 @@ try:
     from .config import settings
     from .log_buffer import MemoryLogHandler
     from .runner import TradingRunner
-    from .kabus_client import KabuClient
+    from .kabus_client import KabuClient, AsyncKabuClient
     from .notifier import GmailNotifier
-    from .trade_history import init_db, record_pl_snapshot, get_orders as get_trade_orders, get_daily_pl, get_pl_timeline, get_trade_stats, get_trades, get_trade_summary, get_margin_daily, import_trades_from_api
+    from .event_stream import EventHub, StreamPublisher, sse_stream
+    from .http_cache import CompressionMiddleware, conditional_json
+    from .trade_history import data_version, init_db, record_pl_snapshot, PlChangeFilter, maintain_pl_history, get_orders as get_trade_orders, get_daily_pl, get_pl_timeline, get_trade_stats, get_trades, get_trade_summary, get_margin_daily, import_trades_from_api
 except ImportError:
     from config import settings
     from log_buffer import MemoryLogHandler
     from runner import TradingRunner
-    from kabus_client import KabuClient
+    from kabus_client import KabuClient, AsyncKabuClient
     from notifier import GmailNotifier
-    from trade_history import init_db, record_pl_snapshot, get_orders as get_trade_orders, get_daily_pl, get_pl_timeline, get_trade_stats, get_trades, get_trade_summary, get_margin_daily, import_trades_from_api
+    from event_stream import EventHub, StreamPublisher, sse_stream
+    from http_cache import CompressionMiddleware, conditional_json
+    from trade_history import data_version, init_db, record_pl_snapshot, PlChangeFilter, maintain_pl_history, get_orders as get_trade_orders, get_daily_pl, get_pl_timeline, get_trade_stats, get_trades, get_trade_summary, get_margin_daily, import_trades_from_api
+
+from kabus_transport import transport
+from board_cache import board_cache
+from rate_limiter import limiter
+from latency_metrics import metrics
 
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
@@ -43,18 +52,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.gzip_min_size > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.gzip_min_size, exclude_paths=("/api/stream",))
 
-client = KabuClient(settings)
+transport.configure(
+    pool_maxsize=settings.http_pool_size,
+    timeout=(settings.http_connect_timeout, settings.http_read_timeout),
+)
+limiter.configure(rate=settings.api_rate, burst=settings.api_burst)
+client = KabuClient(settings, board_cache=board_cache)
+aclient = AsyncKabuClient(client, concurrency=settings.api_concurrency)
 runner = TradingRunner(settings, logger, kabu_client=client)
 
 # Initialize trade history DB
 init_db()
 
 # Periodic P&L snapshot recorder (always active during market hours)
+PL_ROLLUP_INTERVAL = 300  # seconds between rollup/retention passes
+_pl_filter = PlChangeFilter(heartbeat=settings.pl_snapshot_heartbeat)
+
 def _pl_snapshot_loop():
     import time as _time
+    last_rollup = 0.0
     while True:
         _time.sleep(30)  # every 30 seconds
+        if _time.monotonic() - last_rollup >= PL_ROLLUP_INTERVAL:
+            last_rollup = _time.monotonic()
+            try:
+                maintain_pl_history(settings.pl_raw_retention_days, settings.pl_minute_retention_days)
+            except Exception:
+                logger.exception("P&L rollup failed")
         try:
             now = dt.datetime.now(ZoneInfo("Asia/Tokyo"))
             hour = now.hour
@@ -75,7 +102,9 @@ def _pl_snapshot_loop():
                 margin = wm.get("MarginAccountWallet")
             except Exception:
                 margin = None
-            record_pl_snapshot(symbol, pl_total, cash, margin, len(positions))
+            # only when something moved, or on the heartbeat
+            if _pl_filter.changed(symbol, pl_total, cash, margin, len(positions)):
+                record_pl_snapshot(symbol, pl_total, cash, margin, len(positions))
         except Exception:
             pass
 
@@ -120,11 +149,24 @@ def health():
 def status():
     state = runner.get_state()
     state["positions"] = runner.get_positions()
+    state["board_cache"] = board_cache.stats()
+    state["rate_limiter"] = limiter.stats()
+    state["loop_timing"] = runner.get_loop_stats()
     return state
 
+@app.get("/api/metrics")
+def api_metrics(request: Request, format: Optional[str] = None):
+    # Prometheus scrapers ask for text/plain; everything else gets JSON
+    wants_text = format == "prometheus" or (
+        format is None and "text/plain" in request.headers.get("accept", "")
+    )
+    if wants_text:
+        return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics.stats()
+
 @app.get("/api/logs")
-def logs(limit: int = 200):
-    return {"logs": mem_handler.get_logs(limit=limit)}
+def logs(request: Request, limit: int = 200):
+    return conditional_json(request, mem_handler.version(), lambda: {"logs": mem_handler.get_logs(limit=limit)})
 
 @app.post("/api/start")
 def start():
@@ -231,24 +273,28 @@ def update_secrets(payload: SecretsUpdate):
     return {"ok": True, "updated": updated, "saved": payload.save}
 
 @app.get("/api/indices")
-def indices():
+async def indices():
     codes = [("101", "日経平均"), ("151", "TOPIX")]
+    *boards, fx = await aclient.gather(
+        *(aclient.board(code, max_age=settings.board_ttl_indices) for code, _ in codes),
+        aclient.exchange_rate("USD/JPY"),
+    )
     results = []
-    for code, name in codes:
-        try:
-            data = client.board(code)
-            results.append({
-                "code": code,
-                "name": name,
-                "price": data.get("CurrentPrice"),
-                "change": data.get("ChangePreviousClose"),
-                "change_pct": data.get("ChangePreviousClosePer"),
-            })
-        except Exception:
+    for (code, name), data in zip(codes, boards):
+        if isinstance(data, Exception):
             results.append({"code": code, "name": name, "price": None, "change": None, "change_pct": None})
+            continue
+        results.append({
+            "code": code,
+            "name": name,
+            "price": data.get("CurrentPrice"),
+            "change": data.get("ChangePreviousClose"),
+            "change_pct": data.get("ChangePreviousClosePer"),
+        })
     # USD/JPY
-    try:
-        fx = client.exchange_rate("USD/JPY")
+    if isinstance(fx, Exception):
+        results.append({"code": "FX", "name": "USD/JPY", "price": None, "change": None, "change_pct": None})
+    else:
         results.append({
             "code": "FX",
             "name": "USD/JPY",
@@ -256,8 +302,6 @@ def indices():
             "change": fx.get("Change"),
             "change_pct": None,
         })
-    except Exception:
-        results.append({"code": "FX", "name": "USD/JPY", "price": None, "change": None, "change_pct": None})
     return results
 
 WATCHLIST_CODES = [
@@ -269,22 +313,24 @@ WATCHLIST_CODES = [
 ]
 
 @app.get("/api/watchlist")
-def watchlist():
+async def watchlist():
+    boards = await aclient.gather(
+        *(aclient.board(code, max_age=settings.board_ttl_watchlist) for code, _ in WATCHLIST_CODES)
+    )
     results = []
-    for code, name in WATCHLIST_CODES:
-        try:
-            data = client.board(code)
-            results.append({
-                "code": code,
-                "name": name,
-                "price": data.get("CurrentPrice"),
-                "change": data.get("ChangePreviousClose"),
-                "change_pct": data.get("ChangePreviousClosePer"),
-                "volume": data.get("TradingVolume"),
-                "previous_close": data.get("PreviousClose"),
-            })
-        except Exception:
+    for (code, name), data in zip(WATCHLIST_CODES, boards):
+        if isinstance(data, Exception):
             results.append({"code": code, "name": name, "price": None, "change": None, "change_pct": None, "volume": None, "previous_close": None})
+            continue
+        results.append({
+            "code": code,
+            "name": name,
+            "price": data.get("CurrentPrice"),
+            "change": data.get("ChangePreviousClose"),
+            "change_pct": data.get("ChangePreviousClosePer"),
+            "volume": data.get("TradingVolume"),
+            "previous_close": data.get("PreviousClose"),
+        })
     return results
 
 @app.get("/api/symbol/{code}")
@@ -303,7 +349,7 @@ def symbol_info(code: str):
 @app.get("/api/board/{code}")
 def board(code: str):
     try:
-        data = client.board(code)
+        data = client.board(code, max_age=settings.board_ttl_ui)
         return {
             "current_price": data.get("CurrentPrice"),
             "current_price_time": data.get("CurrentPriceTime"),
@@ -324,13 +370,19 @@ def board(code: str):
         return {"error": str(e)}
 
 @app.get("/api/account")
-def account():
+async def account():
     symbol = runner.get_state().get("symbol")
     try:
-        wallet_cash = client.wallet_cash()
-        wallet_margin = client.wallet_margin()
-        positions = client.positions(symbol=symbol)
-        orders = client.orders(symbol=symbol)
+        results = await aclient.gather(
+            aclient.wallet_cash(),
+            aclient.wallet_margin(),
+            aclient.positions(symbol=symbol),
+            aclient.orders(symbol=symbol),
+        )
+        for r in results:
+            if isinstance(r, Exception):
+                raise r
+        wallet_cash, wallet_margin, positions, orders = results
         pl_total = 0.0
         for p in positions:
             pl = p.get('ProfitLoss')
@@ -350,33 +402,36 @@ def account():
 
 # Trade history endpoints
 @app.get("/api/trade-history/orders")
-def trade_history_orders(limit: int = 100, symbol: Optional[str] = None):
-    return get_trade_orders(limit=limit, symbol=symbol)
+def trade_history_orders(request: Request, limit: int = 100, symbol: Optional[str] = None):
+    return conditional_json(request, data_version("orders"), lambda: get_trade_orders(limit=limit, symbol=symbol))
 
 @app.get("/api/trade-history/daily")
-def trade_history_daily(days: int = 30):
-    return get_daily_pl(days=days)
+def trade_history_daily(request: Request, days: int = 30):
+    return conditional_json(request, data_version("daily_pl"), lambda: get_daily_pl(days=days))
 
 @app.get("/api/trade-history/timeline")
-def trade_history_timeline(date: Optional[str] = None):
-    return get_pl_timeline(date=date)
+def trade_history_timeline(request: Request, date: Optional[str] = None, limit: int = 500, resolution: Optional[str] = None):
+    return conditional_json(
+        request, data_version("daily_pl"),
+        lambda: get_pl_timeline(date=date, limit=limit, resolution=resolution),
+    )
 
 @app.get("/api/trade-history/stats")
-def trade_history_stats(days: int = 30):
-    return get_trade_stats(days=days)
+def trade_history_stats(request: Request, days: int = 30):
+    return conditional_json(request, data_version("orders", "daily_pl"), lambda: get_trade_stats(days=days))
 
 # Executed trades endpoints
 @app.get("/api/trades")
-def trades_list(limit: int = 50, symbol: Optional[str] = None):
-    return get_trades(limit=limit, symbol=symbol)
+def trades_list(request: Request, limit: int = 50, symbol: Optional[str] = None):
+    return conditional_json(request, data_version("trades"), lambda: get_trades(limit=limit, symbol=symbol))
 
 @app.get("/api/trades/summary")
-def trades_summary(days: int = 30):
-    return get_trade_summary(days=days)
+def trades_summary(request: Request, days: int = 30):
+    return conditional_json(request, data_version("trades"), lambda: get_trade_summary(days=days))
 
 @app.get("/api/margin-daily")
-def margin_daily(days: int = 30):
-    return get_margin_daily(days=days)
+def margin_daily(request: Request, days: int = 30):
+    return conditional_json(request, data_version("daily_pl"), lambda: get_margin_daily(days=days))
 
 @app.post("/api/trades/import")
 def trades_import():
@@ -429,16 +484,76 @@ def get_notification_settings():
 
 # Margin history API
 @app.get("/api/margin-history")
-def margin_history(days: int = 30):
-    daily = get_daily_pl(days=days)
-    return [
-        {
-            "date": d["date"],
-            "wallet_margin": d.get("wallet_margin"),
-            "wallet_cash": d.get("wallet_cash"),
-        }
-        for d in daily
-    ]
+def margin_history(request: Request, days: int = 30):
+    def build():
+        return [
+            {
+                "date": d["date"],
+                "wallet_margin": d.get("wallet_margin"),
+                "wallet_cash": d.get("wallet_cash"),
+            }
+            for d in get_daily_pl(days=days)
+        ]
+    return conditional_json(request, data_version("daily_pl"), build)
+
+# Server-push stream: one refresh loop per source for the whole process,
+# clients are sent only topics whose payload changed
+hub = EventHub()
+publisher = StreamPublisher(hub, logger=logger)
+mem_handler.on_emit = lambda: hub.touch("logs")
+
+def _stream_board():
+    symbol = runner.get_state().get("symbol")
+    return board(symbol) if symbol else None
+
+def _when_changed(version, fetch):
+    # skip the queries entirely while the underlying tables are unchanged
+    last = None
+    def run():
+        nonlocal last
+        tag = version()[0]
+        if tag == last:
+            return None
+        data = fetch()
+        last = tag
+        return data
+    return run
+
+_stream_trade_history = _when_changed(
+    lambda: data_version("orders", "daily_pl"),
+    lambda: {"timeline": get_pl_timeline(), "daily": get_daily_pl(), "stats": get_trade_stats()},
+)
+_stream_trade_list = _when_changed(
+    lambda: data_version("trades"),
+    lambda: {"trades": get_trades(), "summary": get_trade_summary()},
+)
+
+def _stream_trades():
+    trades_import()
+    return _stream_trade_list()
+
+publisher.add("status", 0.25, runner.get_state)
+publisher.add("schedule", 1.0, get_schedule)
+publisher.add("board", 1.0, _stream_board)
+publisher.add("account", 5.0, account)
+publisher.add("indices", 10.0, indices)
+publisher.add("watchlist", 15.0, watchlist)
+publisher.add("trades", 15.0, _stream_trades)
+publisher.add("trade_history", 30.0, _stream_trade_history)
+publisher.add("margin_daily", 60.0, _when_changed(lambda: data_version("daily_pl"), lambda: get_margin_daily(days=7)))
+hub.touch("logs")
+
+@app.get("/api/stream")
+async def stream(request: Request):
+    return StreamingResponse(
+        sse_stream(hub, log_reader=mem_handler.get_logs_since, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/stream/stats")
+def stream_stats():
+    return hub.stats()
 
 # Serve built frontend if available
 frontend_dist = Path(__file__).resolve().parent.parent / "frontend" / "dist"
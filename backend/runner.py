@@ -17,17 +17,36 @@ from initializations import Initializations
 from trading_data import TradingData
 from order_executor import OrderExecutor, get_token
 from post_order_processor import PostOrderProcessor
+from board_push import BoardPushFeed
+from tick_recorder import TickRecorder
+from reference_data import ReferenceDataCache
+from latency_metrics import StageTimers
 
 try:
     from .config import Settings
     from .kabus_client import KabuClient
     from .notifier import GmailNotifier
-    from .trade_history import record_trade, get_trades
+    from .trade_history import RowId, submit_trade, get_trades
 except ImportError:
     from config import Settings
     from kabus_client import KabuClient
     from notifier import GmailNotifier
-    from trade_history import record_trade, get_trades
+    from trade_history import RowId, submit_trade, get_trades
+
+# Stages of one _run iteration, in order; the index is passed to StageTimers.lap
+RUNNER_STAGES = (
+    "fetch",
+    "create_ohlc",
+    "buy_and_hold",
+    "indicators",
+    "spline",
+    "post_processing",
+    "signals",
+    "record_notify",
+    "execute_orders",
+)
+(STAGE_FETCH, STAGE_OHLC, STAGE_BUY_AND_HOLD, STAGE_INDICATORS, STAGE_SPLINE,
+ STAGE_POST_PROCESSING, STAGE_SIGNALS, STAGE_RECORD_NOTIFY, STAGE_EXECUTE) = range(len(RUNNER_STAGES))
 
 @dataclass
 class RunnerState:
@@ -53,13 +72,17 @@ class TradingRunner:
             quantity=100,
             mode="daytrade",
         )
-        self._last_entry_id: Optional[int] = None
+        # trade inserts are queued to the history writer; the entry id may still be a Future
+        self._last_entry_id: RowId = None
         self._last_entry_price: Optional[float] = None
         self._last_entry_side: Optional[str] = None
         self._init: Optional[Initializations] = None
         self._trading_data: Optional[TradingData] = None
         self._order_executor: Optional[OrderExecutor] = None
         self._post_processor: Optional[PostOrderProcessor] = None
+        self._push_feed: Optional[BoardPushFeed] = None
+        self._tick_recorder: Optional[TickRecorder] = None
+        self._timers = StageTimers(RUNNER_STAGES, budget=settings.loop_budget)
         self.notifier = GmailNotifier(
             user=settings.gmail_user,
             app_password=settings.gmail_app_password,
@@ -70,6 +93,9 @@ class TradingRunner:
         with self._lock:
             return asdict(self._state)
 
+    def get_loop_stats(self) -> Dict[str, Any]:
+        return self._timers.stats()
+
     def update_config(self, symbol: Optional[str] = None, quantity: Optional[int] = None):
         with self._lock:
             if symbol:
@@ -146,16 +172,36 @@ class TradingRunner:
                 raise RuntimeError("failed to get API token")
             self._init.token = token
 
-            self._trading_data = TradingData(self._init, token)
+            self._push_feed = self._start_push_feed(token)
+            self._trading_data = TradingData(self._init, token, push_feed=self._push_feed)
+            self._trading_data.push_timeout = self.settings.push_timeout
+            self._trading_data.board_ttl = self.settings.board_ttl_runner
+            if self.settings.tick_dir:
+                self._tick_recorder = TickRecorder(self.settings.tick_dir, self._init.symbol, self._init.exchange)
+                self._trading_data.tick_recorder = self._tick_recorder
+            self._trading_data.reference_data = ReferenceDataCache(
+                self._init.symbol,
+                exchange=self._init.exchange,
+                directory=self.settings.reference_dir or None,
+                tick_dir=self.settings.tick_dir or None,
+                board_loader=self._trading_data.fetch_board,
+                logger=self.logger,
+            )
             self._order_executor = OrderExecutor(self._init, self._trading_data, token, self.settings.order_password)
+            self._order_executor.orders.poll_interval = self.settings.order_poll_interval
+            self._order_executor.fill_timeout = self.settings.order_fill_timeout
+            self._order_executor.entry_mode = self.settings.entry_mode
             self._post_processor = PostOrderProcessor(self._init)
 
-            initial_price = self._trading_data.fetch_current_price()
+            timers = self._timers = StageTimers(RUNNER_STAGES, budget=self.settings.loop_budget)
+
+            initial_price = self._trading_data.poll_current_price()
             self._init.previous_price = initial_price
             self._init.current_price = initial_price
             self.logger.info("initial price set: %s", initial_price)
 
             while not self._stop_event.is_set():
+                timers.begin()
                 now = dt.datetime.now(ZoneInfo("Asia/Tokyo"))
                 if self._should_force_close(now):
                     self.logger.warning("force close time reached: %s", now.strftime("%H:%M"))
@@ -168,20 +214,27 @@ class TradingRunner:
 
                 current_price = self._trading_data.fetch_current_price()
                 with self._lock:
-                    self._state.last_price = current_price
+                    if current_price is not None or not self._trading_data.push_active:
+                        self._state.last_price = current_price
                     self._state.last_update = now.isoformat()
+                timers.lap(STAGE_FETCH)
 
                 if current_price is not None:
                     if len(self._init.prices) >= 4:
                         self._trading_data.create_ohlc()
+                        timers.lap(STAGE_OHLC)
                         self._trading_data.calculate_buy_and_hold_equity()
+                        timers.lap(STAGE_BUY_AND_HOLD)
                         self._trading_data.calculate_technical_indicators()
+                        timers.lap(STAGE_INDICATORS)
                         band_width = self._init.df['band_width']
                         hist = self._init.df['hist']
                         di_difference = self._init.df['di_difference']
                         adx_difference = self._init.df['adx_difference']
                         self._trading_data.update_latest_9_data(band_width, hist, di_difference, adx_difference)
+                        timers.lap(STAGE_SPLINE)
                         self._post_processor.calculate_trading_values(dt.datetime.now())
+                        timers.lap(STAGE_POST_PROCESSING)
                         self._trading_data.generate_signals(
                             self._init.interpolated_data,
                             self._init.R1,
@@ -191,10 +244,13 @@ class TradingRunner:
                             self._init.S2,
                             self._init.S3,
                         )
+                        timers.lap(STAGE_SIGNALS)
                         self._capture_last_signal()
                         self._record_signal_trades()
                         self._notify_signals()
+                        timers.lap(STAGE_RECORD_NOTIFY)
                         self._order_executor.execute_orders()
+                        timers.lap(STAGE_EXECUTE)
 
                 if self._max_loss_hit():
                     self.logger.error("max daily loss hit; stopping")
@@ -205,7 +261,11 @@ class TradingRunner:
                     self._force_close_positions()
                     break
 
-                time.sleep(self.settings.sleep_interval)
+                timers.end()
+
+                # PUSH配信中は次の板情報の到着で起床するため待機しない
+                if not self._trading_data.push_active:
+                    time.sleep(self.settings.sleep_interval)
 
         except Exception as e:
             self.logger.exception("runner failed")
@@ -213,9 +273,37 @@ class TradingRunner:
             with self._lock:
                 self._state.last_error = str(e)
         finally:
+            if self._order_executor is not None:
+                self._order_executor.close()
+            if self._push_feed is not None:
+                self._push_feed.stop()
+                self._push_feed = None
+            if self._tick_recorder is not None:
+                self._tick_recorder.close()
+                self._tick_recorder = None
             with self._lock:
                 self._state.running = False
 
+    def _start_push_feed(self, token: str) -> Optional[BoardPushFeed]:
+        if self.settings.price_feed != "push":
+            return None
+        feed = BoardPushFeed(
+            self.settings.api_base_url,
+            token,
+            self._init.symbol,
+            self._init.exchange,
+            logger=self.logger,
+        )
+        if feed.start():
+            self.logger.info("price feed: push (%s)", feed.ws_url)
+        elif feed.running:
+            # 受信スレッドは再接続を続け、接続するまでは /board をポーリングする
+            self.logger.warning("push feed not connected yet; polling /board until it connects")
+        else:
+            self.logger.warning("push feed unavailable; falling back to /board polling")
+            return None
+        return feed
+
     @staticmethod
     def _safe_int(value):
         import math
@@ -254,12 +342,12 @@ class TradingRunner:
             return
         try:
             if signals.get("buy"):
-                self._last_entry_id = record_trade(symbol, "buy", qty, price, "entry")
+                self._last_entry_id = submit_trade(symbol, "buy", qty, price, "entry")
                 self._last_entry_price = price
                 self._last_entry_side = "buy"
                 self.logger.info("trade recorded: BUY entry %s @ %s", symbol, price)
             elif signals.get("sell"):
-                self._last_entry_id = record_trade(symbol, "sell", qty, price, "entry")
+                self._last_entry_id = submit_trade(symbol, "sell", qty, price, "entry")
                 self._last_entry_price = price
                 self._last_entry_side = "sell"
                 self.logger.info("trade recorded: SELL entry %s @ %s", symbol, price)
@@ -267,7 +355,7 @@ class TradingRunner:
             if signals.get("buy_exit") or signals.get("sell_exit"):
                 pl = self._calc_realized_pl(price, qty)
                 trade_type = "exit"
-                record_trade(symbol, "sell" if self._last_entry_side == "buy" else "buy",
+                submit_trade(symbol, "sell" if self._last_entry_side == "buy" else "buy",
                              qty, price, trade_type, self._last_entry_id, pl)
                 self.logger.info("trade recorded: exit %s @ %s PL=%s", symbol, price, pl)
                 self._last_entry_id = None
@@ -277,7 +365,7 @@ class TradingRunner:
             if signals.get("emergency_buy_exit") or signals.get("emergency_sell_exit"):
                 pl = self._calc_realized_pl(price, qty)
                 side = "sell" if signals.get("emergency_buy_exit") else "buy"
-                record_trade(symbol, side, qty, price, "emergency_exit",
+                submit_trade(symbol, side, qty, price, "emergency_exit",
                              self._last_entry_id, pl)
                 self.logger.info("trade recorded: emergency exit %s @ %s PL=%s", symbol, price, pl)
                 self._last_entry_id = None
@@ -353,7 +441,7 @@ class TradingRunner:
                 self._order_executor.exit_ioc_order(close_side, qty, hold_id, current_price)
                 exit_side = "buy" if close_side == "2" else "sell"
                 pl = self._calc_realized_pl(current_price, qty)
-                record_trade(self._state.symbol, exit_side, qty, current_price,
+                submit_trade(self._state.symbol, exit_side, qty, current_price,
                              "force_close", self._last_entry_id, pl)
                 closed += 1
             except Exception:
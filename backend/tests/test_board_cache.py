@@ -0,0 +1,117 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import threading
+import time
+
+import pytest
+
+from board_cache import BoardCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return BoardCache(clock=clock)
+
+
+class TestTTL:
+    def test_miss_then_hit_within_max_age(self, cache, clock):
+        calls = []
+        loader = lambda: calls.append(1) or {"CurrentPrice": 100}
+        assert cache.get("1579", 1, loader, max_age=1.0) == {"CurrentPrice": 100}
+        clock.now = 0.5
+        cache.get("1579", 1, loader, max_age=1.0)
+        assert len(calls) == 1
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_expired_entry_reloads(self, cache, clock):
+        calls = []
+        loader = lambda: calls.append(1) or {"CurrentPrice": len(calls)}
+        cache.get("1579", 1, loader, max_age=1.0)
+        clock.now = 1.5
+        assert cache.get("1579", 1, loader, max_age=1.0) == {"CurrentPrice": 2}
+        assert cache.misses == 2
+
+    def test_max_age_is_per_consumer(self, cache, clock):
+        calls = []
+        loader = lambda: calls.append(1) or {}
+        cache.get("1579", 1, loader, max_age=10.0)
+        clock.now = 2.0
+        cache.get("1579", 1, loader, max_age=10.0)  # watchlist-style reader: hit
+        cache.get("1579", 1, loader, max_age=0.1)   # runner-style reader: miss
+        assert len(calls) == 2
+
+    def test_keys_include_exchange(self, cache):
+        cache.get("1579", 1, lambda: {"x": 1}, max_age=10.0)
+        cache.get("1579", 3, lambda: {"x": 3}, max_age=10.0)
+        assert cache.stats()["entries"] == 2
+
+
+class TestSingleFlight:
+    def test_concurrent_misses_share_one_load(self):
+        cache = BoardCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return {"CurrentPrice": 1}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get("1579", 1, loader)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(2)
+        for t in threads[1:]:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        assert len(calls) == 1
+        assert results == [{"CurrentPrice": 1}] * 5
+        assert cache.coalesced == 4
+
+    def test_loader_error_propagates_and_is_not_cached(self, cache):
+        def failing():
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            cache.get("1579", 1, failing, max_age=10.0)
+        assert cache.errors == 1
+        assert cache.get("1579", 1, lambda: {"ok": True}, max_age=10.0) == {"ok": True}
+
+
+class TestPutAndPeek:
+    def test_pushed_board_is_served(self, cache, clock):
+        cache.put("1579", 1, {"CurrentPrice": 300})
+        loader = lambda: pytest.fail("should not load")
+        assert cache.get("1579", 1, loader, max_age=1.0) == {"CurrentPrice": 300}
+
+    def test_peek_returns_age(self, cache, clock):
+        assert cache.peek("1579") == (None, None)
+        cache.put("1579", 1, {"CurrentPrice": 300})
+        clock.now = 3.0
+        assert cache.peek("1579") == ({"CurrentPrice": 300}, 3.0)
@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_store import ColumnStore
+
+T0 = datetime.datetime(2024, 3, 4, 9, 0)
+
+
+def ts(i):
+    return T0 + datetime.timedelta(seconds=i)
+
+
+@pytest.fixture
+def store():
+    s = ColumnStore(columns=['close', 'buy_signals', 'P'], capacity=2)
+    for i in range(5):
+        s.append(ts(i), {'close': 100.0 + i, 'buy_signals': 0})
+    return s
+
+
+class TestAppend:
+    def test_grows_and_fills_missing_with_nan(self, store):
+        assert len(store) == 5
+        assert store.column('close').tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+        assert np.isnan(store.last('P'))
+
+    def test_unknown_columns_are_created(self, store):
+        store.append(ts(5), {'close': 105.0, 'upper_band': 1.5})
+        assert store.columns.tolist() == ['close', 'buy_signals', 'P', 'upper_band']
+        assert np.isnan(store.column('upper_band')[:5]).all()
+        assert store.last('upper_band') == 1.5
+
+
+class TestDataFrameCompat:
+    def test_index_and_at(self, store):
+        current = store.index[-1]
+        assert current == ts(4)
+        assert store.at[current, 'close'] == 104.0
+        store.at[current, 'buy_signals'] = 1
+        assert store.iloc[-1].get('buy_signals', 0) == 1
+        store.at[current, 'trend_check_data'] = 0.5
+        assert 'trend_check_data' in store.columns
+
+    def test_loc_row_and_list_assignment(self, store):
+        label = store.index[-2]
+        store.loc[label, ['buy_signals', 'P']] = 0
+        store.loc[label, ['buy_signals', 'P']] = [1, 2.5]
+        assert store.at[label, 'P'] == 2.5
+        assert store.loc[label]['buy_signals'] == 1
+
+    def test_loc_row_length_mismatch(self, store):
+        with pytest.raises(ValueError):
+            store.loc['2024-03-03'] = [1, 2]
+
+    def test_iloc_last_row(self, store):
+        row = store.iloc[-1]
+        assert row.name == ts(4)
+        assert row['close'] == 104.0
+        assert row.get('missing', 0) == 0
+        with pytest.raises(IndexError):
+            store.iloc[5]
+
+    def test_column_assignment(self, store):
+        store['fitted_values'] = np.nan
+        store['hedge_buy_signals'] = 0
+        assert store.column('hedge_buy_signals').tolist() == [0.0] * 5
+        with pytest.raises(ValueError):
+            store['close'] = [1.0]
+
+    def test_non_numeric_values_switch_column_to_object(self, store):
+        store.at[store.index[-1], 'P'] = 'n/a'
+        assert store.last('P') == 'n/a'
+        assert store.column('close').dtype == np.float64
+
+    def test_series_and_frame_exports(self, store):
+        close = store['close']
+        assert isinstance(close, pd.Series)
+        assert close.iloc[-3:].tolist() == [102.0, 103.0, 104.0]
+        assert close.index[0] == ts(0)
+        frame = store[['close', 'buy_signals']].tail(2)
+        assert frame.index.tolist() == [ts(3), ts(4)]
+        frame.iloc[0, 0] = -1
+        assert store.column('close')[3] == 103.0
+        assert list(store.reindex(columns=['close', 'cash']).columns) == ['close', 'cash']
+
+    def test_empty(self):
+        store = ColumnStore(columns=['close'])
+        assert store.empty and len(store) == 0
+        with pytest.raises(IndexError):
+            store.iloc[-1]
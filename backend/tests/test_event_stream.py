@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import json
+import logging
+
+from event_stream import EventHub, StreamPublisher, format_sse, sse_stream
+from log_buffer import MemoryLogHandler
+
+
+def parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_publish_drops_unchanged_payloads():
+    hub = EventHub()
+    assert hub.publish("status", {"running": False})
+    assert not hub.publish("status", {"running": False})
+    assert hub.publish("status", {"running": True})
+    assert hub.stats() == {"subscribers": 0, "topics": 1, "published": 2, "suppressed": 1}
+    [(topic, version, payload)] = hub.changed_since({})
+    assert (topic, json.loads(payload)) == ("status", {"running": True})
+    assert hub.changed_since({"status": version}) == []
+
+
+def test_format_sse_splits_multiline_data():
+    assert format_sse("logs", "a\nb", 7) == "event: logs\nid: 7\ndata: a\ndata: b\n\n"
+
+
+def test_many_changes_wake_a_subscriber_once():
+    async def run():
+        hub = EventHub()
+        sub = hub.subscribe()
+        for i in range(50):
+            hub.publish("board", {"price": i})
+        assert await sub.wait(1.0)
+        assert not await sub.wait(0.01)
+        [(topic, _, payload)] = hub.changed_since(sub.versions)
+        assert json.loads(payload) == {"price": 49}
+        hub.unsubscribe(sub)
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(run())
+
+
+def test_stream_sends_snapshot_then_changes_and_new_log_lines():
+    async def run():
+        logs = MemoryLogHandler(capacity=10)
+        logs.setFormatter(logging.Formatter("%(message)s"))
+        hub = EventHub()
+        logs.on_emit = lambda: hub.touch("logs")
+        hub.publish("status", {"running": False})
+        logs.emit(logging.makeLogRecord({"msg": "first"}))
+
+        stream = sse_stream(hub, log_reader=logs.get_logs_since, heartbeat=0.05)
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        assert parse(await stream.__anext__()) == ("status", {"running": False})
+        assert parse(await stream.__anext__()) == ("logs", {"reset": True, "lines": ["first"]})
+        assert hub.subscriber_count() == 1
+
+        assert await stream.__anext__() == ": ping\n\n"
+        hub.publish("status", {"running": False})       # unchanged: nothing sent
+        logs.emit(logging.makeLogRecord({"msg": "second"}))
+        logs.emit(logging.makeLogRecord({"msg": "third"}))
+        assert parse(await stream.__anext__()) == ("logs", {"reset": False, "lines": ["second", "third"]})
+
+        await stream.aclose()
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(run())
+
+
+def test_publisher_runs_once_per_process_while_subscribed():
+    async def run():
+        hub = EventHub()
+        publisher = StreamPublisher(hub)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"n": 1}
+
+        async def failing():
+            raise RuntimeError("down")
+
+        publisher.add("status", 0.01, fetch)
+        publisher.add("account", 0.01, failing)
+        await asyncio.sleep(0.05)
+        assert calls == []                              # nobody is listening yet
+
+        subs = [hub.subscribe() for _ in range(3)]
+        await asyncio.sleep(0.1)
+        assert len(publisher._tasks) == 2
+        assert 3 <= len(calls) <= 15                    # one loop, not one per subscriber
+        assert hub.stats()["published"] == 1            # identical results are suppressed
+        assert [t for t, _, _ in hub.changed_since({})] == ["status"]
+
+        for sub in subs:
+            hub.unsubscribe(sub)
+        await asyncio.sleep(0.05)
+        assert publisher._tasks == {}
+        stopped = len(calls)
+        await asyncio.sleep(0.05)
+        assert len(calls) == stopped
+
+    asyncio.run(run())
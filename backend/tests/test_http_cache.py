@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import gzip
+import json
+from email.utils import formatdate
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from http_cache import CompressionMiddleware, conditional_json
+
+VERSION = ("18c1-3", 1_700_000_000.5)
+
+
+def request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/api/trades", "headers": raw})
+
+
+def test_fresh_request_gets_body_and_validators():
+    response = conditional_json(request(), VERSION, lambda: [{"id": 1}])
+    assert response.status_code == 200
+    assert json.loads(response.body) == [{"id": 1}]
+    assert response.headers["etag"] == 'W/"18c1-3"'
+    assert response.headers["last-modified"] == formatdate(VERSION[1], usegmt=True)
+
+
+def test_matching_etag_skips_the_build():
+    def build():
+        raise AssertionError("body must not be built for a 304")
+
+    for header in ('W/"18c1-3"', '"18c1-3"', '"old", W/"18c1-3"', "*"):
+        response = conditional_json(request(if_none_match=header), VERSION, build)
+        assert response.status_code == 304 and response.body == b""
+        assert response.headers["etag"] == 'W/"18c1-3"'
+    assert conditional_json(request(if_none_match='W/"18c1-2"'), VERSION, list).status_code == 200
+
+
+def test_if_modified_since_is_a_fallback():
+    current = formatdate(VERSION[1], usegmt=True)
+    older = formatdate(VERSION[1] - 60, usegmt=True)
+    assert conditional_json(request(if_modified_since=current), VERSION, list).status_code == 304
+    assert conditional_json(request(if_modified_since=older), VERSION, list).status_code == 200
+    assert conditional_json(request(if_modified_since="garbage"), VERSION, list).status_code == 200
+    # an ETag mismatch wins over a matching date
+    headers = {"if_none_match": '"other"', "if_modified_since": current}
+    assert conditional_json(request(**headers), VERSION, list).status_code == 200
+
+
+def call(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"accept-encoding", b"gzip")]}
+    messages = []
+
+    async def receive():
+        if not messages:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_compression_threshold_and_stream_exclusion():
+    payload = [{"id": i, "symbol": "1579"} for i in range(200)]
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/api/stream":
+            async def frames():
+                yield "event: status\ndata: {}\n\n"
+            response = StreamingResponse(frames(), media_type="text/event-stream")
+        else:
+            response = JSONResponse(payload if scope["path"] == "/big" else {"ok": True})
+        await response(scope, receive, send)
+
+    wrapped = CompressionMiddleware(app, minimum_size=1024, exclude_paths=("/api/stream",))
+    headers, body = call(wrapped, "/big")
+    assert headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == payload
+
+    headers, body = call(wrapped, "/small")
+    assert "content-encoding" not in headers and json.loads(body) == {"ok": True}
+
+    headers, body = call(wrapped, "/api/stream")
+    assert "content-encoding" not in headers and body.startswith(b"event: status")
@@ -0,0 +1,121 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import INDICATOR_COLUMNS, Ewm, IndicatorEngine, RollingStd
+from initializations import Initializations
+from trading_data import TradingData
+
+
+class _Init:
+    logger = logging.getLogger("test_indicators")
+
+
+def pandas_reference(df):
+    """TradingData の pandas 実装で全行を計算した結果"""
+    init = _Init()
+    init.df = df.copy()
+    td = TradingData.__new__(TradingData)
+    td.init = init
+    td.calculate_bollinger_bands()
+    td.calculate_macd()
+    td.calculate_dmi_adx()
+    return init.df
+
+
+def make_bars(n, seed, flat=None):
+    rng = np.random.default_rng(seed)
+    close = np.round(300 + np.cumsum(rng.normal(0, 0.5, n)), 1)
+    high = close + np.abs(np.round(rng.normal(0, 0.3, n), 1))
+    low = close - np.abs(np.round(rng.normal(0, 0.3, n), 1))
+    if flat is not None:
+        a, b = flat
+        close[a:b] = high[a:b] = low[a:b] = close[a]
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close}).astype(object)
+
+
+def run_engine(df):
+    engine = IndicatorEngine()
+    latest = []
+    for h, l, c in zip(df['high'], df['low'], df['close']):
+        latest.append(engine.update(h, l, c))
+    return engine, latest
+
+
+def assert_same(a, b):
+    assert np.array_equal(np.asarray(a, dtype=float), np.asarray(b, dtype=float), equal_nan=True)
+
+
+@pytest.mark.parametrize("flat", [None, (50, 90), (0, 30)])
+def test_columns_match_pandas_bit_for_bit(flat):
+    df = make_bars(300, seed=11, flat=flat)
+    engine, _ = run_engine(df)
+    expected = pandas_reference(df)
+    for col in INDICATOR_COLUMNS:
+        assert_same(engine.column(col), expected[col])
+
+
+def test_latest_row_matches_pandas_on_every_prefix():
+    df = make_bars(60, seed=5, flat=(20, 35))
+    _, latest = run_engine(df)
+    for m in range(len(df)):
+        expected = pandas_reference(df.iloc[:m + 1]).iloc[-1]
+        for col in INDICATOR_COLUMNS:
+            assert_same([latest[m][col]], [expected[col]])
+
+
+def test_constant_series():
+    df = pd.DataFrame({'open': [300.0] * 40, 'high': [300.0] * 40, 'low': [300.0] * 40, 'close': [300.0] * 40})
+    engine, _ = run_engine(df)
+    expected = pandas_reference(df)
+    for col in INDICATOR_COLUMNS:
+        assert_same(engine.column(col), expected[col])
+
+
+def test_bfill_marks_filled_rows_as_changed():
+    engine = IndicatorEngine()
+    engine.update(300, 300, 300)
+    assert engine.take_changes() == 0
+    assert np.isnan(engine.column('band_width')[0])
+    engine.update(301, 300, 301)
+    # band_width[0] is back-filled from row 1
+    assert engine.take_changes() == 0
+    assert engine.column('band_width')[0] == engine.column('band_width')[1]
+    engine.update(302, 301, 302)
+    assert engine.take_changes() == 2
+
+
+def test_rolling_std_and_ewm_primitives():
+    values = [1.0, 2.0, 4.0, 8.0, 16.0, 3.0, 3.0, 3.0]
+    std = RollingStd(3)
+    assert_same([std.update(v) for v in values], pd.Series(values).rolling(3, min_periods=1).std())
+    ewm = Ewm(5)
+    with_nan = [1.0, np.nan, 3.0, 3.0, np.nan, np.nan, 7.0]
+    assert_same([ewm.update(v) for v in with_nan], pd.Series(with_nan).ewm(span=5, adjust=False).mean())
+
+
+def test_trading_data_uses_engine_and_matches_pandas_path():
+    def run(use_engine):
+        init = Initializations()
+        init.logger = logging.getLogger("test_indicators")
+        td = TradingData(init, None)
+        td.pivot_hlc = (1.0, 1.0, 1.0)
+        if not use_engine:
+            td.indicator_engine = None
+        prices = np.round(300 + np.cumsum(np.random.default_rng(2).normal(0, 0.5, 240)), 1)
+        for i in range(0, len(prices), 4):
+            init.prices = list(prices[i:i + 4])
+            td.create_ohlc()
+            td.calculate_technical_indicators()
+        return init.df
+
+    incremental, full = run(True), run(False)
+    for col in INDICATOR_COLUMNS:
+        assert_same(incremental[col], full[col])
@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import pytest
+import requests
+
+from kabus_transport import KabusTransport
+from latency_metrics import LatencyHistogram, LatencyMetrics, StageTimers, endpoint_name
+
+BASE = "http://localhost:18080/kabusapi"
+
+
+@pytest.mark.parametrize("path, name", [
+    ("/sendorder", "/sendorder"),
+    ("/sendorder/future", "/sendorder/future"),
+    ("/cancelorder", "/cancelorder"),
+    ("/board/1579@1", "/board"),
+    ("/wallet/margin/1579@1", "/wallet/margin"),
+    ("/exchange/USD/JPY", "/exchange"),
+])
+def test_endpoint_name_drops_variable_parts(path, name):
+    assert endpoint_name(BASE + path + "?product=0") == name
+
+
+def test_quantiles_interpolate_within_buckets():
+    histogram = LatencyHistogram(bounds=(0.01, 0.02, 0.05))
+    for _ in range(50):
+        histogram.observe(0.005)
+    for _ in range(50):
+        histogram.observe(0.015)
+    assert histogram.counts == [50, 50, 0, 0]
+    assert histogram.quantile(0.5) == pytest.approx(0.01)
+    assert histogram.quantile(0.99) == pytest.approx(0.01 + 0.01 * 49 / 50)
+    histogram.observe(3.0)
+    assert histogram.max == 3.0
+    assert histogram.quantile(1.0) == 0.05
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_stats_and_prometheus_output():
+    m = LatencyMetrics(buckets=(0.01, 0.1))
+    m.observe(BASE + "/board/1579@1", "get", 0.004, status=200)
+    m.observe(BASE + "/board/9984@1", "GET", 0.05, status=429)
+    m.observe(BASE + "/sendorder", "POST", 0.2, error="ReadTimeout")
+
+    stats = m.stats()
+    assert stats["buckets_ms"] == [10.0, 100.0]
+    board, order = stats["endpoints"]
+    assert (board["endpoint"], board["method"], board["count"], board["errors"]) == ("/board", "GET", 2, 1)
+    assert board["status"] == {"200": 1, "429": 1}
+    assert board["buckets"] == [1, 1, 0]
+    assert board["p50_ms"] == pytest.approx(10.0)
+    assert (order["errors"], order["exceptions"], order["p99_ms"]) == (1, {"ReadTimeout": 1}, 100.0)
+
+    text = m.prometheus()
+    assert '# TYPE kabusapi_request_duration_seconds histogram' in text
+    assert 'kabusapi_request_duration_seconds_bucket{endpoint="/board",method="GET",le="0.01"} 1' in text
+    assert 'kabusapi_request_duration_seconds_bucket{endpoint="/board",method="GET",le="+Inf"} 2' in text
+    assert 'kabusapi_request_duration_seconds_count{endpoint="/sendorder",method="POST"} 1' in text
+    assert 'kabusapi_responses_total{endpoint="/board",method="GET",code="429"} 1' in text
+    assert 'kabusapi_request_errors_total{endpoint="/sendorder",method="POST",error="ReadTimeout"} 1' in text
+    assert text.endswith("\n")
+
+
+class _Session:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def request(self, method, url, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        response = requests.Response()
+        response.status_code = self.outcome
+        return response
+
+
+def test_transport_records_every_request():
+    m = LatencyMetrics()
+    transport = KabusTransport(metrics=m)
+    transport._session = _Session(200)
+    transport.request("GET", BASE + "/positions", params={"product": 0})
+    transport._session = _Session(requests.exceptions.ConnectTimeout("down"))
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        transport.request("POST", BASE + "/cancelorder", json={})
+
+    by_endpoint = {e["endpoint"]: e for e in m.stats()["endpoints"]}
+    assert by_endpoint["/positions"]["status"] == {"200": 1}
+    assert by_endpoint["/cancelorder"]["exceptions"] == {"ConnectTimeout": 1}
+
+
+def test_stage_timers_record_laps_and_overruns():
+    ticks = iter([0, 1_000_000, 3_000_000, 3_500_000,          # 1ms, 2ms, loop 3.5ms
+                  10_000_000, 10_200_000, 20_000_000])         # 0.2ms, skipped stage, loop 10ms
+    timers = StageTimers(("fetch", "signals"), budget=0.005, clock=lambda: next(ticks))
+    timers.begin()
+    timers.lap(0)
+    timers.lap(1)
+    assert timers.end() == 3_500_000
+    timers.begin()
+    timers.lap(0)
+    timers.end()
+
+    stats = timers.stats()
+    assert (stats["iterations"], stats["overruns"], stats["budget_ms"]) == (2, 1, 5.0)
+    assert stats["worst_overrun_ms"] == 5.0
+    assert stats["loop"]["max_ms"] == 10.0
+    fetch, signals = stats["stages"]["fetch"], stats["stages"]["signals"]
+    assert (fetch["count"], fetch["avg_ms"], fetch["last_ms"]) == (2, 0.6, 0.2)
+    assert (signals["count"], signals["max_ms"], signals["last_ms"]) == (1, 2.0, 2.0)
+    assert 1.0 <= signals["p50_ms"] <= 2.5
@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlc_store import OhlcStore
+
+T0 = datetime.datetime(2024, 3, 4, 9, 0)
+
+
+def fill(store, n, start=0):
+    for i in range(start, start + n):
+        store.append(T0 + datetime.timedelta(seconds=i), i, i + 0.5, i - 0.5, i + 0.25)
+
+
+class TestAppend:
+    def test_grows_past_initial_capacity(self):
+        store = OhlcStore(capacity=4)
+        fill(store, 10)
+        assert len(store) == 10
+        assert store.total == 10
+        assert store.column('close').tolist() == [i + 0.25 for i in range(10)]
+        assert store.index[-1] == pd.Timestamp(T0 + datetime.timedelta(seconds=9))
+
+    def test_column_is_a_view(self):
+        store = OhlcStore()
+        fill(store, 3)
+        view = store.column('close')
+        view[0] = -1.0
+        assert store['close'].iloc[0] == -1.0
+
+    def test_new_rows_of_extra_columns_start_as_nan(self):
+        store = OhlcStore()
+        fill(store, 2)
+        store['band_width'] = [1.0, 2.0]
+        fill(store, 1, start=2)
+        assert np.isnan(store.last('band_width'))
+
+
+class TestRingBuffer:
+    def test_keeps_latest_maxlen_rows(self):
+        store = OhlcStore(capacity=2, maxlen=5)
+        fill(store, 23)
+        assert len(store) == 5
+        assert store.total == 23
+        assert store.dropped == 18
+        assert store.column('open').tolist() == [18, 19, 20, 21, 22]
+        assert store.index[0] == pd.Timestamp(T0 + datetime.timedelta(seconds=18))
+
+    def test_extra_columns_follow_compaction(self):
+        store = OhlcStore(maxlen=3)
+        for i in range(10):
+            fill(store, 1, start=i)
+            store.column('hist', create=True)[-1] = i * 10
+        assert store.column('hist').tolist() == [70, 80, 90]
+
+
+class TestPandasCompat:
+    def test_series_accessors(self):
+        store = OhlcStore()
+        fill(store, 5)
+        close = store['close']
+        assert isinstance(close, pd.Series)
+        assert close.iloc[0] == 0.25 and close.iloc[-1] == 4.25
+        assert close.rolling(2, min_periods=1).mean().iloc[-1] == 3.75
+        assert 'close' in store.columns
+        assert not store.empty
+
+    def test_setitem_and_to_frame(self):
+        store = OhlcStore()
+        fill(store, 3)
+        store['hist'] = pd.Series([0.1, 0.2, 0.3])
+        frame = store.to_frame()
+        assert list(frame.columns) == ['open', 'high', 'low', 'close', 'hist']
+        assert frame['hist'].tolist() == [0.1, 0.2, 0.3]
+        frame.loc[frame.index[0], 'hist'] = 9.0
+        assert store['hist'].iloc[0] == 0.1
+
+    def test_setitem_length_mismatch(self):
+        store = OhlcStore()
+        fill(store, 3)
+        with pytest.raises(ValueError):
+            store['hist'] = [1.0]
+
+    def test_empty_store(self):
+        store = OhlcStore()
+        assert store.empty
+        assert len(store['close']) == 0
+        with pytest.raises(IndexError):
+            store.last('close')
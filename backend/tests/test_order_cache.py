@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import threading
+import time
+
+from order_cache import OrderCache, order_updated_at
+from order_executor import OrderExecutor
+
+
+def order(order_id, recv, state=1, transact=()):
+    details = [{'RecType': 1, 'TransactTime': recv}] + [{'RecType': 8, 'TransactTime': t} for t in transact]
+    return {'ID': order_id, 'State': state, 'RecvTime': recv, 'Details': details}
+
+
+class FakeOrders:
+    """updtime 以降に更新された注文だけを返す /orders"""
+
+    def __init__(self, orders):
+        self.orders = {o['ID']: o for o in orders}
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(dict(params))
+        updtime = params.get('updtime')
+        return [o for o in self.orders.values() if updtime is None or order_updated_at(o) >= updtime]
+
+
+def test_updated_at_uses_latest_detail():
+    o = order('A', '2024-03-04T09:00:00.123+09:00', transact=['2024-03-04T09:00:02.5+09:00'])
+    assert order_updated_at(o) == '20240304090002'
+    assert order_updated_at({'ID': 'X'}) is None
+
+
+def test_full_load_then_incremental_updates():
+    api = FakeOrders([order('A', '2024-03-04T09:00:00+09:00'), order('B', '2024-03-04T09:00:05+09:00')])
+    cache = OrderCache(api)
+    assert cache.sync()
+    assert api.calls[0] == {'product': 2}
+    assert [o['ID'] for o in cache.latest()] == ['A', 'B']
+
+    api.orders['A'] = order('A', '2024-03-04T09:00:00+09:00', state=5, transact=['2024-03-04T09:01:00+09:00'])
+    api.orders['C'] = order('C', '2024-03-04T09:00:30+09:00')
+    assert cache.sync()
+    # 前回の最新時刻 09:00:05 から1秒遡って差分を取得する
+    assert api.calls[1] == {'product': 2, 'updtime': '20240304090004'}
+    assert cache.get('A')['State'] == 5
+    assert [o['ID'] for o in cache.latest(2)] == ['B', 'C']
+    assert cache.stats() == {'orders': 3, 'cursor': '20240304090100', 'full_loads': 1,
+                             'incremental_loads': 1, 'errors': 0}
+
+    assert cache.sync()
+    assert api.calls[2]['updtime'] == '20240304090059'
+
+
+def test_failed_fetch_keeps_cursor():
+    results = [[order('A', '2024-03-04T09:00:00+09:00')], None, []]
+    cache = OrderCache(lambda params: results.pop(0))
+    assert cache.sync()
+    assert not cache.sync()
+    assert cache.stats()['errors'] == 1
+    assert cache.sync()
+    assert cache.stats()['cursor'] == '20240304090000'
+    cache.reset()
+    assert len(cache) == 0
+
+
+def test_concurrent_syncs_share_one_request():
+    release = threading.Event()
+    calls = []
+
+    def fetch(params):
+        calls.append(params)
+        release.wait(1)
+        return []
+
+    cache = OrderCache(fetch)
+    first = threading.Thread(target=cache.sync)
+    first.start()
+    time.sleep(0.05)
+    waiters = [threading.Thread(target=cache.sync) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    release.set()
+    for t in [first] + waiters:
+        t.join()
+    # 進行中の同期の後に1回だけ照会し、残りはその結果を共有する
+    assert len(calls) == 2
+    assert cache.sync(max_age=10.0) and len(calls) == 2
+
+
+def test_executor_reads_orders_from_cache():
+    executor = OrderExecutor(init=None, trading_data=None, token=None, order_password=None)
+    api = FakeOrders([order('A', '2024-03-04T09:00:00+09:00', state=5), order('B', '2024-03-04T09:00:01+09:00')])
+    executor.order_cache.fetch_orders = api
+
+    assert executor.is_order_filled('A')
+    assert not executor.is_order_filled('B')
+    assert [o['ID'] for o in executor.get_orders_history(limit=1)] == ['B']
+    assert len(api.calls) == 3 and 'updtime' in api.calls[-1]
+
+    executor.orders.stop()      # 照会スレッドを起動せずに追跡だけ登録する
+    executor.orders.track('B')
+    assert [o['ID'] for o in executor._tracked_orders()] == ['B']
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import logging
+import threading
+import time
+
+import pytest
+
+from order_executor import ENTRY_PARALLEL, ENTRY_SEQUENTIAL, OrderExecutor
+
+
+class SlowOrders:
+    """/sendorder の応答に一定時間かかる new_order"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.threads = set()
+
+    def __call__(self, side, quantity):
+        self.sent.append((side, quantity, time.perf_counter()))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return {'Result': 0, 'OrderId': f"{side}-id"}
+
+
+def make_executor(mode, delay=0.1):
+    executor = OrderExecutor(init=None, trading_data=None, token=None, order_password=None)
+    executor.logger = logging.getLogger('test')
+    executor.entry_mode = mode
+    executor.new_order = SlowOrders(delay)
+    return executor
+
+
+def test_parallel_entry_submits_both_legs_together():
+    executor = make_executor(ENTRY_PARALLEL)
+    started = time.perf_counter()
+    buy, sell = executor.submit_entry_pair(100)
+    elapsed = time.perf_counter() - started
+
+    assert (buy['OrderId'], sell['OrderId']) == ('2-id', '1-id')
+    assert sorted(side for side, _, _ in executor.new_order.sent) == ['1', '2']
+    assert elapsed < 0.18
+    assert len(executor.new_order.threads) == 2
+    timing = executor.entry_timings[-1]
+    assert timing['mode'] == ENTRY_PARALLEL
+    assert timing['buy_ack_ms'] >= 100 and timing['sell_ack_ms'] >= 100
+    assert timing['submit_skew_ms'] < 50
+    executor.close()
+
+
+def test_sequential_entry_records_skew():
+    executor = make_executor(ENTRY_SEQUENTIAL, delay=0.05)
+    executor.submit_entry_pair(100)
+    timing = executor.entry_timings[-1]
+    assert [side for side, _, _ in executor.new_order.sent] == ['2', '1']
+    assert timing['ack_skew_ms'] == pytest.approx(timing['sell_ack_ms'], abs=10)
+    assert timing['submit_skew_ms'] >= 50
+    executor.close()
@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import logging
+import threading
+import time
+
+from order_executor import OrderExecutor
+from order_tracker import (
+    CANCELLED, EXPIRED, FILLED, PLACED, WORKING, OrderTracker, classify_order,
+)
+
+
+def order(order_id, state, cum=0, qty=100, details=(), side='2'):
+    return {'ID': order_id, 'State': state, 'Side': side, 'OrderQty': qty, 'CumQty': cum, 'Details': list(details)}
+
+
+def execution(execution_id, price, qty=100):
+    return {'RecType': 8, 'ExecutionID': execution_id, 'Price': price, 'Qty': qty}
+
+
+class FakeOrders:
+    """/orders の応答を順に返す"""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.snapshots[min(self.calls, len(self.snapshots)) - 1]
+
+
+def test_classify_order():
+    assert classify_order(order('A', 1)) == PLACED
+    assert classify_order(order('A', 3, cum=0)) == WORKING
+    assert classify_order(order('A', 5, cum=100, details=[execution('E1', 300.0)])) == FILLED
+    assert classify_order(order('A', 5, details=[{'RecType': 6}])) == CANCELLED
+    assert classify_order(order('A', 5, details=[{'RecType': 1}, {'RecType': 3}])) == EXPIRED
+
+
+def test_update_records_fills_and_wakes_waiters():
+    tracker = OrderTracker(lambda: None, poll_interval=3600)
+    tracker.track('A')
+    result = {}
+
+    def waiter():
+        result.update(tracker.wait(['A'], timeout=5))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    tracker.update([order('A', 3)])
+    time.sleep(0.05)
+    assert thread.is_alive()
+
+    fills = [execution('E1', 300.0, 60), execution('E2', 301.0, 40)]
+    assert [r.order_id for r in tracker.update([order('A', 5, cum=100, details=fills), order('B', 5)])] == ['A']
+    thread.join(timeout=1)
+    record = result['A']
+    assert record.state == FILLED
+    assert record.execution_ids == ['E1', 'E2']
+    assert abs(record.price - 300.4) < 1e-9
+    # 変化がなければ通知しない
+    assert tracker.update([order('A', 5, cum=100, details=fills)]) == []
+    tracker.stop()
+
+
+def test_poller_runs_only_while_orders_are_live():
+    fetch = FakeOrders([order('A', 1)], [order('A', 3)], [order('A', 5, cum=100, details=[execution('E1', 300.0)])])
+    tracker = OrderTracker(fetch, poll_interval=0.01)
+    record = tracker.wait(['A'], timeout=2)['A']
+    assert record.state == FILLED
+    assert fetch.calls == 3
+
+    deadline = time.monotonic() + 1
+    while tracker._thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert tracker._thread is None
+    calls = fetch.calls
+    time.sleep(0.05)
+    assert fetch.calls == calls
+
+
+def test_wait_any_returns_on_first_change():
+    tracker = OrderTracker(FakeOrders([order('B', 1), order('S', 3, side='1')]), poll_interval=0.01)
+    records = tracker.wait_for(['B', 'S', None], lambda r: r.state != PLACED, timeout=2, any_of=True)
+    assert records['S'].state == WORKING
+    assert records['B'].state == PLACED
+    tracker.stop()
+
+
+def test_executor_resolves_entries_by_order_id():
+    executor = OrderExecutor.__new__(OrderExecutor)
+    executor.logger = logging.getLogger('test')
+    executor.fill_timeout = 2
+    executor.get_positions = lambda params=None: []
+    executor.orders = OrderTracker(FakeOrders([
+        order('B1', 5, cum=100, details=[execution('HB', 300.1)], side='2'),
+        order('S1', 5, cum=100, details=[execution('HS', 300.0)], side='1'),
+        order('IOC', 5, details=[{'RecType': 1}, {'RecType': 3}], side='1'),
+    ]), poll_interval=0.01)
+
+    buy, sell = executor.await_entries({'Result': 0, 'OrderId': 'B1'}, {'Result': 0, 'OrderId': 'S1'})
+    assert buy == {'Side': '2', 'ExecutionID': 'HB', 'Price': 300.1}
+    assert sell == {'Side': '1', 'ExecutionID': 'HS', 'Price': 300.0}
+    assert executor.ioc_expired({'Result': 0, 'OrderId': 'IOC'})
+    executor.orders.stop()
+
+
+def test_executor_falls_back_to_positions_without_order_id():
+    executor = OrderExecutor.__new__(OrderExecutor)
+    executor.logger = logging.getLogger('test')
+    executor.fill_timeout = 0.1
+    executor.orders = OrderTracker(lambda: [], poll_interval=0.01)
+    positions = [{'Side': '2', 'ExecutionID': 'HB', 'Price': 300.1}, {'Side': '1', 'ExecutionID': 'HS', 'Price': 300.0}]
+    executor.get_positions = lambda params=None: positions
+    assert executor.await_entries(None, {'Result': 4, 'Message': 'error'}) == (positions[0], positions[1])
@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import threading
+import time
+
+import pytest
+
+from board_cache import BoardCache
+from rate_limiter import ORDER, POLLING, TRADING, UI, RateLimited, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=10, burst=3, reserve={}, clock=clock)
+        for _ in range(3):
+            assert limiter.acquire(ORDER) == 0.0
+        assert limiter.stats()["tokens"] == 0.0
+        clock.now = 0.1
+        assert limiter.acquire(ORDER) == 0.0
+        assert limiter.stats()["classes"]["order"]["acquired"] == 4
+
+    def test_reserve_keeps_tokens_for_higher_classes(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=0, burst=3, max_wait={UI: 0}, clock=clock)
+        limiter.acquire(UI)  # 3 -> 2, UI needs 1 + 2 reserved
+        with pytest.raises(RateLimited):
+            limiter.acquire(UI)
+        limiter.acquire(POLLING)
+        limiter.acquire(ORDER)
+        stats = limiter.stats()
+        assert stats["classes"]["ui"]["shed"] == 1
+        assert stats["classes"]["ui"]["acquired"] == 1
+        assert stats["tokens"] == 0.0
+
+    def test_rate_limited_is_a_request_exception(self):
+        import requests
+
+        assert issubclass(RateLimited, requests.exceptions.RequestException)
+
+
+class TestPriorityOrdering:
+    def test_waiters_are_served_by_priority(self):
+        limiter = RateLimiter(rate=20, burst=1, reserve={}, max_wait={})
+        limiter.acquire(ORDER)
+        order = []
+        barrier = threading.Barrier(4)
+
+        def worker(priority):
+            barrier.wait()
+            limiter.acquire(priority)
+            order.append(priority)
+
+        threads = [threading.Thread(target=worker, args=(p,)) for p in (UI, POLLING, TRADING)]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        time.sleep(0.02)  # all three are queued before the first refill
+        for t in threads:
+            t.join(2)
+        assert order == [TRADING, POLLING, UI]
+
+    def test_queue_depth_is_reported(self):
+        limiter = RateLimiter(rate=0, burst=0, reserve={}, max_wait={})
+        t = threading.Thread(target=lambda: limiter.acquire(POLLING), daemon=True)
+        t.start()
+        deadline = time.time() + 2
+        while limiter.stats()["queue_depth"] == 0 and time.time() < deadline:
+            time.sleep(0.005)
+        stats = limiter.stats()
+        assert stats["queue_depth"] == 1
+        assert stats["classes"]["polling"]["queue_depth"] == 1
+        limiter.configure(rate=100, burst=1)
+        t.join(2)
+        assert limiter.stats()["queue_depth"] == 0
+
+
+class TestStaleServing:
+    def test_cache_serves_stale_board_when_shed(self):
+        clock = FakeClock()
+        cache = BoardCache(clock=clock)
+        cache.put("1579", 1, {"CurrentPrice": 100})
+        clock.now = 30.0
+
+        def shed():
+            raise RateLimited("rate limited (ui)")
+
+        board = cache.get("1579", 1, shed, max_age=1.0, stale_on=(RateLimited,))
+        assert board == {"CurrentPrice": 100}
+        assert cache.stats()["stale"] == 1
+
+    def test_other_errors_still_propagate(self):
+        cache = BoardCache()
+        cache.put("1579", 1, {"CurrentPrice": 100})
+
+        def fail():
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            cache.get("1579", 1, fail, max_age=-1, stale_on=(RateLimited,))
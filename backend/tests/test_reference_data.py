@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import datetime
+import json
+
+import pytest
+
+from reference_data import JST, ReferenceDataCache, pivot_levels, previous_business_day, trading_day
+from tick_recorder import TickRecorder
+
+# 2024-03-04 (月) の前営業日は 2024-03-01 (金)
+MONDAY = datetime.datetime(2024, 3, 4, 9, 30, tzinfo=JST)
+FRIDAY = datetime.date(2024, 3, 1)
+
+
+class FakeDownloader:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def __call__(self, symbol, session, logger):
+        self.calls.append((symbol, session))
+        return self.result
+
+
+def make_cache(tmp_path, downloader, now=MONDAY, **kwargs):
+    clock = {"now": now}
+    cache = ReferenceDataCache(
+        "1579", directory=tmp_path / "ref", downloader=downloader, clock=lambda: clock["now"], **kwargs
+    )
+    return cache, clock
+
+
+def test_calendar_skips_weekends_and_holidays():
+    assert previous_business_day(datetime.date(2024, 3, 4)) == FRIDAY
+    # 2024-01-08 は成人の日
+    assert previous_business_day(datetime.date(2024, 1, 9)) == datetime.date(2024, 1, 5)
+    assert trading_day(datetime.date(2024, 3, 3)) == FRIDAY
+
+
+def test_pivot_levels():
+    levels = pivot_levels(305.0, 295.0, 300.0)
+    assert levels["P"] == pytest.approx(300.0)
+    assert levels["R1"] == pytest.approx(305.0)
+    assert levels["S1"] == pytest.approx(295.0)
+    assert levels["R3"] == pytest.approx(315.0)
+    assert levels["S3"] == pytest.approx(285.0)
+
+
+def test_downloads_once_per_day(tmp_path):
+    downloader = FakeDownloader((FRIDAY, 305.0, 295.0, 300.0))
+    cache, clock = make_cache(tmp_path, downloader)
+
+    first = cache.get()
+    for _ in range(100):
+        assert cache.get() is first
+    assert downloader.calls == [("1579", FRIDAY)]
+    assert first["source"] == "yfinance"
+    assert first["session"] == "2024-03-01"
+    assert first["P"] == pytest.approx(300.0)
+
+    # 日付が変わると翌日分を取得する
+    clock["now"] = MONDAY + datetime.timedelta(days=1)
+    cache.get()
+    assert downloader.calls[-1] == ("1579", datetime.date(2024, 3, 4))
+
+
+def test_restart_reads_disk_cache(tmp_path):
+    cache, _ = make_cache(tmp_path, FakeDownloader((FRIDAY, 305.0, 295.0, 300.0)))
+    levels = cache.get()
+    assert json.loads(cache.path(FRIDAY).read_text()) == levels
+
+    offline = FakeDownloader(None)
+    restarted, _ = make_cache(tmp_path, offline)
+    assert restarted.get() == levels
+    assert offline.calls == []
+
+
+def test_falls_back_to_recorded_ticks(tmp_path):
+    recorder = TickRecorder(tmp_path / "ticks", "1579", 1)
+    base = int(datetime.datetime(2024, 3, 1, 9, 0, tzinfo=JST).timestamp()) * 1_000_000_000
+    for i, price in enumerate([300.0, 310.0, 290.0, 302.0]):
+        recorder.record({"CurrentPrice": price}, ts_ns=base + i)
+    recorder.close()
+
+    cache, _ = make_cache(tmp_path, FakeDownloader(None), tick_dir=tmp_path / "ticks")
+    levels = cache.get()
+    assert levels["source"] == "ticks"
+    assert (levels["high"], levels["low"], levels["close"]) == (310.0, 290.0, 302.0)
+    # 近似値はディスクに保存しない
+    assert not cache.path(FRIDAY).exists()
+
+
+def test_falls_back_to_board(tmp_path):
+    board = {"PreviousClose": 300.0, "HighPrice": 304.0, "LowPrice": 301.0}
+    cache, _ = make_cache(tmp_path, FakeDownloader(None), board_loader=lambda: board)
+    levels = cache.get()
+    assert levels["source"] == "board"
+    assert (levels["high"], levels["low"], levels["close"]) == (304.0, 300.0, 300.0)
+
+
+def test_backs_off_after_total_failure(tmp_path):
+    downloader = FakeDownloader(None)
+    cache, _ = make_cache(tmp_path, downloader, retry_interval=3600)
+    assert cache.get() is None
+    assert cache.get() is None
+    assert len(downloader.calls) == 1
+
+    cache.retry_interval = 0
+    downloader.result = (FRIDAY, 305.0, 295.0, 300.0)
+    assert cache.get()["source"] == "yfinance"
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import datetime
+
+import numpy as np
+import pytest
+import yfinance
+
+import trading_data
+from kabus_transport import transport
+from replay import ReplayEngine
+from tick_recorder import JST, TICK_DTYPE, TickRecorder
+
+START_NS = int(datetime.datetime(2024, 3, 4, 9, 0, tzinfo=JST).timestamp()) * 1_000_000_000
+
+
+def make_ticks(n=160, step_ns=300_000_000):
+    rng = np.random.default_rng(7)
+    ticks = np.zeros(n, dtype=TICK_DTYPE)
+    ticks["ts_ns"] = START_NS + np.arange(n) * step_ns
+    ticks["price"] = np.round(300 + np.cumsum(rng.normal(0, 0.5, n)), 1)
+    return ticks
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("replay must not touch the network")
+
+    monkeypatch.setattr(yfinance, "download", fail)
+    monkeypatch.setattr(transport, "request", fail)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(trading_data.time, "sleep", lambda s: pytest.fail("replay must not sleep"))
+
+
+def test_replay_drives_pipeline_on_tick_time():
+    ticks = make_ticks()
+    result = ReplayEngine(ticks, pivot_hlc=(305.0, 295.0, 300.0)).run()
+
+    assert result.ticks == 160
+    assert result.bars == 40
+    # one buy-and-hold seed row, then one row per bar once the 9-bar spline window is full
+    assert len(result.equity) == 1 + (40 - 8)
+    expected_last = datetime.datetime.fromtimestamp(ticks["ts_ns"][-1] / 1e9, JST).replace(tzinfo=None)
+    assert result.equity.index[-1] == expected_last
+    assert result.equity["close"].iloc[-1] == ticks["price"][-1]
+    assert list(result.signals.columns) == ["time", "signal", "price"]
+    assert result.summary()["bars"] == 40
+
+
+def test_nan_prices_are_skipped():
+    ticks = make_ticks(n=8)
+    ticks["price"][3] = np.nan
+    result = ReplayEngine(ticks).run()
+    assert result.ticks == 7
+    assert result.bars == 1
+
+
+def test_from_recorded_file(tmp_path):
+    rec = TickRecorder(tmp_path, "1579")
+    for ts, price in zip(make_ticks()["ts_ns"].tolist(), make_ticks()["price"].tolist()):
+        rec.record({"CurrentPrice": price}, ts_ns=ts)
+    rec.close()
+    result = ReplayEngine.from_file(rec.path, pivot_hlc=(305.0, 295.0, 300.0)).run()
+    assert result.bars == 40
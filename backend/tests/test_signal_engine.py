@@ -0,0 +1,159 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import numpy as np
+
+from column_store import ColumnStore
+from initializations import Initializations
+from signal_engine import (
+    BUY, BUY_EXIT, CONTRACTING, CROSS_ABOVE, EMERGENCY_BUY_EXIT, EXPANDING, HEDGE_BUY_EXIT, HEDGE_SELL,
+    HEDGE_SELL_EXIT, HIST_UP, READY, SELL, SELL_EXIT, SIGNAL_COLUMNS, SPECIAL_SELL, SPECIAL_SELL_EXIT,
+    SPECIAL_EXIT_S, TREND_NEGATIVE, TREND_POSITIVE, SignalState, batch_signals, market_conditions,
+    rolling_spline_gradients, signal_columns, step,
+)
+from trading_data import TradingData
+
+UP = READY | EXPANDING | TREND_POSITIVE | HIST_UP
+DOWN_CONTRACTING = READY | CONTRACTING | TREND_NEGATIVE | CROSS_ABOVE
+
+
+def test_flat_state_opens_both_legs():
+    st = SignalState()
+    mask, performance = step(st, 300.0, 299.0, UP, bar_count=10)
+    assert mask == BUY | SELL
+    assert performance is None
+    assert (st.signal_position, st.signal_position1) == ('buy', 'sell')
+    assert st.entry_price == 300.0
+    assert st.position_entry_index == 10
+
+
+def test_profitable_sell_leg_exits_and_reopens():
+    st = SignalState(signal_position='sell', sell_entry_price=301.0, signal_position2='hedge_buy', cumulative_score=2)
+    mask, performance = step(st, 300.0, 299.0, UP, bar_count=20)
+    assert mask == SELL_EXIT | HEDGE_BUY_EXIT | BUY | SELL
+    assert performance == 3
+    assert (st.cumulative_score, st.previous_cumulative_score) == (3, 2)
+    assert (st.signal_position, st.signal_position1, st.signal_position2) == ('buy', 'sell', None)
+    assert st.cumulative_score_prev == 2
+
+
+def test_losing_leg_swaps_conditions():
+    st = SignalState(signal_position='sell', sell_entry_price=299.0)
+    mask, performance = step(st, 300.0, 299.0, UP, bar_count=20)
+    assert mask == 0
+    assert performance == -1
+    assert st.swap_signals
+    # 入れ替え後は同じ条件で買い側の決済として扱われる
+    st = SignalState(signal_position='buy', buy_entry_price=299.0, swap_signals=True)
+    mask, _ = step(st, 300.0, 299.0, UP, bar_count=20)
+    assert mask == BUY_EXIT | BUY | SELL
+
+
+def test_swapped_contracting_sell_branch_only_opens_from_flat():
+    st = SignalState(signal_position='sell', sell_entry_price=305.0, swap_signals=True)
+    assert step(st, 300.0, 299.0, DOWN_CONTRACTING, bar_count=5) == (0, None)
+    st = SignalState(swap_signals=True)
+    assert step(st, 300.0, 299.0, DOWN_CONTRACTING, bar_count=5)[0] == BUY | SELL
+
+
+def test_existing_exit_on_row_blocks_new_entry():
+    st = SignalState()
+    mask, _ = step(st, 300.0, 299.0, UP, bar_count=10, preset=SELL_EXIT)
+    assert mask == SELL_EXIT
+    assert st.signal_position is None
+
+
+def test_hedge_then_emergency_then_special_exit():
+    st = SignalState(signal_position='buy', buy_entry_price=300.0, position_entry_index=0)
+    mask, _ = step(st, 299.0, 299.5, 0, bar_count=30)
+    assert mask == HEDGE_SELL
+    assert st.signal_position2 == 'hedge_sell'
+
+    mask, _ = step(st, 298.0, 299.0, 0, bar_count=60)
+    assert mask == EMERGENCY_BUY_EXIT | HEDGE_SELL_EXIT | SPECIAL_SELL
+    assert st.special_sell_active and st.signal_position == 'special_sell'
+    assert (st.special_entry_price, st.original_entry_price, st.sell_entry_price) == (298.0, 300.0, 298.0)
+
+    flat = {'band_width': -1.0, 'adx_difference': -1.0, 'hist': 1.0, 'di_difference': 1.0}
+    calls = []
+
+    def gradients():
+        calls.append(1)
+        return flat
+
+    mask, _ = step(st, 298.0, 298.0, UP, bar_count=61, gradients=gradients)
+    assert mask == SPECIAL_SELL_EXIT | BUY
+    assert calls == [1]
+    assert not st.special_sell_active and st.signal_position == 'buy'
+    assert st.position_entry_index == 61
+
+
+def test_not_ready_only_snapshots_state():
+    st = SignalState(signal_position='sell', sell_entry_price=301.0, cumulative_score=4)
+    assert step(st, 300.0, 299.0, 0, bar_count=3) == (0, None)
+    assert st.signal_position == st.signal_position_prev == 'sell'
+    assert st.cumulative_score == st.cumulative_score_prev == 4
+
+
+def test_market_conditions_vectorizes():
+    rng = np.random.default_rng(0)
+    args = [rng.choice([-1.0, 0.0, 1.0, np.nan], 200) for _ in range(10)]
+    pivots = [0.5, 1.0, 2.0, -0.5, -1.0, -2.0]
+    batch = market_conditions(*args, *pivots)
+    for i in range(200):
+        assert batch[i] == market_conditions(*[float(a[i]) for a in args], *pivots)
+
+
+def test_generate_signals_writes_latest_row():
+    init = Initializations()
+    trading_data = TradingData(init, token=None)
+    data = ColumnStore(['close', 'trend_check_data', 'trend_check_data2', 'hist_diff',
+                        'di_difference_diff', 'adx_difference_diff', 'band_width_diff'])
+    for i, close in enumerate([299.0, 299.5, 300.0]):
+        data.append(i, {'close': close, 'trend_check_data': 1.0, 'trend_check_data2': 1.0, 'hist_diff': 1.0,
+                        'di_difference_diff': 1.0, 'adx_difference_diff': 1.0, 'band_width_diff': 1.0})
+    init.interpolated_data = data
+
+    trading_data.generate_signals(data, 0, 0, 0, 0, 0, 0)
+    assert signal_columns(sum(1 << i for i, c in enumerate(SIGNAL_COLUMNS) if data.last(c) == 1)) == \
+        ['buy_signals', 'sell_signals']
+    assert data.column('buy_signals')[:2].tolist() == [0, 0]
+    assert (init.signal_position, init.signal_position1, init.entry_price) == ('buy', 'sell', 300.0)
+    assert init.position_entry_index == 3
+    assert init.prev_special_sell_active is False
+
+
+def test_batch_signals_match_live_path():
+    rng = np.random.default_rng(1)
+    n = 400
+    # 買いの片側ポジションから下落させ、ヘッジ・緊急決済・特別ポジションとその解消の経路も通す
+    close = np.round(300 + np.cumsum(rng.choice([-0.3, 0.0, 0.3], n, p=[0.45, 0.2, 0.35])), 1)
+    features = {c: rng.choice([-1.0, 0.0, 0.0, 0.0, 1.0], n) for c in
+                ['trend_check_data', 'trend_check_data2', 'hist_diff', 'di_difference_diff',
+                 'adx_difference_diff', 'band_width_diff']}
+    raw = {key: rng.normal(0, 1, n + 8) for key in SPECIAL_EXIT_S}
+    pivots = (300.5, 301.5, 302.5, 299.5, 298.5, 297.5)
+    start = dict(signal_position='buy', buy_entry_price=300.5, position_entry_index=0)
+
+    init = Initializations()
+    SignalState(**start).apply_to(init)
+    trading_data = TradingData(init, token=None)
+    data = ColumnStore(['close'] + list(features))
+    init.interpolated_data = data
+    for i in range(n):
+        data.append(i, {'close': close[i], **{c: v[i] for c, v in features.items()}})
+        for key in SPECIAL_EXIT_S:
+            init.latest_data[key] = list(raw[key][i:i + 9])
+        trading_data.generate_signals(data, *pivots)
+
+    gradients = {key: values[8:] for key, values in rolling_spline_gradients(raw).items()}
+    signals, performance, state = batch_signals(close, *features.values(), pivots=pivots, gradients=gradients,
+                                                state=SignalState(**start))
+    fired = {c for c in SIGNAL_COLUMNS if signals[c].any()}
+    assert {'hedge_sell_signals', 'special_sell_signals', 'special_sell_exit_signals'} <= fired
+    for col in SIGNAL_COLUMNS:
+        np.testing.assert_array_equal(signals[col], np.nan_to_num(data.column(col)), err_msg=col)
+    assert performance[-1] == init.cumulative_score
+    assert state.signal_position == init.signal_position
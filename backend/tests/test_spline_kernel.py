@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import numpy as np
+import pytest
+from scipy.interpolate import UnivariateSpline
+
+from initializations import Initializations
+from spline_kernel import SplineKernel
+from trading_data import TradingData
+
+S_VALUES = [0.000185, 0.00000185, 18.5, 1.85]
+
+
+def scipy_path(rows, s_values):
+    x = np.arange(rows.shape[1])
+    values = np.array([UnivariateSpline(x, y, s=s)(x) for y, s in zip(rows, s_values)])
+    diff1 = np.array([np.gradient(v) for v in values])
+    diff2 = np.array([np.gradient(np.gradient(v)) for v in values])
+    return values, diff1, diff2
+
+
+def random_rows(rng, count, scale):
+    rows = rng.normal(0, scale, (count, 8))
+    rows[::2] = np.cumsum(rows[::2], axis=1)
+    return rows
+
+
+@pytest.mark.parametrize("scale", [1e-4, 1e-2, 1.0, 5.0])
+@pytest.mark.parametrize("s", S_VALUES)
+def test_matches_univariate_spline(scale, s):
+    rows = random_rows(np.random.default_rng(int(scale * 1e4) + int(s * 1e6)), 200, scale)
+    expected = scipy_path(rows, [s] * len(rows))
+    actual = SplineKernel().smooth(rows, s)
+    for a, e in zip(actual, expected):
+        np.testing.assert_allclose(a, e, rtol=1e-7, atol=1e-12 * max(scale, 1.0))
+
+
+def test_covers_every_knot_configuration():
+    # s が小さい系列から大きい系列まで、多項式・ノット追加・補間スプラインの全ての経路を通す
+    rows = random_rows(np.random.default_rng(3), 400, 3.0)
+    s_values = np.geomspace(1e-3, 1e3, len(rows))
+    x = np.arange(8)
+    knots = {len(UnivariateSpline(x, y, s=s).get_knots()) for y, s in zip(rows, s_values)}
+    assert knots == {2, 3, 4, 5, 6}
+
+    kernel = SplineKernel()
+    actual = kernel.smooth(rows, s_values)
+    expected = scipy_path(rows, s_values)
+    for a, e in zip(actual, expected):
+        np.testing.assert_allclose(a, e, rtol=1e-7, atol=1e-10)
+
+
+def test_nine_point_grid_and_interpolation():
+    rows = random_rows(np.random.default_rng(5), 20, 1.0)
+    rows9 = np.hstack([rows, rows[:, :1]])
+    np.testing.assert_allclose(SplineKernel().smooth(rows9, 0.5)[0], scipy_path(rows9, [0.5] * 20)[0], rtol=1e-7, atol=1e-10)
+    np.testing.assert_allclose(SplineKernel().smooth(rows, 0.0)[0], rows, atol=1e-10)
+
+
+def test_non_finite_rows_are_nan():
+    rows = np.ones((2, 8))
+    rows[0, 3] = np.nan
+    values, diff1, diff2 = SplineKernel().smooth(rows, 1.0)
+    assert np.isnan(values[0]).all() and np.isnan(diff2[0]).all()
+    np.testing.assert_allclose(values[1], 1.0)
+
+
+def test_check_mode_records_deviation():
+    rows = random_rows(np.random.default_rng(9), 50, 3.0)
+    kernel = SplineKernel(check=True)
+    kernel.smooth(rows, 18.5)
+    assert kernel.mismatches == 0
+    assert kernel.max_deviation < 1e-8
+
+    strict = SplineKernel(check=True, rtol=0.0, atol=-1.0)
+    values = strict.smooth(rows[:3], 18.5)[0]
+    assert strict.mismatches == 3
+    np.testing.assert_array_equal(values, scipy_path(rows[:3], [18.5] * 3)[0])
+
+
+def test_trading_data_matches_per_series_splines():
+    def run(kernel):
+        init = Initializations()
+        trading_data = TradingData(init, token=None)
+        trading_data.spline_kernel = kernel
+        rng = np.random.default_rng(11)
+        for i in range(12):
+            init.df.append(np.datetime64("2024-03-04T09:00") + i, 300, 301, 299, 300 + rng.normal())
+            scales = {'band_width': 0.01, 'hist': 0.001, 'di_difference': 5.0, 'adx_difference': 1.0,
+                      'upper_band': 1.0, 'lower_band': 1.0}
+            for name, scale in scales.items():
+                init.df.column(name, create=True)[-1] = rng.normal(0, scale)
+            trading_data.update_latest_9_data(init.df['band_width'], init.df['hist'],
+                                              init.df['di_difference'], init.df['adx_difference'])
+        return init.interpolated_data.to_frame()
+
+    batched = run(SplineKernel())
+    reference = run(None)
+    for column in ['band_width', 'hist', 'di_difference', 'adx_difference',
+                   'band_width_diff', 'hist_diff', 'di_difference_diff', 'adx_difference_diff']:
+        np.testing.assert_allclose(batched[column].astype(float), reference[column].astype(float), rtol=1e-7, atol=1e-9)
@@ -1,240 +1,496 @@
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
-import sqlite3
-import pytest
-from unittest.mock import patch
-import datetime as dt
-
-import trade_history
-
-
-@pytest.fixture(autouse=True)
-def use_temp_db(tmp_path, monkeypatch):
-    """Use a temporary database for each test."""
-    db_path = tmp_path / "test_trades.db"
-    monkeypatch.setattr(trade_history, "DB_PATH", db_path)
-    # Reset thread-local connection
-    if hasattr(trade_history._local, "conn"):
-        trade_history._local.conn = None
-    trade_history.init_db()
-    yield
-    if hasattr(trade_history._local, "conn") and trade_history._local.conn:
-        trade_history._local.conn.close()
-        trade_history._local.conn = None
-
-
-class TestRecordTrade:
-    def test_record_entry_trade(self):
-        trade_id = trade_history.record_trade(
-            symbol="8306", side="buy", quantity=100,
-            exec_price=1234.5, trade_type="entry",
-        )
-        assert trade_id == 1
-        trades = trade_history.get_trades()
-        assert len(trades) == 1
-        t = trades[0]
-        assert t["symbol"] == "8306"
-        assert t["side"] == "buy"
-        assert t["quantity"] == 100
-        assert t["exec_price"] == 1234.5
-        assert t["trade_type"] == "entry"
-        assert t["realized_pl"] is None
-        assert t["related_trade_id"] is None
-
-    def test_record_exit_trade_with_pl(self):
-        entry_id = trade_history.record_trade(
-            symbol="8306", side="buy", quantity=100,
-            exec_price=1200.0, trade_type="entry",
-        )
-        exit_id = trade_history.record_trade(
-            symbol="8306", side="sell", quantity=100,
-            exec_price=1250.0, trade_type="exit",
-            related_trade_id=entry_id,
-            realized_pl=5000.0,
-        )
-        assert exit_id == 2
-        trades = trade_history.get_trades()
-        exit_trade = next(t for t in trades if t["id"] == exit_id)
-        assert exit_trade["trade_type"] == "exit"
-        assert exit_trade["related_trade_id"] == entry_id
-        assert exit_trade["realized_pl"] == 5000.0
-
-    def test_record_emergency_exit(self):
-        trade_id = trade_history.record_trade(
-            symbol="8306", side="sell", quantity=100,
-            exec_price=1150.0, trade_type="emergency_exit",
-            note="stop loss triggered",
-        )
-        trades = trade_history.get_trades()
-        assert trades[0]["trade_type"] == "emergency_exit"
-        assert trades[0]["note"] == "stop loss triggered"
-
-    def test_record_force_close(self):
-        trade_id = trade_history.record_trade(
-            symbol="8306", side="sell", quantity=100,
-            exec_price=1100.0, trade_type="force_close",
-        )
-        trades = trade_history.get_trades()
-        assert trades[0]["trade_type"] == "force_close"
-
-    def test_returns_autoincrement_id(self):
-        id1 = trade_history.record_trade("8306", "buy", 100, 1200.0)
-        id2 = trade_history.record_trade("8306", "sell", 100, 1250.0)
-        assert id2 == id1 + 1
-
-
-class TestGetTrades:
-    def test_empty_returns_empty_list(self):
-        assert trade_history.get_trades() == []
-
-    def test_limit(self):
-        for i in range(10):
-            trade_history.record_trade("8306", "buy", 100, 1200.0 + i)
-        trades = trade_history.get_trades(limit=3)
-        assert len(trades) == 3
-
-    def test_filter_by_symbol(self):
-        trade_history.record_trade("8306", "buy", 100, 1200.0)
-        trade_history.record_trade("9433", "buy", 200, 3500.0)
-        trade_history.record_trade("8306", "sell", 100, 1250.0)
-        trades = trade_history.get_trades(symbol="8306")
-        assert len(trades) == 2
-        assert all(t["symbol"] == "8306" for t in trades)
-
-    def test_ordered_by_timestamp_desc(self):
-        trade_history.record_trade("8306", "buy", 100, 1200.0)
-        trade_history.record_trade("8306", "sell", 100, 1250.0)
-        trades = trade_history.get_trades()
-        assert trades[0]["id"] > trades[1]["id"]
-
-
-class TestGetTradeSummary:
-    def test_empty_summary(self):
-        summary = trade_history.get_trade_summary()
-        assert summary["total_trades"] == 0
-        assert summary["total_realized_pl"] == 0
-        assert summary["win_rate"] == 0
-
-    def test_summary_with_wins_and_losses(self):
-        # 2 winning exits, 1 losing exit
-        e1 = trade_history.record_trade("8306", "buy", 100, 1200.0, "entry")
-        trade_history.record_trade("8306", "sell", 100, 1250.0, "exit", e1, 5000.0)
-        e2 = trade_history.record_trade("8306", "buy", 100, 1300.0, "entry")
-        trade_history.record_trade("8306", "sell", 100, 1320.0, "exit", e2, 2000.0)
-        e3 = trade_history.record_trade("8306", "buy", 100, 1350.0, "entry")
-        trade_history.record_trade("8306", "sell", 100, 1330.0, "exit", e3, -2000.0)
-
-        summary = trade_history.get_trade_summary()
-        assert summary["total_trades"] == 6
-        assert summary["entries"] == 3
-        assert summary["exits"] == 3
-        assert summary["total_realized_pl"] == 5000.0
-        assert summary["win_trades"] == 2
-        assert summary["loss_trades"] == 1
-        assert summary["win_rate"] == pytest.approx(66.7, abs=0.1)
-        assert summary["avg_win"] == 3500.0
-        assert summary["avg_loss"] == -2000.0
-        assert summary["max_win"] == 5000.0
-        assert summary["max_loss"] == -2000.0
-
-    def test_entries_only_no_exits(self):
-        trade_history.record_trade("8306", "buy", 100, 1200.0, "entry")
-        summary = trade_history.get_trade_summary()
-        assert summary["total_trades"] == 1
-        assert summary["entries"] == 1
-        assert summary["exits"] == 0
-        assert summary["win_rate"] == 0
-
-
-class TestGetMarginDaily:
-    def test_empty_returns_empty_list(self):
-        assert trade_history.get_margin_daily() == []
-
-    def test_margin_change_calculation(self):
-        conn = trade_history._get_conn()
-        # Insert snapshots for 2 days
-        conn.execute(
-            "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            ("2026-02-28", "2026-02-28T15:00:00+09:00", "8306", 0, 1000000, 3000000, 0),
-        )
-        conn.execute(
-            "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            ("2026-03-01", "2026-03-01T15:00:00+09:00", "8306", 5000, 1005000, 3015000, 0),
-        )
-        conn.commit()
-
-        result = trade_history.get_margin_daily(days=7)
-        assert len(result) == 2
-        # First day has no previous, so margin_change is None
-        assert result[0]["margin_change"] is None
-        assert result[0]["wallet_margin"] == 3000000
-        # Second day shows change
-        assert result[1]["margin_change"] == 15000.0
-        assert result[1]["wallet_margin"] == 3015000
-
-
-class TestImportTradesFromApi:
-    def _make_order(self, order_id, symbol, side, price, qty, state=5):
-        return {
-            "ID": order_id,
-            "Symbol": symbol,
-            "Side": side,  # "2"=buy, "1"=sell
-            "Price": 0.0,
-            "CumQty": float(qty),
-            "State": state,
-            "RecvTime": f"2026-02-26T09:00:00+09:00",
-            "Details": [
-                {"SeqNum": 1, "Price": 0.0, "Qty": float(qty), "ExecutionID": None},
-                {"SeqNum": 5, "Price": price, "Qty": float(qty), "ExecutionID": f"E{order_id}"},
-            ],
-        }
-
-    def test_import_buy_sell_pair(self):
-        orders = [
-            self._make_order("ORD001", "1579", "2", 634.0, 100),  # buy
-            self._make_order("ORD002", "1579", "1", 618.0, 100),  # sell
-        ]
-        # Ensure second order has later timestamp
-        orders[1]["RecvTime"] = "2026-02-27T09:00:00+09:00"
-
-        count = trade_history.import_trades_from_api(orders)
-        assert count == 2
-
-        trades = trade_history.get_trades()
-        assert len(trades) == 2
-        # Sorted by timestamp DESC, so sell (exit) first
-        exit_trade = trades[0]
-        entry_trade = trades[1]
-        assert entry_trade["side"] == "buy"
-        assert entry_trade["exec_price"] == 634.0
-        assert entry_trade["trade_type"] == "entry"
-        assert exit_trade["side"] == "sell"
-        assert exit_trade["exec_price"] == 618.0
-        assert exit_trade["trade_type"] == "exit"
-        assert exit_trade["realized_pl"] == (618.0 - 634.0) * 100  # -1600
-
-    def test_skip_non_completed_orders(self):
-        orders = [
-            self._make_order("ORD003", "1579", "2", 634.0, 100, state=3),  # not completed
-        ]
-        count = trade_history.import_trades_from_api(orders)
-        assert count == 0
-        assert trade_history.get_trades() == []
-
-    def test_skip_already_imported(self):
-        orders = [
-            self._make_order("ORD004", "1579", "2", 634.0, 100),
-        ]
-        trade_history.import_trades_from_api(orders)
-        # Import again — should skip
-        count = trade_history.import_trades_from_api(orders)
-        assert count == 0
-        assert len(trade_history.get_trades()) == 1
-
-    def test_empty_orders(self):
-        assert trade_history.import_trades_from_api([]) == 0
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sqlite3
+import time
+import pytest
+from unittest.mock import patch
+import datetime as dt
+
+import trade_history
+
+
+@pytest.fixture(autouse=True)
+def use_temp_db(tmp_path, monkeypatch):
+    """Use a temporary database for each test."""
+    db_path = tmp_path / "test_trades.db"
+    monkeypatch.setattr(trade_history, "DB_PATH", db_path)
+    # Reset thread-local connection
+    if hasattr(trade_history._local, "conn"):
+        trade_history._local.conn = None
+    trade_history.init_db()
+    yield
+    if hasattr(trade_history._local, "conn") and trade_history._local.conn:
+        trade_history._local.conn.close()
+        trade_history._local.conn = None
+
+
+class TestRecordTrade:
+    def test_record_entry_trade(self):
+        trade_id = trade_history.record_trade(
+            symbol="8306", side="buy", quantity=100,
+            exec_price=1234.5, trade_type="entry",
+        )
+        assert trade_id == 1
+        trades = trade_history.get_trades()
+        assert len(trades) == 1
+        t = trades[0]
+        assert t["symbol"] == "8306"
+        assert t["side"] == "buy"
+        assert t["quantity"] == 100
+        assert t["exec_price"] == 1234.5
+        assert t["trade_type"] == "entry"
+        assert t["realized_pl"] is None
+        assert t["related_trade_id"] is None
+
+    def test_record_exit_trade_with_pl(self):
+        entry_id = trade_history.record_trade(
+            symbol="8306", side="buy", quantity=100,
+            exec_price=1200.0, trade_type="entry",
+        )
+        exit_id = trade_history.record_trade(
+            symbol="8306", side="sell", quantity=100,
+            exec_price=1250.0, trade_type="exit",
+            related_trade_id=entry_id,
+            realized_pl=5000.0,
+        )
+        assert exit_id == 2
+        trades = trade_history.get_trades()
+        exit_trade = next(t for t in trades if t["id"] == exit_id)
+        assert exit_trade["trade_type"] == "exit"
+        assert exit_trade["related_trade_id"] == entry_id
+        assert exit_trade["realized_pl"] == 5000.0
+
+    def test_record_emergency_exit(self):
+        trade_id = trade_history.record_trade(
+            symbol="8306", side="sell", quantity=100,
+            exec_price=1150.0, trade_type="emergency_exit",
+            note="stop loss triggered",
+        )
+        trades = trade_history.get_trades()
+        assert trades[0]["trade_type"] == "emergency_exit"
+        assert trades[0]["note"] == "stop loss triggered"
+
+    def test_record_force_close(self):
+        trade_id = trade_history.record_trade(
+            symbol="8306", side="sell", quantity=100,
+            exec_price=1100.0, trade_type="force_close",
+        )
+        trades = trade_history.get_trades()
+        assert trades[0]["trade_type"] == "force_close"
+
+    def test_returns_autoincrement_id(self):
+        id1 = trade_history.record_trade("8306", "buy", 100, 1200.0)
+        id2 = trade_history.record_trade("8306", "sell", 100, 1250.0)
+        assert id2 == id1 + 1
+
+
+class TestGetTrades:
+    def test_empty_returns_empty_list(self):
+        assert trade_history.get_trades() == []
+
+    def test_limit(self):
+        for i in range(10):
+            trade_history.record_trade("8306", "buy", 100, 1200.0 + i)
+        trades = trade_history.get_trades(limit=3)
+        assert len(trades) == 3
+
+    def test_filter_by_symbol(self):
+        trade_history.record_trade("8306", "buy", 100, 1200.0)
+        trade_history.record_trade("9433", "buy", 200, 3500.0)
+        trade_history.record_trade("8306", "sell", 100, 1250.0)
+        trades = trade_history.get_trades(symbol="8306")
+        assert len(trades) == 2
+        assert all(t["symbol"] == "8306" for t in trades)
+
+    def test_ordered_by_timestamp_desc(self):
+        trade_history.record_trade("8306", "buy", 100, 1200.0)
+        trade_history.record_trade("8306", "sell", 100, 1250.0)
+        trades = trade_history.get_trades()
+        assert trades[0]["id"] > trades[1]["id"]
+
+
+class TestGetTradeSummary:
+    def test_empty_summary(self):
+        summary = trade_history.get_trade_summary()
+        assert summary["total_trades"] == 0
+        assert summary["total_realized_pl"] == 0
+        assert summary["win_rate"] == 0
+
+    def test_summary_with_wins_and_losses(self):
+        # 2 winning exits, 1 losing exit
+        e1 = trade_history.record_trade("8306", "buy", 100, 1200.0, "entry")
+        trade_history.record_trade("8306", "sell", 100, 1250.0, "exit", e1, 5000.0)
+        e2 = trade_history.record_trade("8306", "buy", 100, 1300.0, "entry")
+        trade_history.record_trade("8306", "sell", 100, 1320.0, "exit", e2, 2000.0)
+        e3 = trade_history.record_trade("8306", "buy", 100, 1350.0, "entry")
+        trade_history.record_trade("8306", "sell", 100, 1330.0, "exit", e3, -2000.0)
+
+        summary = trade_history.get_trade_summary()
+        assert summary["total_trades"] == 6
+        assert summary["entries"] == 3
+        assert summary["exits"] == 3
+        assert summary["total_realized_pl"] == 5000.0
+        assert summary["win_trades"] == 2
+        assert summary["loss_trades"] == 1
+        assert summary["win_rate"] == pytest.approx(66.7, abs=0.1)
+        assert summary["avg_win"] == 3500.0
+        assert summary["avg_loss"] == -2000.0
+        assert summary["max_win"] == 5000.0
+        assert summary["max_loss"] == -2000.0
+
+    def test_entries_only_no_exits(self):
+        trade_history.record_trade("8306", "buy", 100, 1200.0, "entry")
+        summary = trade_history.get_trade_summary()
+        assert summary["total_trades"] == 1
+        assert summary["entries"] == 1
+        assert summary["exits"] == 0
+        assert summary["win_rate"] == 0
+
+
+class TestGetMarginDaily:
+    def test_empty_returns_empty_list(self):
+        assert trade_history.get_margin_daily() == []
+
+    def test_margin_change_calculation(self):
+        conn = trade_history._get_conn()
+        # Insert snapshots for 2 days
+        conn.execute(
+            "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ("2026-02-28", "2026-02-28T15:00:00+09:00", "8306", 0, 1000000, 3000000, 0),
+        )
+        conn.execute(
+            "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ("2026-03-01", "2026-03-01T15:00:00+09:00", "8306", 5000, 1005000, 3015000, 0),
+        )
+        conn.commit()
+
+        result = trade_history.get_margin_daily(days=7)
+        assert len(result) == 2
+        # First day has no previous, so margin_change is None
+        assert result[0]["margin_change"] is None
+        assert result[0]["wallet_margin"] == 3000000
+        # Second day shows change
+        assert result[1]["margin_change"] == 15000.0
+        assert result[1]["wallet_margin"] == 3015000
+
+
+class TestDailySummary:
+    OLD_DAILY = (
+        "SELECT date, MAX(timestamp) as timestamp, symbol, ROUND(AVG(pl_total), 0) as pl_total, "
+        "ROUND(MAX(wallet_cash), 0) as wallet_cash, ROUND(MAX(wallet_margin), 0) as wallet_margin, "
+        "MAX(positions_count) as positions_count FROM daily_pl GROUP BY date ORDER BY date"
+    )
+    OLD_CLOSING = (
+        "SELECT date, (SELECT pl_total FROM daily_pl d2 WHERE d2.date = d1.date "
+        "ORDER BY timestamp DESC LIMIT 1) as closing_pl FROM (SELECT DISTINCT date FROM daily_pl) d1 ORDER BY date"
+    )
+
+    def _insert_snapshots(self, conn, count=300):
+        import random
+        rng = random.Random(7)
+        today = dt.datetime.now(trade_history.JST).date()
+        for i in range(count):
+            day = today - dt.timedelta(days=rng.randrange(5))
+            ts = f"{day.isoformat()}T{rng.randrange(9, 15):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}+09:00"
+            pick = lambda v: None if rng.random() < 0.1 else v
+            conn.execute(
+                "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (day.isoformat(), ts, rng.choice(["8306", "1579"]), pick(rng.uniform(-5000, 5000)),
+                 pick(rng.uniform(1e6, 2e6)), pick(rng.uniform(3e6, 4e6)), rng.randrange(4)),
+            )
+        conn.commit()
+
+    def test_summary_matches_raw_aggregation(self):
+        conn = trade_history._get_conn()
+        self._insert_snapshots(conn)
+        old = [dict(r) for r in conn.execute(self.OLD_DAILY)]
+        new = trade_history.get_daily_pl(days=10)
+        # symbol is the closing snapshot's; the old bare column was whichever row SQLite picked
+        assert [(r["date"], r["timestamp"], r["wallet_cash"], r["wallet_margin"], r["positions_count"])
+                for r in old] == \
+               [(r["date"], r["timestamp"], r["wallet_cash"], r["wallet_margin"], r["positions_count"])
+                for r in new]
+        closing_symbols = conn.execute(
+            "SELECT symbol FROM daily_pl d1 WHERE timestamp = (SELECT MAX(timestamp) FROM daily_pl d2 "
+            "WHERE d2.date = d1.date) ORDER BY date").fetchall()
+        assert [r["symbol"] for r in new] == [r[0] for r in closing_symbols]
+        for o, n in zip(old, new):
+            assert o["pl_total"] == pytest.approx(n["pl_total"], abs=1)
+
+        closing = [r["closing_pl"] for r in conn.execute(self.OLD_CLOSING) if r["closing_pl"] is not None]
+        stats = trade_history.get_trade_stats(days=10)
+        assert stats["trading_days"] == len(closing)
+        assert stats["total_pl"] == round(sum(closing), 0)
+        assert [r["wallet_margin"] for r in trade_history.get_margin_daily(days=10)] == \
+               [r["wallet_margin"] for r in old]
+
+    def test_existing_snapshots_are_backfilled(self):
+        conn = trade_history._get_conn()
+        conn.execute("DROP TRIGGER trg_daily_pl_summary")
+        conn.execute("DROP TABLE daily_summary")
+        self._insert_snapshots(conn, count=50)
+        trade_history.init_db()
+        summary = [dict(r) for r in conn.execute(
+            "SELECT date, last_timestamp as timestamp, closing_pl, snapshots FROM daily_summary ORDER BY date")]
+        assert sum(r["snapshots"] for r in summary) == 50
+        assert [r["closing_pl"] for r in summary] == [r["closing_pl"] for r in conn.execute(self.OLD_CLOSING)]
+
+
+class TestPlSnapshotRetention:
+    def _insert_day(self, conn, date, count):
+        for i in range(count):
+            conn.execute(
+                "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (date, f"{date}T{9 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}.5+09:00", "1579",
+                 float(i), 1e6, 3e6 + i, i % 3),
+            )
+        conn.commit()
+
+    def test_change_filter_skips_repeats_until_heartbeat(self):
+        clock = [0.0]
+        f = trade_history.PlChangeFilter(heartbeat=300, clock=lambda: clock[0])
+        assert f.changed("1579", 1000.2, 1e6, 3e6, 1)
+        clock[0] = 30
+        assert not f.changed("1579", 999.8, 1e6, 3e6, 1)   # same yen
+        clock[0] = 60
+        assert f.changed("1579", 1001.0, 1e6, 3e6, 1)
+        clock[0] = 90
+        assert f.changed("1579", 1001.0, 1e6, 3e6, 2)
+        clock[0] = 389
+        assert not f.changed("1579", 1001.0, 1e6, 3e6, 2)
+        clock[0] = 390
+        assert f.changed("1579", 1001.0, 1e6, 3e6, 2)      # heartbeat
+        assert (f.written, f.skipped) == (4, 2)
+
+    def test_rollups_keep_closing_values(self):
+        conn = trade_history._get_conn()
+        self._insert_day(conn, "2026-10-10", 150)
+        result = trade_history.maintain_pl_history(now=dt.datetime(2026, 10, 12, tzinfo=trade_history.JST))
+        assert (result["minute_buckets"], result["hour_buckets"], result["raw_pruned"]) == (3, 1, 0)
+        minutes = [dict(r) for r in conn.execute("SELECT * FROM daily_pl_1m ORDER BY bucket")]
+        assert [(m["pl_total"], m["pl_min"], m["pl_max"], m["samples"]) for m in minutes] == \
+               [(59.0, 0.0, 59.0, 60), (119.0, 60.0, 119.0, 60), (149.0, 120.0, 149.0, 30)]
+        assert minutes[0]["timestamp"] == "2026-10-10T09:00:00+09:00"
+        hour = dict(conn.execute("SELECT * FROM daily_pl_1h").fetchone())
+        assert (hour["pl_total"], hour["pl_min"], hour["pl_max"], hour["samples"]) == (149.0, 0.0, 149.0, 150)
+        assert hour["wallet_margin"] == 3e6 + 149
+
+        # the partial last minute is recomputed on the next pass
+        self._insert_day(conn, "2026-10-11", 10)
+        conn.execute(
+            "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+            "VALUES ('2026-10-10', '2026-10-10T09:02:45+09:00', '1579', -5, 1e6, 3e6, 0)"
+        )
+        conn.commit()
+        trade_history.maintain_pl_history(now=dt.datetime(2026, 10, 12, tzinfo=trade_history.JST))
+        last = dict(conn.execute("SELECT * FROM daily_pl_1m WHERE bucket = '2026-10-10T09:02'").fetchone())
+        assert (last["pl_min"], last["samples"]) == (-5.0, 31)
+
+    def test_prunes_whole_rolled_up_days(self):
+        conn = trade_history._get_conn()
+        self._insert_day(conn, "2026-10-01", 120)
+        self._insert_day(conn, "2026-10-09", 120)
+        result = trade_history.maintain_pl_history(
+            raw_retention_days=7, minute_retention_days=0,
+            now=dt.datetime(2026, 10, 10, tzinfo=trade_history.JST),
+        )
+        assert (result["raw_pruned"], result["minute_pruned"]) == (120, 0)
+        assert conn.execute("SELECT DISTINCT date FROM daily_pl").fetchall()[0][0] == "2026-10-09"
+        # daily_summary is insert-maintained and survives pruning
+        assert [r["date"] for r in trade_history.get_daily_pl(days=3650)] == ["2026-10-01", "2026-10-09"]
+
+    def test_timeline_picks_table_that_fits(self):
+        conn = trade_history._get_conn()
+        self._insert_day(conn, "2026-10-09", 600)
+        trade_history.maintain_pl_history(now=dt.datetime(2026, 10, 10, tzinfo=trade_history.JST))
+        assert len(trade_history.get_pl_timeline("2026-10-09", limit=1000)) == 600
+        minutes = trade_history.get_pl_timeline("2026-10-09", limit=500)
+        assert len(minutes) == 10 and minutes[-1]["pl_total"] == 599.0
+        assert len(trade_history.get_pl_timeline("2026-10-09", limit=5)) == 1
+        assert len(trade_history.get_pl_timeline("2026-10-09", resolution="raw")) == 500
+        assert trade_history.get_pl_timeline("2026-10-08") == []
+
+
+class TestImportTradesFromApi:
+    def _make_order(self, order_id, symbol, side, price, qty, state=5):
+        return {
+            "ID": order_id,
+            "Symbol": symbol,
+            "Side": side,  # "2"=buy, "1"=sell
+            "Price": 0.0,
+            "CumQty": float(qty),
+            "State": state,
+            "RecvTime": f"2026-02-26T09:00:00+09:00",
+            "Details": [
+                {"SeqNum": 1, "Price": 0.0, "Qty": float(qty), "ExecutionID": None},
+                {"SeqNum": 5, "Price": price, "Qty": float(qty), "ExecutionID": f"E{order_id}"},
+            ],
+        }
+
+    def test_import_buy_sell_pair(self):
+        orders = [
+            self._make_order("ORD001", "1579", "2", 634.0, 100),  # buy
+            self._make_order("ORD002", "1579", "1", 618.0, 100),  # sell
+        ]
+        # Ensure second order has later timestamp
+        orders[1]["RecvTime"] = "2026-02-27T09:00:00+09:00"
+
+        count = trade_history.import_trades_from_api(orders)
+        assert count == 2
+
+        trades = trade_history.get_trades()
+        assert len(trades) == 2
+        # Sorted by timestamp DESC, so sell (exit) first
+        exit_trade = trades[0]
+        entry_trade = trades[1]
+        assert entry_trade["side"] == "buy"
+        assert entry_trade["exec_price"] == 634.0
+        assert entry_trade["trade_type"] == "entry"
+        assert exit_trade["side"] == "sell"
+        assert exit_trade["exec_price"] == 618.0
+        assert exit_trade["trade_type"] == "exit"
+        assert exit_trade["realized_pl"] == (618.0 - 634.0) * 100  # -1600
+
+    def test_skip_non_completed_orders(self):
+        orders = [
+            self._make_order("ORD003", "1579", "2", 634.0, 100, state=3),  # not completed
+        ]
+        count = trade_history.import_trades_from_api(orders)
+        assert count == 0
+        assert trade_history.get_trades() == []
+
+    def test_skip_already_imported(self):
+        orders = [
+            self._make_order("ORD004", "1579", "2", 634.0, 100),
+        ]
+        trade_history.import_trades_from_api(orders)
+        # Import again — should skip
+        count = trade_history.import_trades_from_api(orders)
+        assert count == 0
+        assert len(trade_history.get_trades()) == 1
+
+    def test_empty_orders(self):
+        assert trade_history.import_trades_from_api([]) == 0
+
+    def test_reimport_full_day_uses_order_id_index(self):
+        orders = []
+        for i in range(2000):
+            order = self._make_order(f"ORD{i:05d}", "1579", "2" if i % 2 == 0 else "1", 600.0 + i % 7, 100)
+            order["RecvTime"] = f"2026-02-26T09:{i // 60 % 60:02d}:{i % 60:02d}+09:00"
+            orders.append(order)
+        assert trade_history.import_trades_from_api(orders + orders[:5]) == 2000
+
+        trades = {t["order_id"]: t for t in trade_history.get_trades(limit=5000)}
+        assert trades["ORD00001"]["related_trade_id"] == trades["ORD00000"]["id"]
+        assert trades["ORD00001"]["realized_pl"] == (601.0 - 600.0) * 100
+
+        started = time.perf_counter()
+        assert trade_history.import_trades_from_api(orders) == 0
+        assert time.perf_counter() - started < 0.5
+        plan = trade_history._get_conn().execute(
+            "EXPLAIN QUERY PLAN SELECT order_id FROM trades WHERE order_id IN (?)", ("ORD00001",)
+        ).fetchall()
+        assert "idx_trades_order_id" in " ".join(str(tuple(r)) for r in plan)
+
+    def test_imported_rows_do_not_block_runner_trades(self):
+        trade_history.import_trades_from_api([self._make_order("ORD010", "1579", "2", 634.0, 100)])
+        trade_id = trade_history.record_trade("1579", "sell", 100, 640.0, "exit")
+        assert trade_id == 2
+
+
+class TestOrderIdMigration:
+    def test_existing_database_gets_order_id_column(self, tmp_path, monkeypatch):
+        db_path = tmp_path / "old_trades.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript("""
+            CREATE TABLE trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, symbol TEXT NOT NULL,
+                side TEXT NOT NULL, quantity INTEGER NOT NULL, exec_price REAL,
+                trade_type TEXT DEFAULT 'entry', related_trade_id INTEGER, realized_pl REAL, note TEXT
+            );
+            INSERT INTO trades (timestamp, symbol, side, quantity, exec_price, note)
+                VALUES ('t1', '1579', 'buy', 100, 600.0, 'imported:A1'),
+                       ('t2', '1579', 'buy', 100, 600.0, 'imported:A1'),
+                       ('t3', '1579', 'sell', 100, 601.0, 'manual');
+        """)
+        conn.commit()
+        conn.close()
+
+        trade_history._local.conn.close()
+        trade_history._local.conn = None
+        monkeypatch.setattr(trade_history, "DB_PATH", db_path)
+        trade_history.init_db()
+        rows = trade_history._get_conn().execute("SELECT id, order_id FROM trades ORDER BY id").fetchall()
+        assert [tuple(r) for r in rows] == [(1, "A1"), (2, None), (3, None)]
+        trade_history.init_db()  # idempotent
+
+        order = TestImportTradesFromApi()._make_order("A1", "1579", "2", 600.0, 100)
+        assert trade_history.import_trades_from_api([order]) == 0
+
+
+class TestGroupCommitWriter:
+    def test_async_inserts_commit_in_batches(self):
+        writer = trade_history._writer
+        batches = writer.batches
+        futures = [trade_history.submit_trade("8306", "buy", 100, 1200.0 + i) for i in range(50)]
+        trade_history.flush_writes(timeout=5)
+        assert [f.result() for f in futures] == list(range(1, 51))
+        assert len(trade_history.get_trades(limit=100)) == 50
+        # 50 queued inserts plus the flush barrier share far fewer commits
+        assert writer.batches - batches < 10
+
+    def test_exit_links_to_queued_entry(self):
+        entry = trade_history.submit_trade("8306", "buy", 100, 1200.0, "entry")
+        exit_id = trade_history.record_trade("8306", "sell", 100, 1250.0, "exit", entry, 5000.0)
+        trades = {t["id"]: t for t in trade_history.get_trades()}
+        assert trades[exit_id]["related_trade_id"] == entry.result()
+
+    def test_failed_insert_only_fails_its_future(self):
+        bad = trade_history._writer.submit("INSERT INTO missing_table VALUES (?)", (1,))
+        good = trade_history.submit_trade("8306", "buy", 100, 1200.0)
+        trade_history.flush_writes(timeout=5)
+        assert isinstance(bad.exception(), sqlite3.OperationalError)
+        assert good.result() == 1
+
+    def test_order_and_pl_snapshot_are_queued(self):
+        trade_history.record_order("8306", "buy", 100, "market", order_id="X1")
+        trade_history.record_pl_snapshot("8306", 1000.0, None, None, 1)
+        trade_history.flush_writes(timeout=5)
+        assert trade_history.get_orders()[0]["order_id"] == "X1"
+        assert trade_history.get_pl_timeline(limit=10)
+
+
+class TestDataVersion:
+    def test_writes_change_only_their_tables(self):
+        trades, trades_modified = trade_history.data_version("trades")
+        pl = trade_history.data_version("daily_pl")[0]
+        trade_history.record_pl_snapshot("8306", 1000.0, None, None, 1)
+        trade_history.flush_writes(timeout=5)
+        assert trade_history.data_version("trades")[0] == trades
+        assert trade_history.data_version("daily_pl")[0] != pl
+
+        trade_history.record_trade("8306", "buy", 100, 1200.0)
+        tag, modified = trade_history.data_version("trades")
+        assert tag != trades and modified >= trades_modified
+        assert tag.endswith(dt.datetime.now(trade_history.JST).strftime("-%Y%m%d"))
+
+    def test_import_bumps_only_when_rows_are_inserted(self):
+        order = TestImportTradesFromApi()._make_order("ORD900", "1579", "2", 634.0, 100)
+        assert trade_history.import_trades_from_api([order]) == 1
+        tag = trade_history.data_version("trades")[0]
+        assert trade_history.import_trades_from_api([order]) == 0
+        assert trade_history.data_version("trades")[0] == tag
+
+    def test_tags_differ_across_processes(self):
+        first = trade_history.DataVersions(clock=lambda: 1000.0)
+        second = trade_history.DataVersions(clock=lambda: 2000.0)
+        assert first.get("trades")[0] != second.get("trades")[0]
+        first.bump(["trades"])
+        assert first.get("trades", "orders") == (f"{1000000:x}-1.0", 1000.0)
@@ -1,316 +1,760 @@
-import sqlite3
-import datetime as dt
-import threading
-from pathlib import Path
-from typing import Any, Dict, List, Optional
-from zoneinfo import ZoneInfo
-
-DB_PATH = Path(__file__).resolve().parent / "trades.db"
-JST = ZoneInfo("Asia/Tokyo")
-
-_local = threading.local()
-
-
-def _get_conn() -> sqlite3.Connection:
-    if not hasattr(_local, "conn") or _local.conn is None:
-        _local.conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-        _local.conn.row_factory = sqlite3.Row
-        _local.conn.execute("PRAGMA journal_mode=WAL")
-    return _local.conn
-
-
-def init_db():
-    conn = _get_conn()
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            symbol TEXT NOT NULL,
-            side TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            order_type TEXT NOT NULL,
-            price REAL,
-            order_id TEXT,
-            status TEXT DEFAULT 'placed'
-        );
-        CREATE TABLE IF NOT EXISTS daily_pl (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            symbol TEXT,
-            pl_total REAL,
-            wallet_cash REAL,
-            wallet_margin REAL,
-            positions_count INTEGER DEFAULT 0
-        );
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            symbol TEXT NOT NULL,
-            side TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            exec_price REAL,
-            trade_type TEXT DEFAULT 'entry',
-            related_trade_id INTEGER,
-            realized_pl REAL,
-            note TEXT
-        );
-        CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders(timestamp);
-        CREATE INDEX IF NOT EXISTS idx_daily_pl_date ON daily_pl(date);
-        CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(timestamp);
-    """)
-    conn.commit()
-
-
-def record_order(symbol: str, side: str, quantity: int, order_type: str,
-                 price: Optional[float] = None, order_id: Optional[str] = None,
-                 status: str = "placed"):
-    conn = _get_conn()
-    now = dt.datetime.now(JST).isoformat()
-    conn.execute(
-        "INSERT INTO orders (timestamp, symbol, side, quantity, order_type, price, order_id, status) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-        (now, symbol, side, quantity, order_type, price, order_id, status),
-    )
-    conn.commit()
-
-
-def record_pl_snapshot(symbol: Optional[str], pl_total: Optional[float],
-                       wallet_cash: Optional[float], wallet_margin: Optional[float],
-                       positions_count: int = 0):
-    conn = _get_conn()
-    now = dt.datetime.now(JST)
-    conn.execute(
-        "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (now.strftime("%Y-%m-%d"), now.isoformat(), symbol, pl_total, wallet_cash, wallet_margin, positions_count),
-    )
-    conn.commit()
-
-
-def get_orders(limit: int = 100, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    if symbol:
-        rows = conn.execute(
-            "SELECT * FROM orders WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?",
-            (symbol, limit),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT * FROM orders ORDER BY timestamp DESC LIMIT ?", (limit,)
-        ).fetchall()
-    return [dict(r) for r in rows]
-
-
-def get_daily_pl(days: int = 30) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
-    rows = conn.execute(
-        "SELECT date, MAX(timestamp) as timestamp, symbol, "
-        "ROUND(AVG(pl_total), 0) as pl_total, "
-        "ROUND(MAX(wallet_cash), 0) as wallet_cash, "
-        "ROUND(MAX(wallet_margin), 0) as wallet_margin, "
-        "MAX(positions_count) as positions_count "
-        "FROM daily_pl WHERE date >= ? GROUP BY date ORDER BY date",
-        (cutoff,),
-    ).fetchall()
-    return [dict(r) for r in rows]
-
-
-def get_pl_timeline(date: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    if date is None:
-        date = dt.datetime.now(JST).strftime("%Y-%m-%d")
-    rows = conn.execute(
-        "SELECT timestamp, pl_total, positions_count FROM daily_pl "
-        "WHERE date = ? ORDER BY timestamp LIMIT ?",
-        (date, limit),
-    ).fetchall()
-    return [dict(r) for r in rows]
-
-
-def get_trade_stats(days: int = 30) -> Dict[str, Any]:
-    conn = _get_conn()
-    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
-
-    order_count = conn.execute(
-        "SELECT COUNT(*) FROM orders WHERE timestamp >= ?", (cutoff,)
-    ).fetchone()[0]
-
-    pl_rows = conn.execute(
-        "SELECT date, "
-        "  (SELECT pl_total FROM daily_pl d2 WHERE d2.date = d1.date ORDER BY timestamp DESC LIMIT 1) as closing_pl "
-        "FROM (SELECT DISTINCT date FROM daily_pl WHERE date >= ?) d1 ORDER BY date",
-        (cutoff,),
-    ).fetchall()
-
-    daily_pls = [r["closing_pl"] for r in pl_rows if r["closing_pl"] is not None]
-    win_days = sum(1 for pl in daily_pls if pl > 0)
-    loss_days = sum(1 for pl in daily_pls if pl < 0)
-    total_days = len(daily_pls)
-
-    return {
-        "period_days": days,
-        "total_orders": order_count,
-        "trading_days": total_days,
-        "win_days": win_days,
-        "loss_days": loss_days,
-        "win_rate": round(win_days / total_days * 100, 1) if total_days > 0 else 0,
-        "total_pl": round(sum(daily_pls), 0) if daily_pls else 0,
-        "avg_daily_pl": round(sum(daily_pls) / total_days, 0) if total_days > 0 else 0,
-        "max_daily_pl": round(max(daily_pls), 0) if daily_pls else 0,
-        "min_daily_pl": round(min(daily_pls), 0) if daily_pls else 0,
-    }
-
-
-def import_trades_from_api(api_orders: List[Dict[str, Any]]) -> int:
-    """Import executed trades from kabuS API /orders response (details=true)."""
-    conn = _get_conn()
-    imported = 0
-    # Sort by time to process entries before exits
-    sorted_orders = sorted(api_orders, key=lambda o: o.get("RecvTime", ""))
-    # Track open entries per symbol for P&L pairing
-    open_entries: Dict[str, Dict[str, Any]] = {}
-
-    for order in sorted_orders:
-        state = order.get("State")
-        if state != 5:  # 5 = completed
-            continue
-
-        details = order.get("Details", [])
-        # Find execution detail (has ExecutionID)
-        exec_detail = None
-        for d in details:
-            if d.get("ExecutionID"):
-                exec_detail = d
-                break
-        if not exec_detail:
-            continue
-
-        exec_price = exec_detail.get("Price")
-        qty = int(exec_detail.get("Qty", 0))
-        if not exec_price or qty <= 0:
-            continue
-
-        order_id = order.get("ID", "")
-        symbol = order.get("Symbol", "")
-        # Check if already imported (by order_id in note)
-        existing = conn.execute(
-            "SELECT COUNT(*) FROM trades WHERE note LIKE ?",
-            (f"%{order_id}%",),
-        ).fetchone()[0]
-        if existing > 0:
-            continue
-
-        raw_side = str(order.get("Side", ""))
-        side = "buy" if raw_side == "2" else "sell"
-        timestamp = order.get("RecvTime", dt.datetime.now(JST).isoformat())
-
-        key = symbol
-        if key in open_entries and open_entries[key]["side"] != side:
-            # Exit trade — pair with the open entry
-            entry = open_entries[key]
-            if entry["side"] == "buy":
-                realized_pl = (exec_price - entry["price"]) * qty
-            else:
-                realized_pl = (entry["price"] - exec_price) * qty
-            conn.execute(
-                "INSERT INTO trades (timestamp, symbol, side, quantity, exec_price, "
-                "trade_type, related_trade_id, realized_pl, note) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (timestamp, symbol, side, qty, exec_price,
-                 "exit", entry["id"], realized_pl, f"imported:{order_id}"),
-            )
-            del open_entries[key]
-        else:
-            # Entry trade
-            cur = conn.execute(
-                "INSERT INTO trades (timestamp, symbol, side, quantity, exec_price, "
-                "trade_type, note) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (timestamp, symbol, side, qty, exec_price,
-                 "entry", f"imported:{order_id}"),
-            )
-            open_entries[key] = {"side": side, "price": exec_price, "id": cur.lastrowid}
-        imported += 1
-
-    conn.commit()
-    return imported
-
-
-def record_trade(symbol: str, side: str, quantity: int, exec_price: Optional[float],
-                 trade_type: str = "entry", related_trade_id: Optional[int] = None,
-                 realized_pl: Optional[float] = None, note: Optional[str] = None) -> int:
-    conn = _get_conn()
-    now = dt.datetime.now(JST).isoformat()
-    cur = conn.execute(
-        "INSERT INTO trades (timestamp, symbol, side, quantity, exec_price, trade_type, "
-        "related_trade_id, realized_pl, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (now, symbol, side, quantity, exec_price, trade_type, related_trade_id, realized_pl, note),
-    )
-    conn.commit()
-    return cur.lastrowid
-
-
-def get_trades(limit: int = 50, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    if symbol:
-        rows = conn.execute(
-            "SELECT * FROM trades WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?",
-            (symbol, limit),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?", (limit,)
-        ).fetchall()
-    return [dict(r) for r in rows]
-
-
-def get_trade_summary(days: int = 30) -> Dict[str, Any]:
-    conn = _get_conn()
-    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
-    rows = conn.execute(
-        "SELECT * FROM trades WHERE timestamp >= ? ORDER BY timestamp",
-        (cutoff,),
-    ).fetchall()
-    trades = [dict(r) for r in rows]
-
-    exits = [t for t in trades if t["realized_pl"] is not None]
-    total_pl = sum(t["realized_pl"] for t in exits)
-    wins = [t for t in exits if t["realized_pl"] > 0]
-    losses = [t for t in exits if t["realized_pl"] < 0]
-
-    return {
-        "period_days": days,
-        "total_trades": len(trades),
-        "entries": sum(1 for t in trades if t["trade_type"] == "entry"),
-        "exits": len(exits),
-        "total_realized_pl": round(total_pl, 0),
-        "win_trades": len(wins),
-        "loss_trades": len(losses),
-        "win_rate": round(len(wins) / len(exits) * 100, 1) if exits else 0,
-        "avg_win": round(sum(t["realized_pl"] for t in wins) / len(wins), 0) if wins else 0,
-        "avg_loss": round(sum(t["realized_pl"] for t in losses) / len(losses), 0) if losses else 0,
-        "max_win": round(max((t["realized_pl"] for t in wins), default=0), 0),
-        "max_loss": round(min((t["realized_pl"] for t in losses), default=0), 0),
-    }
-
-
-def get_margin_daily(days: int = 30) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
-    rows = conn.execute(
-        "SELECT date, "
-        "ROUND(MAX(wallet_margin), 0) as wallet_margin, "
-        "ROUND(MAX(wallet_cash), 0) as wallet_cash "
-        "FROM daily_pl WHERE date >= ? GROUP BY date ORDER BY date",
-        (cutoff,),
-    ).fetchall()
-    result = []
-    prev_margin = None
-    for r in rows:
-        d = dict(r)
-        margin = d.get("wallet_margin")
-        d["margin_change"] = round(margin - prev_margin, 0) if margin is not None and prev_margin is not None else None
-        prev_margin = margin
-        result.append(d)
-    return result
+import atexit
+import queue
+import sqlite3
+import datetime as dt
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+DB_PATH = Path(__file__).resolve().parent / "trades.db"
+JST = ZoneInfo("Asia/Tokyo")
+
+_local = threading.local()
+
+
+def _get_conn() -> sqlite3.Connection:
+    if not hasattr(_local, "conn") or _local.conn is None:
+        _local.conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        _local.conn.row_factory = sqlite3.Row
+        _local.conn.execute("PRAGMA journal_mode=WAL")
+    return _local.conn
+
+
+class DataVersions:
+    """Per-table change counters, used as HTTP validators (ETag/Last-Modified).
+
+    Every committed write bumps the counters of the tables it touched. Tags
+    start with the process start time so a restart never reuses an old tag.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.started = clock()
+        self.epoch = int(self.started * 1000)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+
+    def bump(self, tables: Iterable[str]) -> None:
+        now = self.clock()
+        with self._lock:
+            for table in tables:
+                self._counts[table] = self._counts.get(table, 0) + 1
+                self._modified[table] = now
+
+    def get(self, *tables: str) -> Tuple[str, float]:
+        """Tag and last-modified time (epoch seconds) covering the given tables."""
+        with self._lock:
+            counts = ".".join(str(self._counts.get(table, 0)) for table in tables)
+            modified = max(self._modified.get(table, self.started) for table in tables)
+        return f"{self.epoch:x}-{counts}", modified
+
+
+class _WriteJob:
+    __slots__ = ("sql", "params", "future", "urgent", "table")
+
+    def __init__(self, sql: Optional[str], params: Sequence[Any], urgent: bool, table: Optional[str] = None):
+        self.sql = sql
+        self.params = params
+        self.future: Future = Future()
+        self.urgent = urgent
+        self.table = table
+
+
+class GroupCommitWriter:
+    """Single background thread that owns all inserts into the trade history DB.
+
+    Callers enqueue a statement and get a Future for its row id. The writer
+    drains whatever is queued (up to max_batch), lingers at most
+    flush_interval for more, then executes the batch in one transaction and
+    commits once, so the fsync happens off the caller's thread. Jobs marked
+    urgent (a caller is blocking on the row id) skip the linger.
+
+    A Future passed as a parameter (e.g. related_trade_id of an exit whose
+    entry is still queued) is replaced by that job's row id before execution.
+    After each commit, on_commit receives the tables that were written.
+    """
+
+    def __init__(self, flush_interval: float = 0.05, max_batch: int = 256,
+                 on_commit: Optional[Callable[[set], None]] = None):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_commit = on_commit
+        self._queue: "queue.Queue[_WriteJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[Path] = None
+        self.batches = 0
+        self.writes = 0
+        self.errors = 0
+
+    def submit(self, sql: Optional[str], params: Sequence[Any] = (), urgent: bool = False,
+               table: Optional[str] = None) -> Future:
+        job = _WriteJob(sql, params, urgent, table)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trade-history-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job.future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until everything submitted so far has been committed."""
+        self.submit(None, urgent=True).result(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush pending writes if the writer thread is running (used at interpreter exit)."""
+        if self._thread is not None and self._thread.is_alive():
+            self.flush(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        # DB_PATH is swapped by tests; reopen when it changes
+        if self._conn is None or self._conn_path != DB_PATH:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn_path = DB_PATH
+        return self._conn
+
+    def _collect(self) -> List[_WriteJob]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or any(job.urgent for job in batch):
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            row_ids: Dict[Future, int] = {}
+            results = []
+            try:
+                # a batch of flush barriers alone touches no database
+                conn = self._connection() if any(job.sql is not None for job in batch) else None
+                for job in batch:
+                    if job.sql is None:
+                        results.append((job, None, None))
+                        continue
+                    try:
+                        params = [self._resolve(p, row_ids) for p in job.params]
+                        row_id = conn.execute(job.sql, params).lastrowid
+                        row_ids[job.future] = row_id
+                        results.append((job, row_id, None))
+                    except Exception as e:
+                        self.errors += 1
+                        results.append((job, None, e))
+                if conn is not None:
+                    conn.commit()
+            except Exception as e:
+                self.errors += 1
+                results = [(job, None, e) for job in batch]
+            self.batches += 1
+            written = {job.table for job, _, error in results if error is None and job.table}
+            if written and self.on_commit is not None:
+                self.on_commit(written)
+            for job, row_id, error in results:
+                if error is not None:
+                    job.future.set_exception(error)
+                else:
+                    if job.sql is not None:
+                        self.writes += 1
+                    job.future.set_result(row_id)
+
+    @staticmethod
+    def _resolve(value: Any, row_ids: Dict[Future, int]) -> Any:
+        if not isinstance(value, Future):
+            return value
+        if value in row_ids:
+            return row_ids[value]
+        # the referenced insert ran in an earlier batch; if it failed there is nothing to link to
+        return value.result() if value.exception() is None else None
+
+
+_versions = DataVersions()
+_writer = GroupCommitWriter(on_commit=_versions.bump)
+atexit.register(_writer.close)
+
+# An entry's row id, or the Future for it while the insert is still queued
+RowId = Union[int, Future, None]
+
+
+def flush_writes(timeout: Optional[float] = None) -> None:
+    """Wait until every queued insert has been committed."""
+    _writer.flush(timeout)
+
+
+def writer_stats() -> Dict[str, Any]:
+    return _writer.stats()
+
+
+def data_version(*tables: str) -> Tuple[str, float]:
+    """Validator for data read from the given tables: (tag, last-modified epoch seconds).
+
+    The readers default to windows ending today, so the tag also changes at
+    midnight JST even when nothing was written.
+    """
+    tag, modified = _versions.get(*tables)
+    today = dt.datetime.now(JST).replace(hour=0, minute=0, second=0, microsecond=0)
+    return f"{tag}-{today:%Y%m%d}", max(modified, today.timestamp())
+
+
+def init_db():
+    conn = _get_conn()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            order_type TEXT NOT NULL,
+            price REAL,
+            order_id TEXT,
+            status TEXT DEFAULT 'placed'
+        );
+        CREATE TABLE IF NOT EXISTS daily_pl (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            symbol TEXT,
+            pl_total REAL,
+            wallet_cash REAL,
+            wallet_margin REAL,
+            positions_count INTEGER DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            exec_price REAL,
+            trade_type TEXT DEFAULT 'entry',
+            related_trade_id INTEGER,
+            realized_pl REAL,
+            note TEXT,
+            order_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_daily_pl_date ON daily_pl(date);
+        CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(timestamp);
+    """)
+    _migrate_trades_order_id(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_order_id ON trades(order_id)")
+    _init_daily_summary(conn)
+    for table in PL_ROLLUP_TABLES:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "  bucket TEXT PRIMARY KEY, date TEXT NOT NULL, timestamp TEXT NOT NULL, symbol TEXT, "
+            "  pl_total REAL, pl_min REAL, pl_max REAL, wallet_cash REAL, wallet_margin REAL, "
+            "  positions_count INTEGER, samples INTEGER NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table}(date)")
+    conn.commit()
+    _versions.bump(("orders", "trades", "daily_pl"))
+
+
+def _init_daily_summary(conn: sqlite3.Connection) -> None:
+    """Create daily_summary: one row per date, kept current by a trigger on daily_pl.
+
+    Each snapshot insert updates the day's closing P&L (latest timestamp wins),
+    the running sum/count behind the average P&L and the max wallet and position
+    values, so the daily endpoints read one row per day instead of every snapshot.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            date TEXT PRIMARY KEY,
+            last_timestamp TEXT,
+            symbol TEXT,
+            closing_pl REAL,
+            pl_sum REAL NOT NULL DEFAULT 0,
+            pl_count INTEGER NOT NULL DEFAULT 0,
+            max_wallet_cash REAL,
+            max_wallet_margin REAL,
+            max_positions_count INTEGER,
+            snapshots INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_daily_pl_summary AFTER INSERT ON daily_pl
+        BEGIN
+            INSERT OR IGNORE INTO daily_summary (date) VALUES (NEW.date);
+            UPDATE daily_summary SET
+                symbol = CASE WHEN last_timestamp IS NULL OR NEW.timestamp >= last_timestamp
+                              THEN NEW.symbol ELSE symbol END,
+                closing_pl = CASE WHEN last_timestamp IS NULL OR NEW.timestamp >= last_timestamp
+                                  THEN NEW.pl_total ELSE closing_pl END,
+                last_timestamp = CASE WHEN last_timestamp IS NULL OR NEW.timestamp >= last_timestamp
+                                      THEN NEW.timestamp ELSE last_timestamp END,
+                pl_sum = pl_sum + COALESCE(NEW.pl_total, 0),
+                pl_count = pl_count + (NEW.pl_total IS NOT NULL),
+                max_wallet_cash = COALESCE(MAX(max_wallet_cash, NEW.wallet_cash), max_wallet_cash, NEW.wallet_cash),
+                max_wallet_margin = COALESCE(MAX(max_wallet_margin, NEW.wallet_margin), max_wallet_margin, NEW.wallet_margin),
+                max_positions_count = COALESCE(MAX(max_positions_count, NEW.positions_count),
+                                               max_positions_count, NEW.positions_count),
+                snapshots = snapshots + 1
+            WHERE date = NEW.date;
+        END;
+    """)
+    # Databases created before the summary existed: build it once from the raw snapshots
+    if conn.execute("SELECT 1 FROM daily_summary LIMIT 1").fetchone() is None:
+        conn.execute(
+            "INSERT INTO daily_summary (date, last_timestamp, symbol, closing_pl, pl_sum, pl_count, "
+            "max_wallet_cash, max_wallet_margin, max_positions_count, snapshots) "
+            "SELECT date, MAX(timestamp), symbol, "
+            "  (SELECT pl_total FROM daily_pl d2 WHERE d2.date = d1.date ORDER BY timestamp DESC LIMIT 1), "
+            "  COALESCE(SUM(pl_total), 0), COUNT(pl_total), MAX(wallet_cash), MAX(wallet_margin), "
+            "  MAX(positions_count), COUNT(*) "
+            "FROM daily_pl d1 GROUP BY date"
+        )
+
+
+IMPORT_NOTE_PREFIX = "imported:"
+
+# P&L snapshot rollups, finest first; the timeline picks among these per request
+PL_ROLLUP_TABLES = ("daily_pl_1m", "daily_pl_1h")
+PL_TIMELINE_TABLES = {"raw": "daily_pl", "1m": "daily_pl_1m", "1h": "daily_pl_1h"}
+
+
+def _migrate_trades_order_id(conn: sqlite3.Connection) -> None:
+    """Add trades.order_id to databases created before it existed.
+
+    Imported rows recorded their kabuS order ID only in note ("imported:<ID>");
+    backfill it from there, keeping the first row if an order was imported twice
+    so the unique index can be built.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(trades)")}
+    if "order_id" in columns:
+        return
+    conn.execute("ALTER TABLE trades ADD COLUMN order_id TEXT")
+    conn.execute(
+        "UPDATE trades SET order_id = substr(note, ?) "
+        "WHERE note LIKE ? AND id = (SELECT MIN(t.id) FROM trades t WHERE t.note = trades.note)",
+        (len(IMPORT_NOTE_PREFIX) + 1, IMPORT_NOTE_PREFIX + "%"),
+    )
+
+
+def record_order(symbol: str, side: str, quantity: int, order_type: str,
+                 price: Optional[float] = None, order_id: Optional[str] = None,
+                 status: str = "placed") -> Future:
+    now = dt.datetime.now(JST).isoformat()
+    return _writer.submit(
+        "INSERT INTO orders (timestamp, symbol, side, quantity, order_type, price, order_id, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (now, symbol, side, quantity, order_type, price, order_id, status),
+        table="orders",
+    )
+
+
+def record_pl_snapshot(symbol: Optional[str], pl_total: Optional[float],
+                       wallet_cash: Optional[float], wallet_margin: Optional[float],
+                       positions_count: int = 0) -> Future:
+    now = dt.datetime.now(JST)
+    return _writer.submit(
+        "INSERT INTO daily_pl (date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, positions_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (now.strftime("%Y-%m-%d"), now.isoformat(), symbol, pl_total, wallet_cash, wallet_margin, positions_count),
+        table="daily_pl",
+    )
+
+
+class PlChangeFilter:
+    """Decides whether a P&L snapshot is worth writing.
+
+    A snapshot is written when P&L (to the yen), either wallet value, the
+    position count or the symbol differs from the last written one, or when
+    heartbeat seconds have passed since it, so idle periods still leave a
+    trace without a row every poll.
+    """
+
+    def __init__(self, heartbeat: float = 300.0, clock=time.monotonic):
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self._last: Optional[tuple] = None
+        self._written_at: Optional[float] = None
+        self.written = 0
+        self.skipped = 0
+
+    def changed(self, symbol: Optional[str], pl_total: Optional[float], wallet_cash: Optional[float],
+                wallet_margin: Optional[float], positions_count: int = 0) -> bool:
+        key = (symbol, None if pl_total is None else round(pl_total), wallet_cash, wallet_margin, positions_count)
+        now = self.clock()
+        if key == self._last and now - self._written_at < self.heartbeat:
+            self.skipped += 1
+            return False
+        self._last = key
+        self._written_at = now
+        self.written += 1
+        return True
+
+
+def get_orders(limit: int = 100, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+    conn = _get_conn()
+    if symbol:
+        rows = conn.execute(
+            "SELECT * FROM orders WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?",
+            (symbol, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM orders ORDER BY timestamp DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_daily_pl(days: int = 30) -> List[Dict[str, Any]]:
+    conn = _get_conn()
+    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = conn.execute(
+        "SELECT date, last_timestamp as timestamp, symbol, "
+        "ROUND(CASE WHEN pl_count > 0 THEN pl_sum / pl_count END, 0) as pl_total, "
+        "ROUND(max_wallet_cash, 0) as wallet_cash, "
+        "ROUND(max_wallet_margin, 0) as wallet_margin, "
+        "max_positions_count as positions_count "
+        "FROM daily_summary WHERE date >= ? ORDER BY date",
+        (cutoff,),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _timeline_table(conn: sqlite3.Connection, date: str, limit: int, resolution: Optional[str]) -> Optional[str]:
+    if resolution in PL_TIMELINE_TABLES:
+        return PL_TIMELINE_TABLES[resolution]
+    # Finest table whose rows for the day fit in limit; raw rows may already be pruned
+    chosen = None
+    for table in PL_TIMELINE_TABLES.values():
+        count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE date = ?", (date,)).fetchone()[0]
+        if count == 0:
+            continue
+        chosen = table
+        if count <= limit:
+            break
+    return chosen
+
+
+def get_pl_timeline(date: Optional[str] = None, limit: int = 500,
+                    resolution: Optional[str] = None) -> List[Dict[str, Any]]:
+    """P&L points for one day from daily_pl, daily_pl_1m or daily_pl_1h.
+
+    resolution ("raw", "1m", "1h") forces a table; otherwise the finest one
+    that covers the whole day within limit points is used.
+    """
+    conn = _get_conn()
+    if date is None:
+        date = dt.datetime.now(JST).strftime("%Y-%m-%d")
+    table = _timeline_table(conn, date, limit, resolution)
+    if table is None:
+        return []
+    rows = conn.execute(
+        f"SELECT timestamp, pl_total, positions_count FROM {table} "
+        "WHERE date = ? ORDER BY timestamp LIMIT ?",
+        (date, limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _rollup(conn: sqlite3.Connection, source: str, target: str, key_len: int, suffix: str) -> int:
+    """Rebuild target buckets from the source's last rolled-up bucket onward.
+
+    Each bucket keeps the closing sample's values plus min/max P&L and the
+    sample count; the newest bucket is recomputed every run since it may have
+    been partial last time.
+    """
+    since = conn.execute(f"SELECT MAX(bucket) FROM {target}").fetchone()[0] or ""
+    is_raw = source == "daily_pl"
+    pl_min = "pl_total" if is_raw else "pl_min"
+    pl_max = "pl_total" if is_raw else "pl_max"
+    samples = "1" if is_raw else "samples"
+    source_key = "timestamp" if is_raw else "bucket"
+    bucket = f"substr({source_key}, 1, {key_len})"
+    cur = conn.execute(
+        f"INSERT OR REPLACE INTO {target} (bucket, date, timestamp, symbol, pl_total, pl_min, pl_max, "
+        "wallet_cash, wallet_margin, positions_count, samples) "
+        "SELECT bucket, date, bucket || ? || substr(timestamp, -6), symbol, pl_total, b_min, b_max, "
+        "wallet_cash, wallet_margin, positions_count, b_samples FROM ("
+        f"  SELECT {bucket} AS bucket, date, timestamp, symbol, pl_total, wallet_cash, wallet_margin, "
+        f"  positions_count, MIN({pl_min}) OVER w AS b_min, MAX({pl_max}) OVER w AS b_max, "
+        f"  SUM({samples}) OVER w AS b_samples, ROW_NUMBER() OVER (w ORDER BY timestamp DESC) AS rn "
+        f"  FROM {source} WHERE {bucket} >= ? WINDOW w AS (PARTITION BY {bucket})"
+        ") WHERE rn = 1",
+        (suffix, since),
+    )
+    return cur.rowcount
+
+
+def maintain_pl_history(raw_retention_days: int = 7, minute_retention_days: int = 90,
+                        now: Optional[dt.datetime] = None) -> Dict[str, int]:
+    """Roll daily_pl up into 1-minute and 1-hour tables, then prune old rows.
+
+    Raw snapshots older than raw_retention_days and minute buckets older than
+    minute_retention_days are deleted (0 keeps them); hourly buckets and
+    daily_summary are kept. Only whole days already covered by a rollup are pruned,
+    so a day is either fully present in a table or absent from it.
+    """
+    flush_writes(timeout=5)
+    conn = _get_conn()
+    now = now or dt.datetime.now(JST)
+    result = {
+        "minute_buckets": _rollup(conn, "daily_pl", "daily_pl_1m", 16, ":00"),
+        "hour_buckets": _rollup(conn, "daily_pl_1m", "daily_pl_1h", 13, ":00:00"),
+        "raw_pruned": 0,
+        "minute_pruned": 0,
+    }
+    for key, table, rolled_into, days in (
+        ("raw_pruned", "daily_pl", "daily_pl_1m", raw_retention_days),
+        ("minute_pruned", "daily_pl_1m", "daily_pl_1h", minute_retention_days),
+    ):
+        if days <= 0:
+            continue
+        cutoff = (now - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+        result[key] = conn.execute(
+            # whole days only, and only once the rollup has moved past them
+            f"DELETE FROM {table} WHERE date < ? AND date < (SELECT substr(MAX(bucket), 1, 10) FROM {rolled_into})",
+            (cutoff,),
+        ).rowcount
+    conn.commit()
+    if any(result.values()):
+        _versions.bump(("daily_pl",))
+    return result
+
+
+def get_trade_stats(days: int = 30) -> Dict[str, Any]:
+    conn = _get_conn()
+    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+
+    order_count = conn.execute(
+        "SELECT COUNT(*) FROM orders WHERE timestamp >= ?", (cutoff,)
+    ).fetchone()[0]
+
+    pl_rows = conn.execute(
+        "SELECT date, closing_pl FROM daily_summary WHERE date >= ? ORDER BY date",
+        (cutoff,),
+    ).fetchall()
+
+    daily_pls = [r["closing_pl"] for r in pl_rows if r["closing_pl"] is not None]
+    win_days = sum(1 for pl in daily_pls if pl > 0)
+    loss_days = sum(1 for pl in daily_pls if pl < 0)
+    total_days = len(daily_pls)
+
+    return {
+        "period_days": days,
+        "total_orders": order_count,
+        "trading_days": total_days,
+        "win_days": win_days,
+        "loss_days": loss_days,
+        "win_rate": round(win_days / total_days * 100, 1) if total_days > 0 else 0,
+        "total_pl": round(sum(daily_pls), 0) if daily_pls else 0,
+        "avg_daily_pl": round(sum(daily_pls) / total_days, 0) if total_days > 0 else 0,
+        "max_daily_pl": round(max(daily_pls), 0) if daily_pls else 0,
+        "min_daily_pl": round(min(daily_pls), 0) if daily_pls else 0,
+    }
+
+
+def _existing_order_ids(conn: sqlite3.Connection, order_ids: List[str], chunk: int = 500) -> set:
+    existing = set()
+    for i in range(0, len(order_ids), chunk):
+        part = order_ids[i:i + chunk]
+        rows = conn.execute(
+            f"SELECT order_id FROM trades WHERE order_id IN ({','.join('?' * len(part))})", part
+        ).fetchall()
+        existing.update(r[0] for r in rows)
+    return existing
+
+
+def import_trades_from_api(api_orders: List[Dict[str, Any]]) -> int:
+    """Import executed trades from kabuS API /orders response (details=true).
+
+    Already-imported orders are found with one indexed lookup on trades.order_id,
+    and the new rows are written with a single executemany. Row ids are assigned
+    up front under BEGIN IMMEDIATE so exits can reference their entry's id.
+    """
+    conn = _get_conn()
+    # Sort by time to process entries before exits
+    sorted_orders = sorted(api_orders, key=lambda o: o.get("RecvTime", ""))
+
+    candidates = []
+    for order in sorted_orders:
+        state = order.get("State")
+        if state != 5:  # 5 = completed
+            continue
+
+        details = order.get("Details", [])
+        # Find execution detail (has ExecutionID)
+        exec_detail = None
+        for d in details:
+            if d.get("ExecutionID"):
+                exec_detail = d
+                break
+        if not exec_detail:
+            continue
+
+        exec_price = exec_detail.get("Price")
+        qty = int(exec_detail.get("Qty", 0))
+        if not exec_price or qty <= 0:
+            continue
+        candidates.append((order, exec_price, qty))
+    if not candidates:
+        return 0
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        seen = _existing_order_ids(conn, list({str(o.get("ID", "")) for o, _, _ in candidates}))
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0] + 1
+        # Track open entries per symbol for P&L pairing
+        open_entries: Dict[str, Dict[str, Any]] = {}
+        rows = []
+
+        for order, exec_price, qty in candidates:
+            order_id = str(order.get("ID", ""))
+            if order_id in seen:
+                continue
+            seen.add(order_id)
+            symbol = order.get("Symbol", "")
+            raw_side = str(order.get("Side", ""))
+            side = "buy" if raw_side == "2" else "sell"
+            timestamp = order.get("RecvTime", dt.datetime.now(JST).isoformat())
+            note = f"{IMPORT_NOTE_PREFIX}{order_id}"
+
+            key = symbol
+            if key in open_entries and open_entries[key]["side"] != side:
+                # Exit trade — pair with the open entry
+                entry = open_entries[key]
+                if entry["side"] == "buy":
+                    realized_pl = (exec_price - entry["price"]) * qty
+                else:
+                    realized_pl = (entry["price"] - exec_price) * qty
+                rows.append((next_id, timestamp, symbol, side, qty, exec_price,
+                             "exit", entry["id"], realized_pl, note, order_id))
+                del open_entries[key]
+            else:
+                # Entry trade
+                rows.append((next_id, timestamp, symbol, side, qty, exec_price,
+                             "entry", None, None, note, order_id))
+                open_entries[key] = {"side": side, "price": exec_price, "id": next_id}
+            next_id += 1
+
+        inserted = conn.executemany(
+            "INSERT INTO trades (id, timestamp, symbol, side, quantity, exec_price, "
+            "trade_type, related_trade_id, realized_pl, note, order_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(order_id) DO NOTHING",
+            rows,
+        ).rowcount if rows else 0
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if inserted:
+        _versions.bump(("trades",))
+    return len(rows)
+
+
+def submit_trade(symbol: str, side: str, quantity: int, exec_price: Optional[float],
+                 trade_type: str = "entry", related_trade_id: RowId = None,
+                 realized_pl: Optional[float] = None, note: Optional[str] = None,
+                 urgent: bool = False) -> Future:
+    """Queue a trade insert without waiting for the commit; returns a Future for the row id."""
+    now = dt.datetime.now(JST).isoformat()
+    return _writer.submit(
+        "INSERT INTO trades (timestamp, symbol, side, quantity, exec_price, trade_type, "
+        "related_trade_id, realized_pl, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (now, symbol, side, quantity, exec_price, trade_type, related_trade_id, realized_pl, note),
+        urgent=urgent,
+        table="trades",
+    )
+
+
+def record_trade(symbol: str, side: str, quantity: int, exec_price: Optional[float],
+                 trade_type: str = "entry", related_trade_id: RowId = None,
+                 realized_pl: Optional[float] = None, note: Optional[str] = None) -> int:
+    return submit_trade(symbol, side, quantity, exec_price, trade_type, related_trade_id,
+                        realized_pl, note, urgent=True).result()
+
+
+def get_trades(limit: int = 50, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+    conn = _get_conn()
+    if symbol:
+        rows = conn.execute(
+            "SELECT * FROM trades WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?",
+            (symbol, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_trade_summary(days: int = 30) -> Dict[str, Any]:
+    conn = _get_conn()
+    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = conn.execute(
+        "SELECT * FROM trades WHERE timestamp >= ? ORDER BY timestamp",
+        (cutoff,),
+    ).fetchall()
+    trades = [dict(r) for r in rows]
+
+    exits = [t for t in trades if t["realized_pl"] is not None]
+    total_pl = sum(t["realized_pl"] for t in exits)
+    wins = [t for t in exits if t["realized_pl"] > 0]
+    losses = [t for t in exits if t["realized_pl"] < 0]
+
+    return {
+        "period_days": days,
+        "total_trades": len(trades),
+        "entries": sum(1 for t in trades if t["trade_type"] == "entry"),
+        "exits": len(exits),
+        "total_realized_pl": round(total_pl, 0),
+        "win_trades": len(wins),
+        "loss_trades": len(losses),
+        "win_rate": round(len(wins) / len(exits) * 100, 1) if exits else 0,
+        "avg_win": round(sum(t["realized_pl"] for t in wins) / len(wins), 0) if wins else 0,
+        "avg_loss": round(sum(t["realized_pl"] for t in losses) / len(losses), 0) if losses else 0,
+        "max_win": round(max((t["realized_pl"] for t in wins), default=0), 0),
+        "max_loss": round(min((t["realized_pl"] for t in losses), default=0), 0),
+    }
+
+
+def get_margin_daily(days: int = 30) -> List[Dict[str, Any]]:
+    conn = _get_conn()
+    cutoff = (dt.datetime.now(JST) - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = conn.execute(
+        "SELECT date, "
+        "ROUND(max_wallet_margin, 0) as wallet_margin, "
+        "ROUND(max_wallet_cash, 0) as wallet_cash "
+        "FROM daily_summary WHERE date >= ? ORDER BY date",
+        (cutoff,),
+    ).fetchall()
+    result = []
+    prev_margin = None
+    for r in rows:
+        d = dict(r)
+        margin = d.get("wallet_margin")
+        d["margin_change"] = round(margin - prev_margin, 0) if margin is not None and prev_margin is not None else None
+        prev_margin = margin
+        result.append(d)
+    return result
@@ -0,0 +1,128 @@
+# board_cache.py
+
+import threading
+import time
+
+
+class _Flight:
+    """同一キーへの取得中リクエスト。後続の呼び出し元はこの完了を待ちます。"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BoardCache:
+    """
+    /board の取得結果を symbol@exchange 単位で共有するプロセス内キャッシュです。
+
+    呼び出し元ごとに許容する鮮度 (max_age) を指定でき、同じキーの取得が
+    同時に発生した場合は 1 回の上流リクエストにまとめます (single-flight)。
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.stale = 0
+
+    @staticmethod
+    def key(symbol, exchange=1):
+        return f"{symbol}@{int(exchange)}"
+
+    def get(self, symbol, exchange, loader, max_age=0.0, stale_on=()):
+        """
+        キャッシュから板情報を返し、期限切れであれば loader で取得します。
+
+        Parameters:
+            symbol (str): 銘柄コード
+            exchange (int): 市場コード
+            loader (callable): 板情報を取得する関数（例外はそのまま呼び出し元へ伝播）
+            max_age (float): 許容するキャッシュの経過秒数
+            stale_on (tuple): この例外で取得に失敗した場合は期限切れのキャッシュを返す
+
+        Returns:
+            dict: 板情報
+        """
+        key = self.key(symbol, exchange)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[1] <= max_age:
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            board = loader()
+            flight.result = board
+            with self._lock:
+                self._entries[key] = (board, self._clock())
+            return board
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                entry = self._entries.get(key)
+                if entry is not None and isinstance(e, stale_on):
+                    self.stale += 1
+                    flight.result = entry[0]
+                    return entry[0]
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def put(self, symbol, exchange, board):
+        """PUSH配信などで受信した板情報をキャッシュに格納します。"""
+        with self._lock:
+            self._entries[self.key(symbol, exchange)] = (board, self._clock())
+
+    def peek(self, symbol, exchange=1):
+        """
+        期限に関係なくキャッシュ済みの板情報を返します。
+
+        Returns:
+            tuple: (板情報, 経過秒数)。未取得の場合は (None, None)
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(symbol, exchange))
+            if entry is None:
+                return None, None
+            return entry[0], self._clock() - entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "stale": self.stale,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# プロセス内で共有するキャッシュ
+board_cache = BoardCache()
@@ -0,0 +1,169 @@
+# board_push.py
+
+import json
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+from kabus_transport import transport
+from board_cache import board_cache
+from rate_limiter import TRADING
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+
+class BoardPushFeed:
+    """
+    kabusapi の PUSH 配信 (/register + WebSocket) で板情報を受信します。
+
+    受信した板情報はキューに積まれ、TradingData.fetch_current_price が
+    到着順に取り出します。接続が切れた場合は自動で再接続し、その間は
+    connected が False になるため呼び出し側は /board のポーリングに切り替えます。
+    """
+
+    def __init__(self, api_base_url, token, symbol, exchange=1, logger=None,
+                 maxsize=1000, reconnect_interval=1.0):
+        """
+        Parameters:
+            api_base_url (str): kabusapi のベースURL (例: http://localhost:18080/kabusapi)
+            token (str): APIトークン
+            symbol (str): 銘柄コード
+            exchange (int): 市場コード
+            logger (logging.Logger): ロガー
+            maxsize (int): 受信キューの最大件数（溢れた場合は古い板情報から破棄）
+            reconnect_interval (float): 再接続までの待機秒数
+        """
+        self.api_base_url = api_base_url
+        self.token = token
+        self.symbol = str(symbol)
+        self.exchange = int(exchange)
+        self.logger = logger or logging.getLogger(__name__)
+        self.reconnect_interval = reconnect_interval
+        self.ws_url = api_base_url.replace("http", "ws", 1) + "/websocket"
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop_event = threading.Event()
+        self._connected = threading.Event()
+        self._thread = None
+        self._ws = None
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, wait=3.0):
+        """
+        銘柄を登録し、WebSocket 受信スレッドを開始します。
+
+        Parameters:
+            wait (float): 接続完了を待つ最大秒数
+
+        Returns:
+            bool: 接続できた場合は True
+        """
+        if websocket is None:
+            self.logger.warning("websocket-client が見つからないため PUSH 配信を利用できません。")
+            return False
+        try:
+            self._register("/register")
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"PUSH 銘柄登録に失敗しました: {e}")
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="board-push", daemon=True)
+        self._thread.start()
+        return self._connected.wait(wait)
+
+    def stop(self):
+        """受信を停止し、銘柄登録を解除します。"""
+        self._stop_event.set()
+        self._connected.clear()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        try:
+            self._register("/unregister")
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"PUSH 銘柄登録の解除に失敗しました: {e}")
+
+    def get(self, timeout=None):
+        """
+        次の板情報を取り出します。
+
+        Parameters:
+            timeout (float): 最大待機秒数
+
+        Returns:
+            dict: 板情報（タイムアウトした場合は None）
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _register(self, path):
+        url = f"{self.api_base_url}{path}"
+        body = {"Symbols": [{"Symbol": self.symbol, "Exchange": self.exchange}]}
+        resp = transport.request("PUT", url, token=self.token, json=body, priority=TRADING)
+        resp.raise_for_status()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.ws_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+            self._ws.run_forever()
+            self._connected.clear()
+            if not self._stop_event.is_set():
+                self.logger.warning("PUSH 配信が切断されました。再接続します。")
+                time.sleep(self.reconnect_interval)
+
+    def _on_open(self, ws):
+        self.logger.info(f"PUSH 配信に接続しました: {self.ws_url}")
+        self._connected.set()
+
+    def _on_message(self, ws, message):
+        try:
+            board = json.loads(message)
+        except (TypeError, ValueError):
+            self.logger.warning("PUSH メッセージの解析に失敗しました。")
+            return
+        if str(board.get("Symbol")) != self.symbol:
+            return
+        self.received += 1
+        board_cache.put(self.symbol, self.exchange, board)
+        try:
+            self._queue.put_nowait(board)
+        except queue.Full:
+            # 処理が追いつかない場合は最も古い板情報を破棄
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self._queue.put_nowait(board)
+
+    def _on_error(self, ws, error):
+        self.logger.error(f"PUSH 配信でエラーが発生しました: {error}")
+
+    def _on_close(self, ws, *args):
+        self._connected.clear()
@@ -0,0 +1,282 @@
+# column_store.py
+
+import numpy as np
+import pandas as pd
+
+
+class _Columns(list):
+    """DataFrame.columns と同様に `in` 判定と tolist() ができるカラム名の一覧です。"""
+
+    def tolist(self):
+        return list(self)
+
+
+class _Labels:
+    """行ラベル（時刻）の読み取り専用ビューです。index[-1] や tolist() に対応します。"""
+
+    def __init__(self, labels, start, end):
+        self._labels = labels
+        self._start = start
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.tolist()[i]
+        n = self._end - self._start
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("index out of range")
+        return self._labels[self._start + i]
+
+    def __iter__(self):
+        return iter(self._labels[self._start:self._end])
+
+    def tolist(self):
+        return self._labels[self._start:self._end]
+
+
+class Row:
+    """
+    1行分の読み取りビューです。pandas.Series の行と同様に get() / [] / name で参照できます。
+    """
+
+    def __init__(self, store, pos):
+        self._store = store
+        self._pos = pos
+        self.name = store._labels[pos]
+
+    def get(self, key, default=None):
+        arr = self._store._data.get(key)
+        return default if arr is None else arr[self._pos]
+
+    def __getitem__(self, key):
+        return self._store._data[key][self._pos]
+
+    def __contains__(self, key):
+        return key in self._store._data
+
+    def keys(self):
+        return list(self._store._data)
+
+    def to_series(self):
+        return pd.Series({col: arr[self._pos] for col, arr in self._store._data.items()}, name=self.name)
+
+
+class _AtIndexer:
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, key):
+        label, col = key
+        return self._store._data[col][self._store._position(label)]
+
+    def __setitem__(self, key, value):
+        label, col = key
+        self._store._set(self._store._position(label), col, value)
+
+
+class _LocIndexer(_AtIndexer):
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            return Row(self._store, self._store._position(key))
+        label, cols = key
+        if isinstance(cols, (list, tuple)):
+            pos = self._store._position(label)
+            return pd.Series({col: self._store._data[col][pos] for col in cols}, name=label)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        store = self._store
+        if not isinstance(key, tuple):
+            # DataFrame.loc[label] = values と同様に、全カラム分の値で行を追加・更新する
+            values = list(value) if isinstance(value, (list, tuple, np.ndarray)) else [value] * len(store._data)
+            if len(values) != len(store._data):
+                raise ValueError("cannot set a row with mismatched columns")
+            row = dict(zip(store._data, values))
+            if key in store._index:
+                pos = store._position(key)
+                for col, v in row.items():
+                    store._set(pos, col, v)
+            else:
+                store.append(key, row)
+            return
+        label, cols = key
+        pos = store._position(label)
+        if isinstance(cols, (list, tuple)):
+            values = list(value) if isinstance(value, (list, tuple, np.ndarray)) else [value] * len(cols)
+            if len(values) != len(cols):
+                raise ValueError("Must have equal len keys and value when setting with an iterable")
+            for col, v in zip(cols, values):
+                store._set(pos, col, v)
+        else:
+            store._set(pos, cols, value)
+
+
+class _ILocIndexer:
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, i):
+        n = len(self._store)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("single positional indexer is out-of-bounds")
+        return Row(self._store, self._store._start + i)
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+class ColumnStore:
+    """
+    interpolated_data 用の列指向ストアです。
+
+    カラムごとに事前確保した配列（数値は float64、数値以外が書き込まれたカラムのみ object）で保持し、
+    行の追加・最新行の参照は償却 O(1) で行えます。DataFrame が必要な場合（ノートブック・UI）のみ
+    to_frame() でコピーを作成します。
+    既存の呼び出し元のために .at / .loc / .iloc[-1] / [col] / index / columns / empty など
+    DataFrame と同じ形のアクセサを備えています。
+    """
+
+    def __init__(self, columns=(), capacity=1024):
+        self._capacity = capacity
+        self._data = {col: np.full(capacity, np.nan) for col in columns}
+        self._labels = []
+        self._index = {}
+        self._start = 0
+        self._end = 0
+        self.at = _AtIndexer(self)
+        self.loc = _LocIndexer(self)
+        self.iloc = _ILocIndexer(self)
+
+    # --- 追加・更新 ---
+
+    def append(self, label, row):
+        """
+        行を追加します。row に含まれないカラムは NaN、未知のカラムは新規に作成します。
+
+        Parameters:
+            label: 行ラベル（通常は時刻）
+            row (dict): カラム名と値
+        """
+        if self._end >= self._capacity:
+            self._grow()
+        pos = self._end
+        self._end += 1
+        self._labels.append(label)
+        self._index[label] = pos
+        for col, arr in self._data.items():
+            if col not in row:
+                arr[pos] = np.nan
+        for col, value in row.items():
+            self._set(pos, col, value)
+        return pos
+
+    def _grow(self):
+        self._capacity *= 2
+        for col, arr in self._data.items():
+            grown = np.full(self._capacity, np.nan, dtype=arr.dtype)
+            grown[:self._end] = arr[:self._end]
+            self._data[col] = grown
+
+    def _position(self, label):
+        try:
+            return self._index[label]
+        except KeyError:
+            raise KeyError(label) from None
+
+    def _column(self, col):
+        arr = self._data.get(col)
+        if arr is None:
+            arr = self._data[col] = np.full(self._capacity, np.nan)
+        return arr
+
+    def _set(self, pos, col, value):
+        arr = self._column(col)
+        if _is_missing(value):
+            value = np.nan
+        elif arr.dtype != object and not isinstance(value, (int, float, np.number, np.bool_)):
+            arr = self._data[col] = arr.astype(object)
+        arr[pos] = value
+
+    def __setitem__(self, col, value):
+        arr = self._column(col)
+        if np.ndim(value) == 0:
+            if _is_missing(value):
+                value = np.nan
+            elif arr.dtype != object and not isinstance(value, (int, float, np.number, np.bool_)):
+                arr = self._data[col] = arr.astype(object)
+            arr[self._start:self._end] = value
+        else:
+            values = np.asarray(value)
+            if len(values) != len(self):
+                raise ValueError(f"Length of values ({len(values)}) does not match length of index ({len(self)})")
+            if values.dtype == object and arr.dtype != object:
+                arr = self._data[col] = arr.astype(object)
+            arr[self._start:self._end] = values
+
+    # --- 参照 ---
+
+    def column(self, col):
+        """カラムの保持範囲をコピーせずに返します。"""
+        return self._data[col][self._start:self._end]
+
+    def last(self, col):
+        """最新行の値を返します。"""
+        if self._end == self._start:
+            raise IndexError("ColumnStore is empty")
+        return self._data[col][self._end - 1]
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def empty(self):
+        return self._end == self._start
+
+    @property
+    def columns(self):
+        return _Columns(self._data)
+
+    @property
+    def index(self):
+        return _Labels(self._labels, self._start, self._end)
+
+    def __contains__(self, col):
+        return col in self._data
+
+    def __getitem__(self, key):
+        if isinstance(key, (list, tuple)):
+            return self.to_frame(columns=key)
+        return pd.Series(self.column(key), index=pd.Index(self.index.tolist()), name=key, copy=False)
+
+    # --- エクスポート ---
+
+    def to_frame(self, columns=None):
+        """
+        DataFrame（コピー）を返します。
+
+        Parameters:
+            columns (list): 出力するカラム（省略時は全カラム）
+        """
+        cols = list(self._data) if columns is None else list(columns)
+        return pd.DataFrame(
+            {col: self._data[col][self._start:self._end].copy() for col in cols},
+            index=pd.Index(self.index.tolist()),
+            columns=cols,
+        )
+
+    def reindex(self, columns):
+        return self.to_frame(columns=[c for c in columns if c in self._data]).reindex(columns=columns)
+
+    def tail(self, n=5):
+        return self.to_frame().tail(n)
+
+    def __repr__(self):
+        return f"ColumnStore(rows={len(self)}, columns={len(self._data)})"
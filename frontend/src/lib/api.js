@@ -138,3 +138,18 @@ export async function getMarginDaily(days = 30) {
 export async function postImportTrades() {
   return fetchJson(`${API_BASE}/trades/import`, { method: 'POST' })
 }
+
+// Server-push stream: calls handlers[topic](data) for each changed topic.
+// onStatus(true|false) reports whether the stream is connected; the browser
+// reconnects on its own after an error. Returns a function that closes it.
+export function subscribe(handlers, onStatus) {
+  const source = new EventSource(`${API_BASE}/stream`)
+  for (const [topic, handler] of Object.entries(handlers)) {
+    source.addEventListener(topic, (event) => {
+      try { handler(JSON.parse(event.data)) } catch { /* ignore malformed frame */ }
+    })
+  }
+  source.onopen = () => onStatus && onStatus(true)
+  source.onerror = () => onStatus && onStatus(false)
+  return () => source.close()
+}
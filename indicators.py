@@ -0,0 +1,337 @@
+# indicators.py
+
+import math
+from collections import deque
+
+import numpy as np
+
+
+NAN = float("nan")
+
+# 出力するカラム
+INDICATOR_COLUMNS = ['upper_band', 'lower_band', 'band_width', 'hist', 'di_difference', 'adx_difference']
+# pandas の bfill と同様に、後続の値で欠損を埋めるカラム
+BFILL_COLUMNS = ('band_width', 'di_difference', 'adx_difference')
+
+
+class RollingSum:
+    """
+    rolling(window, min_periods=1).sum() と同じ計算順序（Kahan 補正付きの加算・減算）で
+    1件ずつ更新する移動合計です。
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same = 0
+        self._prev = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self._comp_add
+        t = self.sum_x + y
+        self._comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if val == self._prev:
+            self._same += 1
+        else:
+            self._same = 1
+        self._prev = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self._comp_remove
+        t = self.sum_x + y
+        self._comp_remove = t - self.sum_x - y
+        self.sum_x = t
+
+    def _push(self, val):
+        if self._prev is None:
+            self._prev = val
+        self._values.append(val)
+        if len(self._values) > self.window:
+            self._remove(self._values.popleft())
+        self._add(val)
+
+    def update(self, val):
+        self._push(val)
+        if self.nobs < 1:
+            return NAN
+        if self._same >= self.nobs:
+            return self._prev * self.nobs
+        return self.sum_x
+
+
+class RollingMean(RollingSum):
+    """rolling(window, min_periods=1).mean() と同じ計算順序の移動平均です。"""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self._neg = 0
+
+    def _add(self, val):
+        super()._add(val)
+        if val < 0:
+            self._neg += 1
+
+    def _remove(self, val):
+        super()._remove(val)
+        if val < 0:
+            self._neg -= 1
+
+    def update(self, val):
+        self._push(val)
+        if self.nobs < 1:
+            return NAN
+        result = self.sum_x / self.nobs
+        if self._same >= self.nobs:
+            return self._prev
+        if self._neg == 0 and result < 0:
+            return 0.0
+        if self._neg == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingStd:
+    """
+    rolling(window, min_periods=1).std() と同じく、Kahan 補正付きの Welford 法で
+    窓への追加・削除を行う移動標準偏差（ddof=1）です。
+    """
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self._values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same = 0
+        self._prev = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        if val == self._prev:
+            self._same += 1
+        else:
+            self._same = 1
+        self._prev = val
+        self.nobs += 1
+        prev_mean = self.mean_x - self._comp_add
+        y = val - self._comp_add
+        t = y - self.mean_x
+        self._comp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self._comp_remove
+            y = val - self._comp_remove
+            t = y - self.mean_x
+            self._comp_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, val):
+        if self._prev is None:
+            self._prev = val
+        self._values.append(val)
+        if len(self._values) > self.window:
+            self._remove(self._values.popleft())
+        self._add(val)
+        if self.nobs < 1 or self.nobs <= self.ddof:
+            return NAN
+        if self.nobs == 1 or self._same >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - self.ddof)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class Ewm:
+    """
+    ewm(span, adjust=False).mean() と同じ漸化式で更新する指数移動平均です。
+    欠損値は ignore_na=False と同様に重みの減衰のみ行います。
+    """
+
+    def __init__(self, span):
+        alpha = 2.0 / (span + 1.0)
+        self._alpha = alpha
+        self._decay = 1.0 - alpha
+        self._old_wt = 1.0
+        self.weighted = None
+
+    def update(self, cur):
+        if self.weighted is None:
+            self.weighted = cur
+            return cur
+        weighted = self.weighted
+        if weighted == weighted:
+            self._old_wt *= self._decay
+            if cur == cur:
+                if weighted != cur:
+                    weighted = (self._old_wt * weighted + self._alpha * cur) / (self._old_wt + self._alpha)
+                self._old_wt = 1.0
+        elif cur == cur:
+            weighted = cur
+        self.weighted = weighted
+        return weighted
+
+
+def _div(a, b):
+    """pandas の浮動小数点除算と同じく、0除算は inf / NaN を返します。"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class IndicatorEngine:
+    """
+    ボリンジャーバンド、MACD、DMI/ADX を1本の足ごとに定数時間で更新するインクリメンタル計算エンジンです。
+
+    TradingData.calculate_bollinger_bands / calculate_macd / calculate_dmi_adx が init.df 全体に対して
+    行う pandas の計算と同じ加算順序・漸化式を用いるため、最新行の値は pandas の結果とビット単位で一致します。
+    ただし最新行より前の値は、pandas と同様に band_width / di_difference / adx_difference の欠損を
+    後続の値で埋め戻した (bfill) 結果になります。
+    """
+
+    def __init__(self, bb_window=20, bb_std=1.96, macd_short=5, macd_middle=20, macd_long=40,
+                 macd_signal=9, dmi_window=14, capacity=1024):
+        self.bb_std = bb_std
+        self._bb_mean = RollingMean(bb_window)
+        self._bb_std = RollingStd(bb_window)
+        # 元の実装でも short_ema は MACD に使われていないため、macd_short は受け取るだけで計算しない
+        self._middle_ema = Ewm(macd_middle)
+        self._long_ema = Ewm(macd_long)
+        self._signal_ema = Ewm(macd_signal)
+        self._tr_sum = RollingSum(dmi_window)
+        self._plus_dm_sum = RollingSum(dmi_window)
+        self._minus_dm_sum = RollingSum(dmi_window)
+        self._adx = Ewm(dmi_window)
+        self._adxr = Ewm(dmi_window)
+        self._prev_high = None
+        self._prev_low = None
+        self._prev_close = None
+
+        self.count = 0
+        self._columns = {col: np.full(capacity, np.nan) for col in INDICATOR_COLUMNS}
+        self._nan_run = {col: None for col in BFILL_COLUMNS}
+        # 前回 take_changes() 以降に値が変わった最小の行番号
+        self._dirty_from = 0
+
+    def _grow(self):
+        for col, arr in self._columns.items():
+            grown = np.full(len(arr) * 2, np.nan)
+            grown[:self.count] = arr[:self.count]
+            self._columns[col] = grown
+
+    def update(self, high, low, close):
+        """
+        新しい足を1本追加して指標を更新します。
+
+        Parameters:
+            high (float): 高値
+            low (float): 安値
+            close (float): 終値
+
+        Returns:
+            dict: 最新行の指標値
+        """
+        high, low, close = float(high), float(low), float(close)
+
+        # ボリンジャーバンド
+        mean = self._bb_mean.update(close)
+        std = self._bb_std.update(close)
+        upper_band = mean + (std * self.bb_std)
+        lower_band = mean - (std * self.bb_std)
+        band_width = _div(upper_band - lower_band, mean)
+
+        # MACD
+        macd_3 = self._middle_ema.update(close) - self._long_ema.update(close)
+        signal = self._signal_ema.update(macd_3)
+        hist = _div(macd_3 - signal, close)
+
+        # DMI / ADX
+        if self._prev_high is None:
+            up_move = down_move = NAN
+            true_range = high - low
+        else:
+            up_move = high - self._prev_high
+            down_move = -(low - self._prev_low)
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        plus_dm = up_move if (up_move > 0 and up_move > down_move) else 0.0
+        minus_dm = down_move if (down_move > 0 and down_move > up_move) else 0.0
+        atr = self._tr_sum.update(true_range)
+        plus_di = 100 * _div(self._plus_dm_sum.update(plus_dm), atr)
+        minus_di = 100 * _div(self._minus_dm_sum.update(minus_dm), atr)
+        di_difference = _div(plus_di - minus_di, atr)
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        adx = self._adx.update(dx)
+        adxr = self._adxr.update(adx)
+        adx_difference = _div(adx - adxr, atr)
+        self._prev_high, self._prev_low, self._prev_close = high, low, close
+
+        row = {
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'band_width': band_width,
+            'hist': hist,
+            'di_difference': di_difference,
+            'adx_difference': adx_difference,
+        }
+        self._store(row)
+        return row
+
+    def _store(self, row):
+        i = self.count
+        if i >= len(self._columns['hist']):
+            self._grow()
+        for col, value in row.items():
+            self._columns[col][i] = value
+        for col in BFILL_COLUMNS:
+            value = row[col]
+            run = self._nan_run[col]
+            if value != value:
+                if run is None:
+                    self._nan_run[col] = i
+            elif run is not None:
+                # 欠損の連続区間を後続の値で埋める（各欠損は一度だけ埋まるため償却 O(1)）
+                self._columns[col][run:i] = value
+                self._nan_run[col] = None
+                self._dirty_from = min(self._dirty_from, run)
+        self.count = i + 1
+
+    def column(self, name):
+        """指標カラムの計算済み範囲をコピーせずに返します。"""
+        return self._columns[name][:self.count]
+
+    def take_changes(self):
+        """
+        前回の呼び出し以降に追加・更新された行の開始位置を返し、変更の記録をリセットします。
+
+        Returns:
+            int: 変更のあった最小の行番号
+        """
+        start = self._dirty_from
+        self._dirty_from = self.count
+        return start
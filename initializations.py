@@ -3,6 +3,9 @@
 import pandas as pd
 import logging
 
+from ohlc_store import OhlcStore
+from column_store import ColumnStore
+
 class Initializations:
     def __init__(self):
         # API関連の設定
@@ -60,7 +63,8 @@ class Initializations:
 
         # データフレームの初期化
         self.prices = []
-        self.df = pd.DataFrame(columns=['open', 'high', 'low', 'close'])
+        # OHLCデータ（NumPy配列で保持。DataFrame が必要な場合は df.to_frame()）
+        self.df = OhlcStore()
         # ピボットポイントの初期化
         self.P = self.R1 = self.R2 = self.R3 = self.S1 = self.S2 = self.S3 = 0
 
@@ -92,8 +96,8 @@ class Initializations:
             'adx_difference': 1.85
         }
 
-        # interpolated_data の初期化
-        self.interpolated_data = pd.DataFrame(columns=[
+        # interpolated_data の初期化（列指向ストア。DataFrame が必要な場合は interpolated_data.to_frame()）
+        self.interpolated_data = ColumnStore(columns=[
             'close', 'buy_and_hold_equity', 'trading_equity', 'cash', 'stock_value', 'quantity',
             'buy_signals', 'sell_signals',
             'hedge_buy_signals', 'hedge_sell_signals',
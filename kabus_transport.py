@@ -0,0 +1,112 @@
+# kabus_transport.py
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from latency_metrics import metrics as shared_metrics
+from rate_limiter import POLLING, limiter as shared_limiter
+
+
+# (接続タイムアウト, 読み込みタイムアウト) 秒
+DEFAULT_TIMEOUT = (2.0, 10.0)
+DEFAULT_POOL_SIZE = 8
+
+
+class KabusTransport:
+    """
+    kabusapi への HTTP 通信を一本化するトランスポート層です。
+
+    requests.Session のコネクションプールを全ての呼び出し元で共有し、
+    Keep-Alive で接続を使い回すことで注文ごとの TCP/HTTP ハンドシェイクを省きます。
+    送信前に RateLimiter から優先度に応じたトークンを取得し、
+    送信から応答までの所要時間をエンドポイントごとに LatencyMetrics に記録します。
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, limiter=None, metrics=None):
+        self._lock = threading.Lock()
+        self.timeout = timeout
+        self.limiter = limiter
+        self.metrics = metrics
+        self._session = self._build_session(pool_maxsize)
+
+    @staticmethod
+    def _build_session(pool_maxsize):
+        session = requests.Session()
+        # 発注は冪等ではないため自動リトライは行わない
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def configure(self, pool_maxsize=None, timeout=None):
+        """
+        プールサイズとデフォルトのタイムアウトを変更します。
+
+        Parameters:
+            pool_maxsize (int): ホストごとに保持する接続数
+            timeout (float | tuple): デフォルトのタイムアウト秒数
+        """
+        with self._lock:
+            if timeout is not None:
+                self.timeout = timeout
+            if pool_maxsize is not None:
+                old = self._session
+                self._session = self._build_session(pool_maxsize)
+                old.close()
+
+    def request(self, method, url, token=None, params=None, json=None, timeout=None, headers=None,
+                priority=POLLING):
+        """
+        共有セッションでリクエストを送信します。
+
+        Parameters:
+            method (str): HTTPメソッド
+            url (str): リクエストURL
+            token (str): X-API-KEY に設定するトークン
+            params (dict): クエリパラメータ
+            json (dict): リクエストボディ
+            timeout (float | tuple): このリクエストのタイムアウト（省略時はデフォルト）
+            headers (dict): 追加ヘッダー
+            priority (int): rate_limiter の優先度クラス
+
+        Returns:
+            requests.Response: レスポンス（ステータスコードの判定は呼び出し側で行う）
+
+        Raises:
+            RateLimited: レート制限によりリクエストが破棄された場合
+        """
+        if self.limiter is not None:
+            self.limiter.acquire(priority)
+        request_headers = dict(headers) if headers else {}
+        if token is not None:
+            request_headers["X-API-KEY"] = token
+        # レート制限の待ち時間は含めず、送信から応答までを計測する
+        started = time.perf_counter()
+        try:
+            response = self._session.request(
+                method,
+                url,
+                params=params,
+                json=json,
+                headers=request_headers,
+                timeout=timeout if timeout is not None else self.timeout,
+            )
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.observe(url, method, time.perf_counter() - started, error=type(e).__name__)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe(url, method, time.perf_counter() - started, status=response.status_code)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._session.close()
+
+
+# プロセス内で共有するトランスポート
+transport = KabusTransport(limiter=shared_limiter, metrics=shared_metrics)
@@ -0,0 +1,329 @@
+# latency_metrics.py
+
+import bisect
+import functools
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# ヒストグラムのバケット上限（秒）。最後に +Inf のバケットが続く
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# ループ処理の段階ごとのバケット上限（ナノ秒）: 10µs〜10s
+STAGE_BUCKETS_NS = (
+    10_000, 25_000, 50_000, 100_000, 250_000, 500_000,
+    1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000,
+    100_000_000, 250_000_000, 500_000_000, 1_000_000_000, 2_500_000_000, 10_000_000_000,
+)
+
+# パスのうち小文字の英字だけの区切りをエンドポイント名に含める（銘柄コードや ID は除く）
+_WORD = re.compile(r"^[a-z]+$")
+
+
+@functools.lru_cache(maxsize=1024)
+def endpoint_name(url):
+    """
+    URL から集計用のエンドポイント名を求めます。
+
+    /kabusapi 以降のパスのうち、銘柄コードや注文 ID などの可変部分を除いた先頭部分を返します。
+    例: .../kabusapi/board/1579@1 → /board, .../kabusapi/sendorder/future → /sendorder/future
+
+    Parameters:
+        url (str): リクエストURL
+
+    Returns:
+        str: エンドポイント名
+    """
+    path = urlsplit(url).path
+    if "/kabusapi" in path:
+        path = path.split("/kabusapi", 1)[1]
+    words = []
+    for part in path.strip("/").split("/"):
+        if not _WORD.match(part):
+            break
+        words.append(part)
+    return "/" + "/".join(words)
+
+
+class LatencyHistogram:
+    """
+    エンドポイント1つ分の固定バケットのレイテンシヒストグラムです。
+    bounds の単位（秒・ナノ秒など）は記録する値に合わせます。
+
+    バケットの位置はロックの外で求め、ロック内ではカウンタの加算だけを行うため、
+    発注経路から呼び出しても待ち時間はほぼ生じません。
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max", "status", "exceptions", "_lock")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.status = {}       # ステータスコード → 件数
+        self.exceptions = {}   # 例外のクラス名 → 件数（応答を受け取れなかったもの）
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, status=None, error=None):
+        """
+        1件の所要時間を記録します。
+
+        Parameters:
+            seconds (float): 所要時間（秒）
+            status (int): HTTPステータスコード（応答がない場合は None）
+            error (str): 応答を受け取れなかった場合の例外のクラス名
+        """
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if status is not None:
+                self.status[status] = self.status.get(status, 0) + 1
+            if error is not None:
+                self.exceptions[error] = self.exceptions.get(error, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return (list(self.counts), self.count, self.sum, self.max, dict(self.status), dict(self.exceptions))
+
+    def quantile(self, q, counts=None):
+        """
+        バケットの累積件数から分位点を線形補間で推定します（Prometheus の histogram_quantile と同じ方法）。
+
+        Parameters:
+            q (float): 0〜1 の分位
+            counts (list): バケットごとの件数（省略時は現在の値）
+
+        Returns:
+            float: 推定値（bounds と同じ単位）。記録がない場合は None
+        """
+        if counts is None:
+            counts = self.snapshot()[0]
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, n in enumerate(counts):
+            if cumulative + n >= rank and n:
+                if index == len(self.bounds):
+                    # +Inf のバケットは最大の有限の上限で代用する
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.bounds[-1]
+
+
+class LatencyMetrics:
+    """
+    kabusapi のエンドポイント・HTTPメソッドごとのレイテンシヒストグラムの集合です。
+
+    KabusTransport が全てのリクエストの所要時間・ステータスコード・例外を記録し、
+    /api/metrics から JSON または Prometheus のテキスト形式で参照します。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def histogram(self, endpoint, method):
+        key = (endpoint, method.upper())
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, LatencyHistogram(self.buckets))
+        return series
+
+    def observe(self, url, method, seconds, status=None, error=None):
+        """
+        1件のリクエストの結果を記録します。
+
+        Parameters:
+            url (str): リクエストURL
+            method (str): HTTPメソッド
+            seconds (float): 所要時間（秒）
+            status (int): HTTPステータスコード
+            error (str): 応答を受け取れなかった場合の例外のクラス名
+        """
+        self.histogram(endpoint_name(url), method).observe(seconds, status, error)
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+    def stats(self):
+        """
+        JSON 用の集計を返します。
+
+        Returns:
+            dict: buckets と、エンドポイントごとの件数・分位点・エラー件数・ステータスコード
+        """
+        endpoints = []
+        for (endpoint, method), series in self._items():
+            counts, count, total, max_, status, exceptions = series.snapshot()
+            http_errors = sum(n for code, n in status.items() if code >= 400)
+            entry = {
+                "endpoint": endpoint,
+                "method": method,
+                "count": count,
+                "errors": http_errors + sum(exceptions.values()),
+                "status": {str(code): n for code, n in sorted(status.items())},
+                "exceptions": exceptions,
+                "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                "max_ms": round(max_ * 1000, 3),
+                "buckets": counts,
+            }
+            for q in QUANTILES:
+                value = series.quantile(q, counts)
+                entry[f"p{round(q * 100)}_ms"] = round(value * 1000, 3) if value is not None else None
+            endpoints.append(entry)
+        return {"buckets_ms": [round(b * 1000, 3) for b in self.buckets], "endpoints": endpoints}
+
+    def prometheus(self, prefix="kabusapi"):
+        """
+        Prometheus のテキスト形式（exposition format 0.0.4）で出力します。
+
+        Returns:
+            str: メトリクスのテキスト
+        """
+        duration = f"{prefix}_request_duration_seconds"
+        lines = [
+            f"# HELP {duration} kabusapi request latency in seconds.",
+            f"# TYPE {duration} histogram",
+        ]
+        responses, errors, quantiles = [], [], []
+        for (endpoint, method), series in self._items():
+            counts, count, total, _, status, exceptions = series.snapshot()
+            labels = f'endpoint="{endpoint}",method="{method}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets + (None,), counts):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f'{duration}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{duration}_sum{{{labels}}} {total!r}")
+            lines.append(f"{duration}_count{{{labels}}} {count}")
+            for code, n in sorted(status.items()):
+                responses.append(f'{prefix}_responses_total{{{labels},code="{code}"}} {n}')
+            for name, n in sorted(exceptions.items()):
+                errors.append(f'{prefix}_request_errors_total{{{labels},error="{name}"}} {n}')
+            for q in QUANTILES:
+                value = series.quantile(q, counts)
+                if value is not None:
+                    quantiles.append(f'{duration}_quantile{{{labels},quantile="{q}"}} {value!r}')
+        for name, kind, help_text, rows in (
+            (f"{prefix}_responses_total", "counter", "kabusapi responses by HTTP status code.", responses),
+            (f"{prefix}_request_errors_total", "counter", "kabusapi requests that received no response.", errors),
+            (f"{duration}_quantile", "gauge", "kabusapi latency quantiles estimated from the histogram.", quantiles),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(rows)
+        return "\n".join(lines) + "\n"
+
+
+class StageTimers:
+    """
+    ループ1回の処理を段階ごとに計測するタイマーです。
+
+    begin() でループの開始時刻を記録し、各段階の終わりに lap(index) を呼ぶと
+    直前の区切りからの経過時間（time.perf_counter_ns）がその段階のヒストグラムに加算されます。
+    段階は添字で指定し、記録先は全て事前に確保しているため、ループごとの辞書やリストの生成はありません。
+    end() でループ全体の時間を記録し、予算を超えた場合は超過回数を数えます。
+    書き込みはループのスレッドだけが行う前提です。
+    """
+
+    def __init__(self, stages, budget=None, buckets=STAGE_BUCKETS_NS, clock=time.perf_counter_ns):
+        """
+        Parameters:
+            stages (tuple): 段階の名前（lap に渡す添字の順）
+            budget (float): ループ1回の処理時間の予算（秒）。None は超過を数えない
+            buckets (tuple): バケット上限（ナノ秒）
+            clock (callable): ナノ秒単位の単調増加する時刻関数
+        """
+        self.stages = tuple(stages)
+        self.clock = clock
+        self.budget_ns = int(budget * 1e9) if budget is not None else None
+        self.histograms = [LatencyHistogram(buckets) for _ in self.stages]
+        self.loop = LatencyHistogram(buckets)
+        self.last_ns = [0] * len(self.stages)
+        self.iterations = 0
+        self.overruns = 0
+        self.worst_overrun_ns = 0
+        self._start = 0
+        self._mark = 0
+
+    def begin(self):
+        self._start = self._mark = self.clock()
+
+    def lap(self, index):
+        now = self.clock()
+        elapsed = now - self._mark
+        self._mark = now
+        self.last_ns[index] = elapsed
+        self.histograms[index].observe(elapsed)
+
+    def end(self):
+        """
+        ループ1回分の計測を終えます。
+
+        Returns:
+            int: ループ全体の処理時間（ナノ秒）
+        """
+        elapsed = self.clock() - self._start
+        self.loop.observe(elapsed)
+        self.iterations += 1
+        if self.budget_ns is not None and elapsed > self.budget_ns:
+            self.overruns += 1
+            if elapsed - self.budget_ns > self.worst_overrun_ns:
+                self.worst_overrun_ns = elapsed - self.budget_ns
+        return elapsed
+
+    @staticmethod
+    def _summary(histogram):
+        counts, count, total, max_, _, _ = histogram.snapshot()
+        entry = {
+            "count": count,
+            "avg_ms": round(total / count / 1e6, 3) if count else 0.0,
+            "max_ms": round(max_ / 1e6, 3),
+        }
+        for q in QUANTILES:
+            value = histogram.quantile(q, counts)
+            entry[f"p{round(q * 100)}_ms"] = round(value / 1e6, 3) if value is not None else None
+        return entry
+
+    def stats(self):
+        """
+        /api/status 用の集計を返します。
+
+        Returns:
+            dict: ループ回数・予算超過回数と、段階ごとの件数・平均・分位点・直近の所要時間（ミリ秒）
+        """
+        return {
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "budget_ms": round(self.budget_ns / 1e6, 3) if self.budget_ns is not None else None,
+            "worst_overrun_ms": round(self.worst_overrun_ns / 1e6, 3),
+            "loop": self._summary(self.loop),
+            "stages": {
+                name: dict(self._summary(histogram), last_ms=round(last / 1e6, 3))
+                for name, histogram, last in zip(self.stages, self.histograms, self.last_ns)
+            },
+        }
+
+
+# プロセス内で共有するメトリクス
+metrics = LatencyMetrics()
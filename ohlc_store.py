@@ -0,0 +1,160 @@
+# ohlc_store.py
+
+import numpy as np
+import pandas as pd
+
+
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+class _Columns(list):
+    """DataFrame.columns と同様に `in` 判定とリスト化ができるカラム名の一覧です。"""
+
+    def tolist(self):
+        return list(self)
+
+
+class OhlcStore:
+    """
+    NumPy 配列で保持する事前確保型の OHLC ストアです。
+
+    足の追加は配列への書き込みのみで、容量が不足した場合は倍に拡張するため償却 O(1) です。
+    maxlen を指定するとリングバッファとして動作し、直近 maxlen 本のみを保持します
+    （2倍の領域を確保し、末尾に達した時点で直近分を先頭へ寄せるため、こちらも償却 O(1) です）。
+    column() はコピーせずに NumPy のビューを返し、`store['close']` などの DataFrame 互換の
+    アクセサは既存の呼び出し元のために pandas.Series を返します。
+    """
+
+    def __init__(self, capacity=1024, maxlen=None):
+        """
+        Parameters:
+            capacity (int): 初期に確保する行数
+            maxlen (int): 保持する最大行数（None の場合は全ての足を保持）
+        """
+        self.maxlen = maxlen
+        if maxlen is not None:
+            capacity = max(capacity, 2 * maxlen)
+        self._capacity = capacity
+        self._index = np.empty(capacity, dtype='datetime64[ns]')
+        self._data = {col: np.full(capacity, np.nan) for col in OHLC_COLUMNS}
+        self._start = 0
+        self._end = 0
+        # これまでに追加した足の総数（リングバッファで破棄した足を含む）
+        self.total = 0
+
+    # --- 追加・拡張 ---
+
+    def append(self, timestamp, open_, high, low, close):
+        """
+        足を1本追加します。
+
+        Parameters:
+            timestamp (datetime): 足の時刻
+            open_, high, low, close (float): 四本値
+        """
+        if self._end >= self._capacity:
+            self._make_room()
+        i = self._end
+        self._index[i] = np.datetime64(timestamp, 'ns')
+        data = self._data
+        data['open'][i] = open_
+        data['high'][i] = high
+        data['low'][i] = low
+        data['close'][i] = close
+        for col, arr in data.items():
+            if col not in OHLC_COLUMNS:
+                arr[i] = np.nan
+        self._end = i + 1
+        self.total += 1
+        if self.maxlen is not None and self._end - self._start > self.maxlen:
+            self._start = self._end - self.maxlen
+
+    def _make_room(self):
+        n = self._end - self._start
+        if self.maxlen is not None and n <= self._capacity // 2:
+            # 保持中の行を先頭へ寄せる
+            self._index[:n] = self._index[self._start:self._end]
+            for arr in self._data.values():
+                arr[:n] = arr[self._start:self._end]
+        else:
+            self._capacity *= 2
+            index = np.empty(self._capacity, dtype='datetime64[ns]')
+            index[:n] = self._index[self._start:self._end]
+            self._index = index
+            for col, arr in self._data.items():
+                grown = np.full(self._capacity, np.nan)
+                grown[:n] = arr[self._start:self._end]
+                self._data[col] = grown
+        self._start, self._end = 0, n
+
+    # --- NumPy アクセサ（コピーなし） ---
+
+    @property
+    def dropped(self):
+        """リングバッファから破棄された足の数"""
+        return self.total - len(self)
+
+    def column(self, name, create=False):
+        """
+        カラムの保持範囲をコピーせずに返します。
+
+        Parameters:
+            name (str): カラム名
+            create (bool): True の場合、存在しないカラムを NaN で作成する
+        """
+        if name not in self._data:
+            if not create:
+                raise KeyError(name)
+            self._data[name] = np.full(self._capacity, np.nan)
+        return self._data[name][self._start:self._end]
+
+    def last(self, name):
+        """最新行の値を返します。"""
+        if self._end == self._start:
+            raise IndexError("OhlcStore is empty")
+        return self._data[name][self._end - 1]
+
+    def index_values(self):
+        return self._index[self._start:self._end]
+
+    # --- DataFrame 互換のアクセサ ---
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def empty(self):
+        return self._end == self._start
+
+    @property
+    def columns(self):
+        return _Columns(self._data)
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.index_values())
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __getitem__(self, name):
+        return pd.Series(self.column(name), index=self.index, name=name, copy=False)
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values, dtype=float)
+        if values.shape != (len(self),):
+            raise ValueError(f"length mismatch for column '{name}': {values.shape} != ({len(self)},)")
+        self.column(name, create=True)[:] = values
+
+    def to_frame(self):
+        """ノートブックや UI 向けに DataFrame（コピー）を返します。"""
+        return pd.DataFrame(
+            {col: arr[self._start:self._end].copy() for col, arr in self._data.items()},
+            index=self.index,
+        )
+
+    def tail(self, n=5):
+        return self.to_frame().tail(n)
+
+    def __repr__(self):
+        return f"OhlcStore(rows={len(self)}, columns={list(self._data)})"
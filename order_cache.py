@@ -0,0 +1,170 @@
+# order_cache.py
+
+import datetime
+import threading
+import time
+
+
+# /orders の updtime パラメータの書式
+UPDTIME_FORMAT = '%Y%m%d%H%M%S'
+# updtime は秒単位のため、境界の更新を取りこぼさないよう前回の最新時刻から遡る秒数
+DEFAULT_OVERLAP = 1.0
+
+
+def order_updated_at(order):
+    """
+    注文の最終更新時刻を updtime の書式で返します。
+
+    受付時刻 (RecvTime) と明細の時刻 (Details[].TransactTime) のうち最も新しいものを使います。
+
+    Parameters:
+        order (dict): /orders の1件
+
+    Returns:
+        str: yyyyMMddHHmmss（時刻がない場合は None）
+    """
+    times = [order.get('RecvTime')] + [d.get('TransactTime') for d in order.get('Details') or []]
+    stamps = [t[:19].replace('-', '').replace('T', '').replace(':', '') for t in times if t]
+    return max(stamps) if stamps else None
+
+
+class OrderCache:
+    """
+    /orders の注文一覧を ID で索引付けして保持するローカルキャッシュです。
+
+    初回だけ全件を取得し、以降は updtime を指定して前回以降に更新された注文だけを取得して反映します。
+    当日の発注件数が増えても1回の照会で受け取る件数は変化した注文だけに留まり、
+    約定の判定は辞書の参照で行えます。同時に呼ばれた同期は1回の照会にまとめます。
+    """
+
+    def __init__(self, fetch_orders, params=None, overlap=DEFAULT_OVERLAP, clock=time.monotonic):
+        """
+        Parameters:
+            fetch_orders (callable): クエリパラメータ（dict）を受け取り /orders の一覧を返す関数。失敗時は None
+            params (dict): 毎回指定するクエリパラメータ（省略時は信用のみ）
+            overlap (float): 差分取得の際に前回の最新時刻から遡る秒数
+            clock (callable): 単調増加する時刻関数
+        """
+        self.fetch_orders = fetch_orders
+        self.params = dict(params) if params is not None else {'product': 2}
+        self.overlap = overlap
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._orders = {}
+        self._cursor = None          # 取得済みの注文の最新の更新時刻（yyyyMMddHHmmss）
+        self._loaded = False
+        self._synced_at = None
+        self._sync_started = None
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.errors = 0
+
+    # --- 同期 ---
+
+    def _updtime(self):
+        cursor = datetime.datetime.strptime(self._cursor, UPDTIME_FORMAT)
+        return (cursor - datetime.timedelta(seconds=self.overlap)).strftime(UPDTIME_FORMAT)
+
+    def sync(self, max_age=0.0):
+        """
+        /orders から変化した注文を取得してキャッシュに反映します。
+
+        別のスレッドの同期が進行中の場合はその完了を待ち、呼び出し後に開始した同期の結果を共有します。
+
+        Parameters:
+            max_age (float): 前回の同期からこの秒数以内であれば照会しない
+
+        Returns:
+            bool: キャッシュが最新であれば True、照会に失敗した場合は False
+        """
+        requested = self.clock()
+        with self._sync_lock:
+            if self._synced_at is not None and (
+                self._sync_started >= requested or self.clock() - self._synced_at <= max_age
+            ):
+                return True
+            started = self.clock()
+            incremental = self._loaded and self._cursor is not None
+            params = dict(self.params)
+            if incremental:
+                params['updtime'] = self._updtime()
+            orders = self.fetch_orders(params)
+            if orders is None:
+                self.errors += 1
+                return False
+            self.update(orders)
+            with self._lock:
+                self._loaded = True
+                if incremental:
+                    self.incremental_loads += 1
+                else:
+                    self.full_loads += 1
+            self._sync_started = started
+            self._synced_at = self.clock()
+            return True
+
+    def update(self, orders):
+        """
+        取得した注文をキャッシュに反映します。
+
+        Returns:
+            int: 追加・更新した件数
+        """
+        with self._lock:
+            for order in orders or ():
+                order_id = order.get('ID')
+                if order_id is None:
+                    continue
+                self._orders[order_id] = order
+                updated_at = order_updated_at(order)
+                if updated_at is not None and (self._cursor is None or updated_at > self._cursor):
+                    self._cursor = updated_at
+        return len(orders or ())
+
+    def reset(self):
+        """キャッシュを破棄し、次の同期で全件を取得し直します。"""
+        with self._lock:
+            self._orders = {}
+            self._cursor = None
+            self._loaded = False
+            self._synced_at = None
+
+    # --- 参照 ---
+
+    def get(self, order_id):
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def lookup(self, order_ids):
+        """ID の一覧に対応する注文のうち、キャッシュにあるものを返します。"""
+        with self._lock:
+            return [self._orders[i] for i in order_ids if i in self._orders]
+
+    def latest(self, limit=None):
+        """
+        受け取った順で末尾から limit 件の注文を返します。
+
+        Parameters:
+            limit (int): 件数（None は全件）
+
+        Returns:
+            list: 注文の一覧（古い順）
+        """
+        with self._lock:
+            orders = list(self._orders.values())
+        return orders[-limit:] if limit else orders
+
+    def __len__(self):
+        with self._lock:
+            return len(self._orders)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "orders": len(self._orders),
+                "cursor": self._cursor,
+                "full_loads": self.full_loads,
+                "incremental_loads": self.incremental_loads,
+                "errors": self.errors,
+            }
@@ -15,6 +15,10 @@ import heapq
 from pprint import pprint
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import deque
+from kabus_transport import transport
+from rate_limiter import ORDER, POLLING
+from order_tracker import OrderTracker, PLACED, FILLED, EXPIRED
+from order_cache import OrderCache
 
 """
 価格監視
@@ -41,14 +45,17 @@ ioc_exit_order(self, side, quantity, price)
 
 
 API_BASE_URL = "http://localhost:18080/kabusapi"
+DEFAULT_FILL_TIMEOUT = 10.0
+# 新規の両建ての発注方法（parallel: 2本を同時に送信 / sequential: 買い → 売りの順に送信）
+ENTRY_PARALLEL = "parallel"
+ENTRY_SEQUENTIAL = "sequential"
 
 
 def get_token(api_password):
     url = f"{API_BASE_URL}/token"
-    headers = {"Content-Type": "application/json"}
     data = {"APIPassword": api_password}
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
+        response = transport.request('POST', url, json=data, priority=ORDER)
         if response.status_code == 200:
             token = response.json().get("Token")
             return token
@@ -67,6 +74,16 @@ class OrderExecutor:
         self.order_password = order_password
         self.base_price = None 
         self.logger = logging.getLogger(__name__)
+        # /orders は初回に全件、以降は updtime で変化した注文だけを取得して ID で保持する
+        self.order_cache = OrderCache(self._request_orders)
+        # 発注時に返された OrderId ごとに約定・期限切れ・取消を追跡する
+        self.orders = OrderTracker(self._tracked_orders, logger=self.logger)
+        # 成行の新規注文・IOC返済注文の約定を待つ最大秒数
+        self.fill_timeout = DEFAULT_FILL_TIMEOUT
+        # 両建ての発注方法と、直近の発注の所要時間（送信から応答までの時間、2本の応答時刻の差）
+        self.entry_mode = ENTRY_PARALLEL
+        self.entry_timings = deque(maxlen=200)
+        self._entry_pool = None
 
 
     """
@@ -137,87 +154,26 @@ class OrderExecutor:
                     "special_sell_exit": last_row.get('special_sell_exit_signals', 0),
                 }
                 if signals.get('buy', 0) == 1 or signals.get('sell', 0) == 1:
-                    self.new_order(SIDE["BUY"], quantity)
-                    time.sleep(0.8)
-                    self.new_order(SIDE["SELL"], quantity)
-                    # ロングとショートの同時エントリーを並行処理で実行
-                    # with ThreadPoolExecutor(max_workers=2) as executor:
-                    #     future_buy = executor.submit(self.new_order, SIDE["BUY"], quantity)
-                    #     future_sell = executor.submit(self.new_order, SIDE["SELL"], quantity)
-                    #     for future in as_completed([future_buy, future_sell]):
-                    #         try:
-                    #             response = future.result()
-                    #             if future == future_buy:
-                    #                 long_response = response
-                    #                 self.logger.debug(f"Long Response: {long_response}")
-                    #             elif future == future_sell:
-                    #                 short_response = response
-                    #                 self.logger.debug(f"Short Response: {short_response}")
-                    #         except Exception as e:
-                    #             self.logger.error(f"注文処理中にエラーが発生しました: {e}")
+                    buy_entry, sell_entry = self.submit_entry_pair(quantity)
                 else:
                     return  # シグナルがなければ関数を終了
                 # 最初のサイクル終了後、フラグを更新
                 first_cycle = False  
             else:
                 # 2回目以降のサイクルではシグナルチェックをスキップ
-                self.new_order(SIDE["BUY"], quantity)
-                time.sleep(0.8)
-                self.new_order(SIDE["SELL"], quantity)
-                # with ThreadPoolExecutor(max_workers=2) as executor:
-                #     future_buy = executor.submit(self.new_order, SIDE["BUY"], quantity)
-                #     future_sell = executor.submit(self.new_order, SIDE["SELL"], quantity)
-                #     for future in as_completed([future_buy, future_sell]):
-                #         try:
-                #             response = future.result()
-                #             if future == future_buy:
-                #                 long_response = response
-                #                 self.logger.debug(f"Long Response: {long_response}")
-                #             elif future == future_sell:
-                #                 short_response = response
-                #                 self.logger.debug(f"Short Response: {short_response}")
-                #         except Exception as e:
-                #             self.logger.error(f"注文処理中にエラーが発生しました: {e}")
-
-            time.sleep(0.25)                
-            position = self.get_positions(params=None)
-            
-            # 最新の2件の注文を含むリストからそれぞれ買いと売りの注文を判定して取得
-            latest_two_orders = position[-2:]
-            buy_order = None
-            sell_order = None
-            for order in latest_two_orders:
-                side = order.get('Side')
-                if side == '1':
-                    sell_order = order
-                elif side == '2':
-                    buy_order = order
-                    
-            # print(latest_two_orders)
-            
-            
-            sell_execution_id = None
-            buy_execution_id = None
-            
-            time.sleep(0.15) 
-            for order in latest_two_orders:
-                if order.get('Side') == '1':  # Side が '1' の場合（売り注文）
-                    sell_execution_id = order.get('ExecutionID')
-                elif order.get('Side') == '2':  # Side が '2' の場合（買い注文）
-                    buy_execution_id = order.get('ExecutionID')
-
-            # 確認のために出力
-            # print("買いの建玉ID:", buy_execution_id)
-            # print("売りの建玉ID:", sell_execution_id)
-            
-            time.sleep(0.2)
+                buy_entry, sell_entry = self.submit_entry_pair(quantity)
+
+            # 発注時に返された OrderId で約定を待ち、建玉ID（ExecutionID）と約定価格を取得
+            buy_order, sell_order = self.await_entries(buy_entry, sell_entry)
+            buy_execution_id = buy_order.get('ExecutionID') if buy_order else None
+            sell_execution_id = sell_order.get('ExecutionID') if sell_order else None
+
             def extract_price_for_position(order):
                 if order is None:
                     return None
                 return order.get("Price")
             
             buy_price = extract_price_for_position(buy_order)
-            time.sleep(0.2)
             sell_price = extract_price_for_position(sell_order)
             
             print("買い価格",buy_price)
@@ -255,7 +211,6 @@ class OrderExecutor:
             # print("逆指値の買い決済価格", reverse_buy_exit_sell_order_price)
             # print("逆指値の売り決済価格", reverse_sell_exit_buy_order_price)
             
-            time.sleep(0.2)
             slide_price = 0.1
             max_retry_count = 100 
             
@@ -304,7 +259,6 @@ class OrderExecutor:
                 print(f"エラーが発生しました: {e}")
                 raise
                                         
-            time.sleep(0.2)    
 
             # 売りポジションの決済（買い注文）の場合
             try:
@@ -350,22 +304,13 @@ class OrderExecutor:
                 print(f"エラーが発生しました: {e}")
                 raise
             
-            time.sleep(0.2)
-            # time.sleep(1000)
-            
-            reverse_buy_order_id = None
-            reverse_sell_order_id = None
-            latest_orders = self.get_orders_history(limit=2)
-                        
-            # 最新の2つの注文のIDを取得
-            for order in latest_orders[-2:]:
-                if order.get('Side') == '1':  # 売り注文
-                    reverse_sell_order_id = order.get('ID')
-                elif order.get('Side') == '2':  # 買い注文
-                    reverse_buy_order_id = order.get('ID')
-                
-                
-                
+            # 逆指値注文は発注時に返された OrderId で追跡する
+            # 買いポジションの返済は売り注文、売りポジションの返済は買い注文
+            reverse_sell_order_id = self._order_id(reverse_buy_exit_response)
+            reverse_buy_order_id = self._order_id(reverse_sell_exit_response)
+            remaining_side = None
+            remaining_execution_id = None
+
             if reverse_buy_order_id or reverse_sell_order_id:
                 # ループ開始前の固定情報表示
                 # print(f"\n売り注文の逆指値返済注文ID(買い注文): {reverse_buy_order_id}")
@@ -373,63 +318,47 @@ class OrderExecutor:
                 # print(f"買い注文の逆指値返済注文ID(売り注文): {reverse_sell_order_id}")
                 print(f"買い注文の逆指値返済注文価格(売り注文): {reverse_buy_exit_sell_order_price}")
                 print("\n====== 逆指値注文の完了待機 ======")
-            
-                while True:
-                    time.sleep(0.15)
-                    # 注文履歴を取得
-                    orders_history = self.get_orders_history(limit=2)
-                    
-                    # 約定状態の確認
-                    buy_filled = False
-                    sell_filled = False
-                    
-                    for order in orders_history:
-                        order_id = order.get('ID')
-                        state = order.get('State')
-                        
-                        # State != 1 の場合、約定済みと判断
-                        if order_id == reverse_buy_order_id and state != 1:
-                            buy_filled = True
-                        elif order_id == reverse_sell_order_id and state != 1:
-                            sell_filled = True
-                    
-                    # 買いポジションの逆指値注文が約定した場合
-                    if buy_filled:
-                        # print(f"\n買い注文 {reverse_buy_order_id} が約定")
-                        print(f"買い注文が約定")
-                        if reverse_sell_order_id:
-                            # print(f"売り注文 {reverse_sell_order_id} をキャンセル実行")
-                            print(f"売り注文をキャンセル実行")
-                            current_market_price = self.trading_data.fetch_current_price()
-                            print(f"逆指値返済注文が約定した時の市場価格: {current_market_price}")
-                            cancel_result = self.cancel_order(reverse_sell_order_id)
-                        reverse_buy_order_id = None
-                        reverse_sell_order_id = None
-                        break
-                    
-                    # 売りポジションの逆指値注文が約定した場合
-                    if sell_filled:
-                        # print(f"\n売り注文 {reverse_sell_order_id} が約定")
-                        print(f"売り注文が約定")
-                        if reverse_buy_order_id:
-                            # print(f"買い注文 {reverse_buy_order_id} をキャンセル実行")
-                            print(f"買い注文をキャンセル実行")
-                            current_market_price = self.trading_data.fetch_current_price()
-                            print(f"逆指値返済注文が約定した時の市場価格: {current_market_price}")
-                            cancel_result = self.cancel_order(reverse_buy_order_id)
-                        reverse_sell_order_id = None
-                        reverse_buy_order_id = None
-                        break
-                    
-                    # current_market_price = self.trading_data.fetch_current_price()
-                    # print(f"現在の市場価格: {current_market_price}")
-                    time.sleep(0.2)
+
+                # いずれかの逆指値注文が待機（State=1）を抜けるまで、状態の変化ごとに判定する
+                records = self.orders.wait_for(
+                    [reverse_buy_order_id, reverse_sell_order_id],
+                    lambda record: record.state != PLACED,
+                    any_of=True,
+                )
+                buy_filled = reverse_buy_order_id in records and records[reverse_buy_order_id].state != PLACED
+                sell_filled = reverse_sell_order_id in records and records[reverse_sell_order_id].state != PLACED
+
+                # 買いポジションの逆指値注文が約定した場合
+                if buy_filled:
+                    # print(f"\n買い注文 {reverse_buy_order_id} が約定")
+                    print(f"買い注文が約定")
+                    if reverse_sell_order_id:
+                        # print(f"売り注文 {reverse_sell_order_id} をキャンセル実行")
+                        print(f"売り注文をキャンセル実行")
+                        current_market_price = self.trading_data.fetch_current_price()
+                        print(f"逆指値返済注文が約定した時の市場価格: {current_market_price}")
+                        cancel_result = self.cancel_order(reverse_sell_order_id)
+                    # 売りポジションが返済され、買いポジションが残る
+                    remaining_side, remaining_execution_id = '2', buy_execution_id
+
+                # 売りポジションの逆指値注文が約定した場合
+                elif sell_filled:
+                    # print(f"\n売り注文 {reverse_sell_order_id} が約定")
+                    print(f"売り注文が約定")
+                    if reverse_buy_order_id:
+                        # print(f"買い注文 {reverse_buy_order_id} をキャンセル実行")
+                        print(f"買い注文をキャンセル実行")
+                        current_market_price = self.trading_data.fetch_current_price()
+                        print(f"逆指値返済注文が約定した時の市場価格: {current_market_price}")
+                        cancel_result = self.cancel_order(reverse_buy_order_id)
+                    remaining_side, remaining_execution_id = '1', sell_execution_id
+                reverse_buy_order_id = None
+                reverse_sell_order_id = None
                 
                 # 監視終了時の表示
                 print("====== 逆指値注文の監視終了 ======")
                     
             
-            time.sleep(0.3)
             # ======== Stage2 ========
             # Stage2の処理部分（ループ内で価格監視と決済条件判定を行う）
             positions = self.get_positions()
@@ -441,7 +370,11 @@ class OrderExecutor:
                 print("アクティブなポジションが見つかりません")
                 return
                 
-            position = active_positions[-1]  # 最後のアクティブなポジションを使用
+            # 逆指値返済で残った建玉を ExecutionID で特定（特定できない場合は最後のアクティブなポジションを使用）
+            position = next(
+                (p for p in active_positions if remaining_execution_id and p.get('ExecutionID') == remaining_execution_id),
+                active_positions[-1]
+            )
             # position_2 = active_positions[-2:]
             print("取得したポジション:", position)
             side = position.get('Side')
@@ -500,14 +433,8 @@ class OrderExecutor:
                                         HoldID=execution_id,
                                         price=ioc_price
                                     )
-                                    time.sleep(0.2)
-                                    orders_history = self.get_orders_history(limit=1)
-                                    # print(orders_history[-1])
-                                    latest_order_ioc = orders_history[-1]
-                                    last_detail = latest_order_ioc['Details'][-1]
-                                    
                                     # RecType=3（期限切れ）の場合
-                                    if last_detail.get('RecType') == 3:
+                                    if self.ioc_expired(response):
                                         print("\n注文が期限切れになりました")
                                         print("取引を一時停止します。Enterキーを押して再開...")
                                         input()  # ユーザーの入力待ち
@@ -538,13 +465,8 @@ class OrderExecutor:
                                         HoldID=execution_id,
                                         price=ioc_price
                                     )
-                                    time.sleep(0.2)
-                                    orders_history = self.get_orders_history(limit=1)
-                                    # print(orders_history[-1])
-                                    latest_order_ioc = orders_history[-1]
-                                    last_detail = latest_order_ioc['Details'][-1]
                                     # RecType=3（期限切れ）の場合
-                                    if last_detail.get('RecType') == 3:
+                                    if self.ioc_expired(response):
                                         print("\n注文が期限切れになりました")
                                         print("取引を一時停止します。Enterキーを押して再開...")
                                         input()  # ユーザーの入力待ち
@@ -567,21 +489,134 @@ class OrderExecutor:
         
     
     
+    """
+    両建ての新規発注
+    """
+    def _timed_new_order(self, side, quantity):
+        submitted = time.perf_counter()
+        response = self.new_order(side, quantity)
+        return response, submitted, time.perf_counter()
+
+    def submit_entry_pair(self, quantity):
+        """
+        両建ての買い・売りの新規注文を送信し、脚ごとの送信から応答までの時間と2本の差を記録します。
+        entry_mode が parallel の場合は2本を共有コネクションプール上で同時に送信します。
+
+        Parameters:
+            quantity (int): 数量
+
+        Returns:
+            tuple: (買い注文のレスポンス, 売り注文のレスポンス)
+        """
+        if self.entry_mode == ENTRY_PARALLEL:
+            if self._entry_pool is None:
+                self._entry_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="entry")
+            future_buy = self._entry_pool.submit(self._timed_new_order, "2", quantity)
+            future_sell = self._entry_pool.submit(self._timed_new_order, "1", quantity)
+            buy, sell = future_buy.result(), future_sell.result()
+        else:
+            buy = self._timed_new_order("2", quantity)
+            sell = self._timed_new_order("1", quantity)
+
+        (buy_response, buy_sent, buy_acked), (sell_response, sell_sent, sell_acked) = buy, sell
+        timing = {
+            'time': datetime.datetime.now().isoformat(),
+            'mode': self.entry_mode,
+            'buy_ack_ms': round((buy_acked - buy_sent) * 1000, 3),
+            'sell_ack_ms': round((sell_acked - sell_sent) * 1000, 3),
+            'submit_skew_ms': round(abs(sell_sent - buy_sent) * 1000, 3),
+            'ack_skew_ms': round(abs(sell_acked - buy_acked) * 1000, 3),
+        }
+        self.entry_timings.append(timing)
+        self.logger.info(
+            f"両建て発注 ({timing['mode']}): 買い {timing['buy_ack_ms']}ms, 売り {timing['sell_ack_ms']}ms, "
+            f"応答の差 {timing['ack_skew_ms']}ms"
+        )
+        return buy_response, sell_response
+
+    def close(self):
+        """注文の追跡と発注用スレッドを停止します。"""
+        self.orders.stop()
+        if self._entry_pool is not None:
+            self._entry_pool.shutdown(wait=False)
+            self._entry_pool = None
+
+    """
+    注文の追跡
+    """
+    @staticmethod
+    def _order_id(response):
+        # /sendorder のレスポンスから OrderId を取得（失敗時は None）
+        if not response or response.get('Result') != 0:
+            return None
+        return response.get('OrderId')
+
+    def await_entries(self, buy_entry, sell_entry):
+        """
+        新規の買い・売り注文の約定を OrderId で待ち、建玉の情報を返します。
+        OrderId が得られない場合や時間内に約定しない場合は、最新の建玉2件から推定します。
+
+        Parameters:
+            buy_entry, sell_entry (dict): new_order のレスポンス
+
+        Returns:
+            tuple: (買い建玉, 売り建玉)。それぞれ Side, ExecutionID, Price を持つ dict（不明な場合は None）
+        """
+        buy_id = self._order_id(buy_entry)
+        sell_id = self._order_id(sell_entry)
+        records = self.orders.wait([buy_id, sell_id], timeout=self.fill_timeout)
+        legs = []
+        for order_id, side in ((buy_id, '2'), (sell_id, '1')):
+            record = records.get(order_id)
+            if record is None or record.state != FILLED or record.execution_id is None:
+                legs.append(None)
+                continue
+            legs.append({'Side': side, 'ExecutionID': record.execution_id, 'Price': record.price})
+        if all(legs):
+            return tuple(legs)
+
+        self.logger.warning(f"新規注文の約定を OrderId で確認できませんでした: {records}")
+        buy_order, sell_order = legs
+        for position in self.get_positions(params=None)[-2:]:
+            if position.get('Side') == '1' and sell_order is None:
+                sell_order = position
+            elif position.get('Side') == '2' and buy_order is None:
+                buy_order = position
+        return buy_order, sell_order
+
+    def ioc_expired(self, response):
+        """
+        IOC返済注文が約定せずに期限切れになったかどうかを判定します。
+
+        Parameters:
+            response (dict): exit_ioc_order のレスポンス
+
+        Returns:
+            bool: 期限切れの場合は True
+        """
+        order_id = self._order_id(response)
+        if order_id is not None:
+            record = self.orders.wait([order_id], timeout=self.fill_timeout)[order_id]
+            return record.state == EXPIRED
+        # OrderId が得られない場合は最新の注文履歴で判定する
+        orders_history = self.get_orders_history(limit=1)
+        if not orders_history:
+            return False
+        details = orders_history[-1].get('Details') or [{}]
+        return details[-1].get('RecType') == 3
+
     """
     約定判定
     """
     def is_order_filled(self, order_id):
-        # 注文IDで履歴を取得
-        params = {'order_id': order_id}
-        history = self.get_orders_history(limit=1, params=params)
+        # 差分を同期してから注文IDでキャッシュを参照する
+        self.order_cache.sync()
+        order_info = self.order_cache.get(order_id)
 
-        if not history:
+        if not order_info:
             print(f"注文ID {order_id} の履歴が取得できませんでした。")
             return False
 
-        # 履歴がリスト形式の場合、最初の注文情報を取り出す
-        order_info = history[-1] if isinstance(history, list) else history
-
         # 注文情報の全内容を確認するために全フィールドをループで出力
         print(f"\nOrder {order_id} の詳細:")
         for key, value in order_info.items():
@@ -605,25 +640,15 @@ class OrderExecutor:
             'OrderID': order_id,
             'Password': self.order_password 
         }
-        json_data = json.dumps(obj).encode('utf8')
-        
-        url = 'http://localhost:18080/kabusapi/cancelorder'
-        req = urllib.request.Request(url, json_data, method='PUT')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('X-API-KEY', self.init.token)  
+        url = f"{API_BASE_URL}/cancelorder"
         
         try:
-            with urllib.request.urlopen(req) as res:
-                # print(res.status, res.reason)
-                # for header in res.getheaders():
-                #     print(header)
-                # print()
-                content = json.loads(res.read())
-                # pprint(content)
-        except urllib.error.HTTPError as e:
-            print(e)
-            content = json.loads(e.read())
-            pprint(content)
+            res = transport.request('PUT', url, token=self.init.token, json=obj, priority=ORDER)
+            content = res.json()
+            if res.status_code != 200:
+                print(res.status_code, res.reason)
+                pprint(content)
+            return content
         except Exception as e:
             print(e)
 
@@ -639,32 +664,27 @@ class OrderExecutor:
             }
 
         url = f"{API_BASE_URL}/positions"
-        query_string = urllib.parse.urlencode(params)
-        full_url = f"{url}?{query_string}"
-        req = urllib.request.Request(full_url, method='GET')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('X-API-KEY', self.token)
 
         try:
-            with urllib.request.urlopen(req) as res:
-                content = json.loads(res.read())
-
-                # contentがリストであることを確認
-                if not isinstance(content, list):
-                    self.logger.error(f"期待していたリストではなく、{type(content)}が返されました。内容: {content}")
-                    return []  # Noneではなく空リストを返す
-                if not content:
-                    self.logger.warning("ポジションデータが空です。")
-                    return [] 
-                return content
-        except urllib.error.HTTPError as e:
-            self.logger.error(f"HTTPエラーが発生しました: {e}")
-            try:
-                error_content = json.loads(e.read())
-                pprint(error_content)
-            except Exception:
-                self.logger.error("エラー内容の解析に失敗しました。")
-            return []  # エラー発生時も空リストを返す
+            res = transport.request('GET', url, token=self.token, params=params, priority=POLLING)
+            if res.status_code != 200:
+                self.logger.error(f"HTTPエラーが発生しました: {res.status_code} {res.reason}")
+                try:
+                    pprint(res.json())
+                except Exception:
+                    self.logger.error("エラー内容の解析に失敗しました。")
+                return []  # エラー発生時も空リストを返す
+
+            content = res.json()
+
+            # contentがリストであることを確認
+            if not isinstance(content, list):
+                self.logger.error(f"期待していたリストではなく、{type(content)}が返されました。内容: {content}")
+                return []  # Noneではなく空リストを返す
+            if not content:
+                self.logger.warning("ポジションデータが空です。")
+                return [] 
+            return content
         except Exception as e:
             self.logger.error(f"ポジション取得中に例外が発生しました: {e}")
             return []  # 例外発生時も空リストを返す
@@ -673,46 +693,65 @@ class OrderExecutor:
     注文履歴取得
     """
     def get_orders_history(self, limit, params=None):
-        
+        """
+        注文履歴を返します。
+
+        params を省略した場合（信用の全注文）は OrderCache の差分同期を使い、
+        受け取った順の末尾から limit 件を返します。params を指定した場合は /orders を直接照会します。
+
+        Parameters:
+            limit (int): 件数（None は全件）
+            params (dict): /orders のクエリパラメータ
+
+        Returns:
+            list: 注文の一覧（照会に失敗した場合は None）
+        """
         if params is None:
-            params = {'product': 2}  # デフォルトでは信用を取得
+            if not self.order_cache.sync():
+                return None
+            return self.order_cache.latest(limit)
+        content = self._request_orders(params)
+        if not limit or not isinstance(content, list):
+            return content
+        return content[-limit:]
 
+    def _tracked_orders(self):
+        """OrderTracker の照会用。差分を同期し、追跡中の注文だけをキャッシュから返します。"""
+        if not self.order_cache.sync():
+            return None
+        return self.order_cache.lookup(record.order_id for record in self.orders.live())
+
+    def _request_orders(self, params):
         url = f"{API_BASE_URL}/orders"
-        query_string = urllib.parse.urlencode(params)
-        full_url = f"{url}?{query_string}"
-        req = urllib.request.Request(full_url, method='GET')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('X-API-KEY', self.token)
 
         try:
-            with urllib.request.urlopen(req) as res:
-                # レスポンスを読み込み、JSONにパース
-                content = json.loads(res.read())
-                
-                # 注文履歴の詳細を表示
-                # print("\n=== 注文履歴の詳細 ===")
-                # for order in content:
-                #     print("\n注文情報:")
-                #     print(f"注文ID: {order.get('ID')}")
-                #     print(f"状態: {order.get('State')}")
-                #     print(f"サイド: {'売り' if order.get('Side') == '1' else '買い'}")
-                #     print(f"価格: {order.get('Price')}")
-                #     print(f"数量: {order.get('Qty')}")
-                #     print(f"注文タイプ: {order.get('FrontOrderType')}")
-                #     print(f"執行条件: {order.get('ExecutionCondition')}")
-                #     print("-" * 40)
-
-                # 正常に取得できた場合、注文履歴を返す
-                return content
+            res = transport.request('GET', url, token=self.token, params=params, priority=POLLING)
+            if res.status_code != 200:
+                print("HTTPエラー:", res.status_code, res.reason)
+                try:
+                    pprint(res.json())
+                except Exception:
+                    print("[ERROR] エラーレスポンスの解析に失敗しました。")
+                return None
 
-        except urllib.error.HTTPError as e:
-            print("HTTPエラー:", e)
-            try:
-                error_content = json.loads(e.read())
-                pprint.pprint(error_content)
-            except Exception:
-                print("[ERROR] エラーレスポンスの解析に失敗しました。")
-            return None
+            # レスポンスを読み込み、JSONにパース
+            content = res.json()
+            
+            # 注文履歴の詳細を表示
+            # print("\n=== 注文履歴の詳細 ===")
+            # for order in content:
+            #     print("\n注文情報:")
+            #     print(f"注文ID: {order.get('ID')}")
+            #     print(f"状態: {order.get('State')}")
+            #     print(f"サイド: {'売り' if order.get('Side') == '1' else '買い'}")
+            #     print(f"価格: {order.get('Price')}")
+            #     print(f"数量: {order.get('Qty')}")
+            #     print(f"注文タイプ: {order.get('FrontOrderType')}")
+            #     print(f"執行条件: {order.get('ExecutionCondition')}")
+            #     print("-" * 40)
+
+            # 正常に取得できた場合、注文履歴を返す
+            return content
 
         except Exception as e:
             print("例外発生:", e)
@@ -742,24 +781,19 @@ class OrderExecutor:
             'Price': 0, 
             'ExpireDay': 0                          # 注文有効期限（日数、0は当日）
         }
-        json_data = json.dumps(obj).encode('utf-8')
         url = f"{API_BASE_URL}/sendorder"
-        req = urllib.request.Request(url, json_data, method='POST')
-        req.add_header('Content-Type', 'application/json') 
-        req.add_header('X-API-KEY', self.init.token)    
 
         try:
-            with urllib.request.urlopen(req) as res:
-                content = json.loads(res.read())
-                return content
-                
-        except urllib.error.HTTPError as e:
+            res = transport.request('POST', url, token=self.init.token, json=obj, priority=ORDER)
+            if res.status_code == 200:
+                return res.json()
+
             self.logger.error(f"新規注文送信中にHTTPエラーが発生しました:")
-            self.logger.error(f"ステータスコード: {e.code}")
-            self.logger.error(f"理由: {e.reason}")
+            self.logger.error(f"ステータスコード: {res.status_code}")
+            self.logger.error(f"理由: {res.reason}")
             try:
                 # エラーレスポンスの本文を読み取り
-                error_content = json.loads(e.read())
+                error_content = res.json()
                 self.logger.error(f"エラー詳細: {error_content}")
                 if 'Code' in error_content:
                     self.logger.error(f"エラーコード: {error_content['Code']}")
@@ -819,26 +853,19 @@ class OrderExecutor:
         # print(f"HoldID: {HoldID}")
         # print("================================\n")
         
-        json_data = json.dumps(obj).encode('utf-8')
         url = f"{API_BASE_URL}/sendorder"
         
-        req = urllib.request.Request(url, json_data, method='POST')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('X-API-KEY', self.init.token)
-        
         try:
-            with urllib.request.urlopen(req) as res:
-                response_data = res.read().decode('utf-8')
-                content = json.loads(response_data)
-                return content
+            res = transport.request('POST', url, token=self.init.token, json=obj, priority=ORDER)
+            if res.status_code == 200:
+                return res.json()
 
-        except urllib.error.HTTPError as e:
             print("\n逆指値返済注文でエラーが発生しました")
-            print(f"ステータスコード: {e.code}")
-            print(f"エラーの理由: {e.reason}")
+            print(f"ステータスコード: {res.status_code}")
+            print(f"エラーの理由: {res.reason}")
             
             try:
-                error_body = e.read().decode('utf-8')
+                error_body = res.text
                 error_details = json.loads(error_body)
                 # print("\nエラーの詳細:")
                 # print(f"エラーコード: {error_details.get('Code', 'N/A')}")
@@ -895,16 +922,12 @@ class OrderExecutor:
         #     if key != 'Password':  # パスワードは表示しない
         #         print(f"  {key}: {value}")
                 
-        json_data = json.dumps(obj).encode('utf-8')
         url = f"{API_BASE_URL}/sendorder"
-        req = urllib.request.Request(url, json_data, method='POST')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('X-API-KEY', self.init.token)
 
         try:
-            with urllib.request.urlopen(req) as res:
-                response_body = res.read().decode('utf-8')
-                content = json.loads(response_body)
+            res = transport.request('POST', url, token=self.init.token, json=obj, priority=ORDER)
+            if res.status_code == 200:
+                content = res.json()
                 
                 # レスポンスの解析
                 if content.get('Result') == 0:
@@ -916,11 +939,10 @@ class OrderExecutor:
 
                 return content
 
-        except urllib.error.HTTPError as e:
-            print(f"  ステータスコード: {e.code}")
-            print(f"  理由: {e.reason}")
+            print(f"  ステータスコード: {res.status_code}")
+            print(f"  理由: {res.reason}")
             try:
-                error_body = e.read().decode('utf-8')
+                error_body = res.text
                 error_details = json.loads(error_body)
                 print(f"  エラーの詳細:")
                 print(f"    コード: {error_details.get('Code', 'N/A')}")
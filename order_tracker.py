@@ -0,0 +1,245 @@
+# order_tracker.py
+
+import logging
+import threading
+import time
+
+
+# 注文のライフサイクル
+PLACED = 'placed'          # 発注済み（/orders に未反映、または State=1 待機）
+WORKING = 'working'        # 市場で執行中（State=2〜4）
+FILLED = 'filled'          # 全数量が約定
+EXPIRED = 'expired'        # 期限切れ・失効（IOC の未約定を含む）
+CANCELLED = 'cancelled'    # 取消済み
+TERMINAL = frozenset({FILLED, EXPIRED, CANCELLED})
+
+# /orders の Details[].RecType
+REC_EXPIRED = 3
+REC_CANCELLED = 6
+REC_LAPSED = 7
+REC_EXECUTION = 8
+
+# /orders の State
+STATE_WAITING = 1
+STATE_DONE = 5
+
+DEFAULT_POLL_INTERVAL = 0.1
+
+
+def classify_order(order):
+    """
+    /orders の1件からライフサイクル上の状態を判定します。
+
+    Returns:
+        str: PLACED, WORKING, FILLED, EXPIRED, CANCELLED のいずれか
+    """
+    state = order.get('State')
+    if state != STATE_DONE:
+        return PLACED if state in (None, STATE_WAITING) else WORKING
+    order_qty = order.get('OrderQty') or 0
+    if order_qty and (order.get('CumQty') or 0) >= order_qty:
+        return FILLED
+    rec_types = {detail.get('RecType') for detail in order.get('Details') or []}
+    if REC_CANCELLED in rec_types:
+        return CANCELLED
+    if rec_types & {REC_EXPIRED, REC_LAPSED}:
+        return EXPIRED
+    return CANCELLED
+
+
+class OrderRecord:
+    """発注時に返された OrderId で追跡する注文1件の状態です。"""
+
+    __slots__ = ('order_id', 'label', 'state', 'api_state', 'side', 'order_qty', 'cum_qty',
+                 'price', 'execution_ids', 'placed_at', 'updated_at')
+
+    def __init__(self, order_id, label=None, placed_at=None):
+        self.order_id = order_id
+        self.label = label
+        self.state = PLACED
+        self.api_state = None       # /orders の State（未反映の場合は None）
+        self.side = None
+        self.order_qty = None
+        self.cum_qty = 0
+        self.price = None           # 約定の平均価格
+        self.execution_ids = []     # 約定の ExecutionID（返済時の HoldID）
+        self.placed_at = placed_at
+        self.updated_at = placed_at
+
+    @property
+    def done(self):
+        return self.state in TERMINAL
+
+    @property
+    def execution_id(self):
+        return self.execution_ids[0] if self.execution_ids else None
+
+    def _apply(self, order, now):
+        executions = [d for d in order.get('Details') or [] if d.get('RecType') == REC_EXECUTION]
+        qty = sum(d.get('Qty') or 0 for d in executions)
+        price = sum((d.get('Price') or 0) * (d.get('Qty') or 0) for d in executions) / qty if qty else None
+        snapshot = (
+            classify_order(order), order.get('State'), order.get('Side'), order.get('OrderQty'),
+            order.get('CumQty') or 0, price, [d.get('ExecutionID') for d in executions if d.get('ExecutionID')],
+        )
+        current = (self.state, self.api_state, self.side, self.order_qty, self.cum_qty, self.price, self.execution_ids)
+        if snapshot == current:
+            return False
+        (self.state, self.api_state, self.side, self.order_qty,
+         self.cum_qty, self.price, self.execution_ids) = snapshot
+        self.updated_at = now
+        return True
+
+    def __repr__(self):
+        return (f"OrderRecord({self.order_id!r}, label={self.label!r}, state={self.state!r}, "
+                f"cum_qty={self.cum_qty}, price={self.price})")
+
+
+class OrderTracker:
+    """
+    発注時に返された OrderId ごとに、注文を 発注済み → 執行中 → 約定/期限切れ/取消 の順に追跡します。
+
+    追跡中の注文が残っている間だけバックグラウンドのスレッドが /orders を照会し、
+    状態が変化すると wait / wait_for で待機している呼び出し元を起こします。
+    呼び出し元は固定時間の sleep を挟まずに、状態が変わった時点で次の処理に進めます。
+    """
+
+    def __init__(self, fetch_orders, poll_interval=DEFAULT_POLL_INTERVAL, clock=time.monotonic, logger=None):
+        """
+        Parameters:
+            fetch_orders (callable): /orders の一覧（list）を返す関数。失敗時は None
+            poll_interval (float): 追跡中の注文がある間の照会間隔（秒）
+            clock (callable): 単調増加する時刻関数
+            logger (logging.Logger): ロガー
+        """
+        self.fetch_orders = fetch_orders
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.logger = logger or logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        self._orders = {}
+        self._thread = None
+        self._stopped = False
+        self._kick = threading.Event()
+
+    # --- 登録と参照 ---
+
+    def track(self, order_id, label=None):
+        """
+        注文を追跡対象に追加し、照会スレッドを起動します。
+
+        Parameters:
+            order_id (str): /sendorder が返した OrderId
+            label (str): ログ用の名前
+
+        Returns:
+            OrderRecord: 追跡中の注文
+        """
+        with self._cond:
+            record = self._orders.get(order_id)
+            if record is None:
+                record = self._orders[order_id] = OrderRecord(order_id, label, self.clock())
+            self._ensure_poller()
+        self._kick.set()
+        return record
+
+    def get(self, order_id):
+        with self._cond:
+            return self._orders.get(order_id)
+
+    def forget(self, order_id):
+        with self._cond:
+            self._orders.pop(order_id, None)
+
+    def live(self):
+        """未完了の注文の一覧"""
+        with self._cond:
+            return [record for record in self._orders.values() if not record.done]
+
+    # --- 状態の更新 ---
+
+    def update(self, orders):
+        """
+        /orders の一覧を反映し、状態が変化した注文があれば待機中の呼び出し元を起こします。
+
+        Returns:
+            list: 状態が変化した OrderRecord
+        """
+        changed = []
+        now = self.clock()
+        with self._cond:
+            for order in orders or ():
+                record = self._orders.get(order.get('ID'))
+                if record is not None and record._apply(order, now):
+                    changed.append(record)
+            if changed:
+                self._cond.notify_all()
+        for record in changed:
+            self.logger.debug(f"注文の状態が変化しました: {record}")
+        return changed
+
+    def poll_once(self):
+        try:
+            orders = self.fetch_orders()
+        except Exception as e:
+            self.logger.warning(f"注文照会に失敗しました: {e}")
+            return []
+        return self.update(orders) if orders is not None else []
+
+    # --- 待機 ---
+
+    def wait_for(self, order_ids, predicate, timeout=None, any_of=False):
+        """
+        注文が条件を満たすまで待機します。状態の変化ごとに判定し、固定時間の待機は行いません。
+
+        Parameters:
+            order_ids (list): 対象の OrderId（None は無視する）
+            predicate (callable): OrderRecord を受け取り、条件を満たす場合に True を返す関数
+            timeout (float): 最大待機秒数（None は無制限）
+            any_of (bool): True の場合はいずれか1件が条件を満たした時点で戻る
+
+        Returns:
+            dict: OrderId → OrderRecord（条件を満たしたかどうかは呼び出し元で判定する）
+        """
+        ids = [order_id for order_id in order_ids if order_id is not None]
+        for order_id in ids:
+            self.track(order_id)
+        combine = any if any_of else all
+
+        with self._cond:
+            records = {order_id: self._orders[order_id] for order_id in ids}
+            if ids:
+                self._cond.wait_for(
+                    lambda: self._stopped or combine(predicate(r) for r in records.values()), timeout
+                )
+            return records
+
+    def wait(self, order_ids, states=TERMINAL, timeout=None, any_of=False):
+        """注文が states のいずれかの状態になるまで待機します。"""
+        return self.wait_for(order_ids, lambda record: record.state in states, timeout, any_of)
+
+    # --- 照会スレッド ---
+
+    def _ensure_poller(self):
+        if self._stopped or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="order-tracker", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._kick.clear()
+            self.poll_once()
+            with self._cond:
+                if not any(not record.done for record in self._orders.values()):
+                    # 追跡中の注文がなくなったら終了し、次の track で再起動する
+                    self._thread = None
+                    return
+            # 新たな注文の追跡が始まった場合はすぐに照会する
+            self._kick.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopped = True
+        self._kick.set()
+        with self._cond:
+            self._cond.notify_all()
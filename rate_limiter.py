@@ -0,0 +1,155 @@
+# rate_limiter.py
+
+import heapq
+import itertools
+import threading
+import time
+
+import requests
+
+
+# 優先度クラス（数値が小さいほど優先）
+ORDER = 0      # 発注・取消
+TRADING = 1    # 売買対象銘柄の板情報
+POLLING = 2    # ポジション・注文照会
+UI = 3         # ダッシュボード表示用
+
+PRIORITY_NAMES = {ORDER: "order", TRADING: "trading", POLLING: "polling", UI: "ui"}
+
+# 各クラスが発行時に残しておくトークン数（上位クラスのための予備）
+DEFAULT_RESERVE = {ORDER: 0, TRADING: 0, POLLING: 1, UI: 2}
+# 各クラスの最大待機秒数（None は無制限）。超えた場合はリクエストを破棄する
+DEFAULT_MAX_WAIT = {ORDER: None, TRADING: 2.0, POLLING: 1.0, UI: 0.25}
+
+
+class RateLimited(requests.exceptions.RequestException):
+    """レート制限により低優先度のリクエストが破棄された場合に送出されます。"""
+
+
+class _ClassStats:
+    __slots__ = ("acquired", "shed", "waiting", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.acquired = 0
+        self.shed = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class RateLimiter:
+    """
+    kabusapi へのリクエストを一元的に制御する優先度付きトークンバケットです。
+
+    待機中のリクエストは優先度順（同一クラス内は到着順）にトークンを受け取ります。
+    低優先度クラスはバケットに予備トークンを残せない場合は待機し、
+    最大待機時間を超えると RateLimited を送出して破棄されます。
+    """
+
+    def __init__(self, rate=10.0, burst=10, reserve=None, max_wait=None, clock=time.monotonic):
+        """
+        Parameters:
+            rate (float): 1秒あたりに補充するトークン数
+            burst (int): バケットの容量
+            reserve (dict): クラスごとの予備トークン数
+            max_wait (dict): クラスごとの最大待機秒数
+            clock (callable): 単調増加する時刻関数
+        """
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiters = []
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.reserve = dict(DEFAULT_RESERVE if reserve is None else reserve)
+        self.max_wait = dict(DEFAULT_MAX_WAIT if max_wait is None else max_wait)
+        self._tokens = self.burst
+        self._updated = clock()
+        self._stats = {p: _ClassStats() for p in PRIORITY_NAMES}
+
+    def configure(self, rate=None, burst=None):
+        with self._cond:
+            self._refill()
+            if rate is not None:
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = float(burst)
+                self._tokens = min(self._tokens, self.burst)
+            self._cond.notify_all()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=POLLING):
+        """
+        トークンを1つ取得します。
+
+        Parameters:
+            priority (int): 優先度クラス
+
+        Returns:
+            float: 待機した秒数
+
+        Raises:
+            RateLimited: 最大待機時間内にトークンを取得できなかった場合
+        """
+        stats = self._stats[priority]
+        max_wait = self.max_wait.get(priority)
+        needed = 1 + self.reserve.get(priority, 0)
+        with self._cond:
+            start = self._clock()
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            stats.waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= needed:
+                        self._tokens -= 1
+                        waited = self._clock() - start
+                        stats.acquired += 1
+                        stats.wait_total += waited
+                        stats.wait_max = max(stats.wait_max, waited)
+                        return waited
+
+                    timeout = None
+                    if self._tokens < needed and self.rate > 0:
+                        timeout = (needed - self._tokens) / self.rate
+                    if max_wait is not None:
+                        remaining = max_wait - (self._clock() - start)
+                        if remaining <= 0:
+                            stats.shed += 1
+                            raise RateLimited(f"rate limited ({PRIORITY_NAMES[priority]})")
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                stats.waiting -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            classes = {}
+            for priority, s in self._stats.items():
+                classes[PRIORITY_NAMES[priority]] = {
+                    "acquired": s.acquired,
+                    "shed": s.shed,
+                    "queue_depth": s.waiting,
+                    "wait_avg_ms": round(s.wait_total / s.acquired * 1000, 3) if s.acquired else 0.0,
+                    "wait_max_ms": round(s.wait_max * 1000, 3),
+                }
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "queue_depth": len(self._waiters),
+                "classes": classes,
+            }
+
+
+# プロセス内で共有するリミッター
+limiter = RateLimiter()
@@ -0,0 +1,259 @@
+# reference_data.py
+
+import datetime
+import json
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import holidays
+import numpy as np
+
+from tick_recorder import read_ticks, tick_path
+
+
+JST = ZoneInfo("Asia/Tokyo")
+# 全ての取得元で失敗した場合に再試行するまでの秒数
+DEFAULT_RETRY_INTERVAL = 60.0
+
+_jp_holidays = None
+_holidays_lock = threading.Lock()
+
+
+def jp_holidays():
+    """日本の祝日カレンダーを1回だけ生成して共有します。"""
+    global _jp_holidays
+    with _holidays_lock:
+        if _jp_holidays is None:
+            _jp_holidays = holidays.Japan()
+        return _jp_holidays
+
+
+def is_business_day(day):
+    return day.weekday() < 5 and day not in jp_holidays()
+
+
+def trading_day(day):
+    """day が休場日の場合は直近の営業日を返します。"""
+    while not is_business_day(day):
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+def previous_business_day(day):
+    day -= datetime.timedelta(days=1)
+    return trading_day(day)
+
+
+def pivot_levels(high, low, close):
+    """
+    前営業日の高値・安値・終値からピボットポイントを計算します。
+
+    Returns:
+        dict: P, R1, R2, R3, S1, S2, S3
+    """
+    P = (high + low + close) / 3
+    return {
+        'P': P,
+        'R1': 2 * P - low,
+        'R2': P + (high - low),
+        'R3': high + 2 * (P - low),
+        'S1': 2 * P - high,
+        'S2': P - (high - low),
+        'S3': low - 2 * (high - P),
+    }
+
+
+def _scalar(value):
+    # yfinance は銘柄ごとの MultiIndex カラムを返すことがある
+    if hasattr(value, 'iloc'):
+        value = value.iloc[0]
+    return float(value)
+
+
+def download_session_hlc(symbol, session, logger=None, lookback=5):
+    """
+    yfinance から指定日の日足（高値・安値・終値）を取得します。
+    取得できない場合は過去 lookback 営業日までさかのぼります。
+
+    Returns:
+        tuple: (取得した日付, 高値, 安値, 終値)。取得できない場合は None
+    """
+    import yfinance as yf
+
+    logger = logger or logging.getLogger(__name__)
+    ticker = f"{symbol}.T"
+    day = session
+    for attempt in range(lookback + 1):
+        if attempt and not is_business_day(day):
+            day -= datetime.timedelta(days=1)
+            continue
+        try:
+            data = yf.download(
+                ticker,
+                start=day.strftime('%Y-%m-%d'),
+                end=(day + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
+                interval='1d',
+                progress=False,
+            )
+        except Exception as e:
+            logger.error(f"Error downloading data for {ticker} from {day}: {e}")
+            data = None
+        if data is not None and not data.empty:
+            row = data.iloc[0]
+            return day, _scalar(row['High']), _scalar(row['Low']), _scalar(row['Close'])
+        logger.debug(f"No data for {ticker} on {day}")
+        day -= datetime.timedelta(days=1)
+    logger.error(f"Yahoo Financeから{ticker}のデータを取得できませんでした。")
+    return None
+
+
+class ReferenceDataCache:
+    """
+    前営業日の高値・安値・終値とピボットポイントを1日1回だけ計算して保持するキャッシュです。
+
+    取得元の優先順位は、ディスク上のキャッシュ → yfinance → 記録済みティック → kabusapi /board です。
+    yfinance から取得した値のみを銘柄・日付ごとの JSON に保存し、同日の再起動時はネットワークに接続しません。
+    ティックや /board からの値は近似値のため、メモリ上でのみ保持します。
+    """
+
+    def __init__(self, symbol, exchange=1, directory=None, tick_dir=None, board_loader=None,
+                 downloader=download_session_hlc, clock=None, logger=None,
+                 retry_interval=DEFAULT_RETRY_INTERVAL):
+        """
+        Parameters:
+            symbol (str): 銘柄コード
+            exchange (int): 市場コード
+            directory (str | Path): キャッシュの保存先（None の場合は保存しない）
+            tick_dir (str | Path): tick_recorder の保存先（前営業日のティックから計算する場合）
+            board_loader (callable): /board の板情報を返す関数
+            downloader (callable): (symbol, 日付, logger) から (日付, 高値, 安値, 終値) を返す関数
+            clock (callable): 現在時刻（JST）を返す関数
+            logger (logging.Logger): ロガー
+            retry_interval (float): 全ての取得元で失敗した場合に再試行するまでの秒数
+        """
+        self.symbol = str(symbol)
+        self.exchange = int(exchange)
+        self.directory = Path(directory) if directory else None
+        self.tick_dir = Path(tick_dir) if tick_dir else None
+        self.board_loader = board_loader
+        self.downloader = downloader
+        self.clock = clock or (lambda: datetime.datetime.now(JST))
+        self.logger = logger or logging.getLogger(__name__)
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._day = None
+        self._levels = None
+        self._failed_at = None
+
+    def path(self, session):
+        return self.directory / f"{self.symbol}@{self.exchange}_{session:%Y%m%d}.json"
+
+    def get(self):
+        """
+        当日に使う前営業日の参照データを返します。日付が変わるまではメモリから返します。
+
+        Returns:
+            dict: session（前営業日）, high, low, close, source と P〜S3。取得できない場合は None
+        """
+        today = self.clock().date()
+        with self._lock:
+            if self._day == today:
+                if self._levels is not None:
+                    return self._levels
+                if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+                    return None
+            self._day = today
+            self._levels = self._load(previous_business_day(trading_day(today)))
+            self._failed_at = None if self._levels is not None else time.monotonic()
+            return self._levels
+
+    def _load(self, session):
+        levels = self._read_disk(session)
+        if levels is not None:
+            return levels
+
+        result = self.downloader(self.symbol, session, self.logger)
+        if result is not None:
+            day, high, low, close = result
+            levels = self._build(day, high, low, close, 'yfinance')
+            self._write_disk(session, levels)
+            return levels
+
+        for source, loader in (('ticks', self._from_ticks), ('board', self._from_board)):
+            try:
+                hlc = loader(session)
+            except Exception as e:
+                self.logger.warning(f"参照データを {source} から取得できませんでした: {e}")
+                continue
+            if hlc is not None:
+                self.logger.warning(f"前営業日の四本値を {source} から近似しました: {hlc}")
+                return self._build(session, *hlc, source)
+        return None
+
+    @staticmethod
+    def _build(session, high, low, close, source):
+        levels = {
+            'session': session.isoformat(),
+            'high': float(high),
+            'low': float(low),
+            'close': float(close),
+            'source': source,
+        }
+        levels.update(pivot_levels(levels['high'], levels['low'], levels['close']))
+        return levels
+
+    def _read_disk(self, session):
+        if self.directory is None:
+            return None
+        path = self.path(session)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"参照データのキャッシュを読み込めませんでした: {path}: {e}")
+            return None
+
+    def _write_disk(self, session, levels):
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.path(session)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(levels))
+            tmp.replace(path)
+        except OSError as e:
+            self.logger.warning(f"参照データのキャッシュを保存できませんでした: {e}")
+
+    def _from_ticks(self, session):
+        if self.tick_dir is None:
+            return None
+        path = tick_path(self.tick_dir, self.symbol, self.exchange, session)
+        if not path.exists():
+            return None
+        prices = read_ticks(path)['price']
+        prices = prices[~np.isnan(prices)]
+        if len(prices) == 0:
+            return None
+        return float(prices.max()), float(prices.min()), float(prices[-1])
+
+    def _from_board(self, session):
+        # HighPrice / LowPrice は当日の値のため、前日終値と組み合わせた近似値として扱う
+        if self.board_loader is None:
+            return None
+        board = self.board_loader()
+        close = board.get('PreviousClose')
+        high = board.get('HighPrice')
+        low = board.get('LowPrice')
+        if close is None:
+            return None
+        high = close if high is None else max(high, close)
+        low = close if low is None else min(low, close)
+        if any(math.isnan(v) for v in (high, low, close)):
+            return None
+        return high, low, close
@@ -0,0 +1,191 @@
+# replay.py
+
+import argparse
+import datetime
+import logging
+import math
+import time
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from initializations import Initializations
+from trading_data import TradingData
+from post_order_processor import PostOrderProcessor
+from spline_kernel import SplineKernel
+from tick_recorder import read_ticks
+
+
+JST = ZoneInfo("Asia/Tokyo")
+
+# シグナルログに記録する列
+SIGNAL_COLUMNS = [
+    'buy_signals', 'sell_signals',
+    'buy_exit_signals', 'sell_exit_signals',
+    'hedge_buy_signals', 'hedge_sell_signals',
+    'hedge_buy_exit_signals', 'hedge_sell_exit_signals',
+    'special_buy_signals', 'special_sell_signals',
+    'special_buy_exit_signals', 'special_sell_exit_signals',
+    'emergency_buy_exit_signals', 'emergency_sell_exit_signals',
+]
+
+EQUITY_COLUMNS = ['close', 'trading_equity', 'buy_and_hold_equity', 'cash', 'stock_value', 'quantity']
+
+
+class ReplayResult:
+    """
+    リプレイの結果です。
+
+    Attributes:
+        equity (DataFrame): 足ごとのエクイティカーブ（close, trading_equity, buy_and_hold_equity など）
+        signals (DataFrame): 発生したシグナルのログ（time, signal, price）
+        ticks (int): 処理したティック数
+        bars (int): 生成したOHLC足の数
+        elapsed (float): 処理に要した秒数
+    """
+
+    def __init__(self, equity, signals, ticks, bars, elapsed):
+        self.equity = equity
+        self.signals = signals
+        self.ticks = ticks
+        self.bars = bars
+        self.elapsed = elapsed
+
+    def summary(self):
+        final = self.equity['trading_equity'].dropna()
+        return {
+            "ticks": self.ticks,
+            "bars": self.bars,
+            "signals": len(self.signals),
+            "final_trading_equity": float(final.iloc[-1]) if not final.empty else None,
+            "elapsed_sec": round(self.elapsed, 3),
+        }
+
+
+class ReplayEngine:
+    """
+    記録済みのティックを実運用と同じ TradingData のパイプラインに流し込むリプレイエンジンです。
+
+    create_ohlc → calculate_technical_indicators → update_latest_9_data →
+    PostOrderProcessor.calculate_trading_values → generate_signals の順序は TradingRunner と同じです。
+    kabusapi・yfinance には接続せず、時刻はティックの受信時刻を使い、待機も行いません。
+    発注 (OrderExecutor) は行わず、PostOrderProcessor による仮想ポジションでエクイティを評価します。
+    """
+
+    def __init__(self, ticks, symbol="1579", pivot_hlc=None, params=None, logger=None, spline_check=False):
+        """
+        Parameters:
+            ticks (numpy.ndarray): tick_recorder.TICK_DTYPE の構造化配列
+            symbol (str): 銘柄コード
+            pivot_hlc (tuple): 前営業日の (高値, 安値, 終値)。省略時はピボットを 0 とする
+            params (dict): Initializations に設定する戦略パラメータ
+            logger (logging.Logger): ロガー（省略時は WARNING 以上のみ出力）
+            spline_check (bool): スプライン平滑化を SciPy の結果と比較する等価性確認モード
+        """
+        self.ticks = ticks
+        self.symbol = symbol
+        self.pivot_hlc = pivot_hlc if pivot_hlc is not None else (0.0, 0.0, 0.0)
+        self.params = params or {}
+        if logger is None:
+            logger = logging.getLogger("replay")
+            logger.setLevel(logging.WARNING)
+        self.logger = logger
+        self.spline_kernel = SplineKernel(check=spline_check, logger=logger)
+        self._now = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(read_ticks(path), **kwargs)
+
+    def _clock(self):
+        return self._now
+
+    def _build(self):
+        init = Initializations()
+        init.symbol = self.symbol
+        init.logger = self.logger
+        for key, value in self.params.items():
+            setattr(init, key, value)
+        trading_data = TradingData(init, token=None)
+        trading_data.clock = self._clock
+        trading_data.pivot_hlc = self.pivot_hlc
+        trading_data.spline_kernel = self.spline_kernel
+        return init, trading_data, PostOrderProcessor(init)
+
+    def run(self):
+        """
+        全てのティックを処理します。
+
+        Returns:
+            ReplayResult: エクイティカーブとシグナルログ
+        """
+        init, trading_data, post_processor = self._build()
+        signal_log = []
+        bars = 0
+        processed = 0
+        started = time.perf_counter()
+
+        for ts_ns, price in zip(self.ticks['ts_ns'].tolist(), self.ticks['price'].tolist()):
+            if math.isnan(price):
+                continue
+            processed += 1
+            # 受信時刻を実運用と同じローカル時刻（タイムゾーンなし）に変換
+            self._now = datetime.datetime.fromtimestamp(ts_ns / 1e9, JST).replace(tzinfo=None)
+            trading_data._apply_board({'CurrentPrice': price})
+
+            if len(init.prices) < 4:
+                continue
+            bars += 1
+            trading_data.create_ohlc()
+            trading_data.calculate_buy_and_hold_equity()
+            trading_data.calculate_technical_indicators()
+            trading_data.update_latest_9_data(
+                init.df['band_width'], init.df['hist'], init.df['di_difference'], init.df['adx_difference']
+            )
+            post_processor.calculate_trading_values(self._now)
+            trading_data.generate_signals(
+                init.interpolated_data, init.R1, init.R2, init.R3, init.S1, init.S2, init.S3
+            )
+            self._capture_signals(init, signal_log)
+
+        elapsed = time.perf_counter() - started
+        equity = init.interpolated_data.reindex(columns=EQUITY_COLUMNS)
+        signals = pd.DataFrame(signal_log, columns=['time', 'signal', 'price'])
+        return ReplayResult(equity, signals, processed, bars, elapsed)
+
+    def _capture_signals(self, init, signal_log):
+        if init.interpolated_data.empty:
+            return
+        last_row = init.interpolated_data.iloc[-1]
+        for column in SIGNAL_COLUMNS:
+            value = last_row.get(column, 0)
+            if value == 1:
+                signal_log.append((self._now, column, last_row.get('close')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="記録済みティックのリプレイ")
+    parser.add_argument("path", help="tick_recorder が出力した .ticks ファイル")
+    parser.add_argument("--symbol", default="1579")
+    parser.add_argument("--pivot", nargs=3, type=float, metavar=("HIGH", "LOW", "CLOSE"),
+                        help="前営業日の高値・安値・終値")
+    parser.add_argument("--spline-check", action="store_true",
+                        help="スプライン平滑化を SciPy の UnivariateSpline と比較する")
+    parser.add_argument("--equity-csv", help="エクイティカーブの出力先")
+    parser.add_argument("--signals-csv", help="シグナルログの出力先")
+    args = parser.parse_args(argv)
+
+    engine = ReplayEngine.from_file(args.path, symbol=args.symbol, pivot_hlc=args.pivot, spline_check=args.spline_check)
+    result = engine.run()
+    if args.equity_csv:
+        result.equity.to_csv(args.equity_csv)
+    if args.signals_csv:
+        result.signals.to_csv(args.signals_csv, index=False)
+    print(result.summary())
+    if args.spline_check:
+        print({"spline_max_deviation": engine.spline_kernel.max_deviation,
+               "spline_mismatches": engine.spline_kernel.mismatches})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+# signal_engine.py
+
+import numpy as np
+
+
+# シグナル列（ビットマスクのビット順）
+SIGNAL_COLUMNS = [
+    'buy_signals', 'sell_signals',
+    'buy_exit_signals', 'sell_exit_signals',
+    'buy_exit_signals_lc', 'sell_exit_signals_lc',
+    'emergency_buy_exit_signals', 'emergency_sell_exit_signals',
+    'hedge_buy_signals', 'hedge_buy_exit_signals',
+    'hedge_sell_signals', 'hedge_sell_exit_signals',
+    'special_buy_signals', 'special_buy_exit_signals',
+    'special_sell_signals', 'special_sell_exit_signals',
+]
+
+(BUY, SELL,
+ BUY_EXIT, SELL_EXIT,
+ BUY_EXIT_LC, SELL_EXIT_LC,
+ EMERGENCY_BUY_EXIT, EMERGENCY_SELL_EXIT,
+ HEDGE_BUY, HEDGE_BUY_EXIT,
+ HEDGE_SELL, HEDGE_SELL_EXIT,
+ SPECIAL_BUY, SPECIAL_BUY_EXIT,
+ SPECIAL_SELL, SPECIAL_SELL_EXIT) = (1 << i for i in range(len(SIGNAL_COLUMNS)))
+
+# 市場の状態を表す条件ビット（market_conditions の戻り値）
+READY = 1               # trend_check_data が揃い、通常シグナルを判定できる
+TREND_POSITIVE = 2      # trend_positive1 or trend_positive2
+TREND_NEGATIVE = 4      # trend_negative1 or trend_negative2
+HIST_UP = 8             # hist_crossover_up1 or hist_crossover_up2
+HIST_DOWN = 16          # hist_crossover_down1 or hist_crossover_down2
+CROSS_ABOVE = 32        # close_crosses_above1 or close_crosses_above2
+CROSS_BELOW = 64        # close_crosses_below1 or close_crosses_below2
+EXPANDING = 128         # adx_difference_diff > 0 or band_width_diff > 0
+CONTRACTING = 256       # adx_difference_diff < 0 and band_width_diff < 0
+
+# 特別ポジション解消の判定に使うスプラインの平滑化係数
+SPECIAL_EXIT_S = {
+    'band_width': 0.000185,
+    'adx_difference': 1.85,
+    'hist': 0.00000185,
+    'di_difference': 18.5,
+}
+
+# 保持する状態（Initializations の同名の属性と対応）
+STATE_FIELDS = (
+    'signal_position', 'signal_position1', 'signal_position2',
+    'entry_price', 'buy_entry_price', 'sell_entry_price',
+    'special_entry_price', 'original_entry_price',
+    'special_sell_active', 'special_buy_active',
+    'prev_special_sell_active', 'prev_special_buy_active',
+    'cumulative_score', 'previous_cumulative_score', 'swap_signals',
+    'position_entry_index',
+    # 直前の値（TradingData.reset_signals* が発注失敗時の巻き戻しに使う）
+    'special_sell_active_prev', 'special_buy_active_prev',
+    'signal_position_prev', 'signal_position_prev2',
+    'signal_position1_prev', 'signal_position1_prev2',
+    'signal_position2_prev', 'signal_position2_prev2',
+    'entry_price_prev', 'buy_entry_price_prev', 'sell_entry_price_prev',
+    'cumulative_score_prev', 'previous_cumulative_score_prev',
+    'special_entry_price_prev', 'original_entry_price_prev',
+)
+
+
+def signal_columns(mask):
+    """ビットマスクに含まれるシグナル列の名前を返します。"""
+    return [col for i, col in enumerate(SIGNAL_COLUMNS) if mask >> i & 1]
+
+
+def market_conditions(close, close_prev, trend_prev, trend, trend2, hist_diff, hist_diff_prev,
+                      di_difference_diff, adx_difference_diff, band_width_diff, R1, R2, R3, S1, S2, S3):
+    """
+    最新の特徴量から、ポジションに依存しない条件を条件ビットにまとめます。
+    比較は & / | で組み立てているため、各引数に NumPy 配列を渡すと全ての足についてまとめて計算できます。
+
+    Parameters:
+        close, close_prev (float): 最新・1本前の終値
+        trend_prev (float): 2本前の trend_check_data
+        trend, trend2 (float): 最新の trend_check_data, trend_check_data2
+        hist_diff, hist_diff_prev (float): 最新・1本前の hist_diff
+        di_difference_diff, adx_difference_diff, band_width_diff (float): 最新の各導関数
+        R1, R2, R3, S1, S2, S3 (float): ピボットポイント
+
+    Returns:
+        int: 条件ビット（READY を含む）
+    """
+    trend_positive = (
+        ((trend_prev >= 0) & (trend > 0) & (trend2 > 0)) |
+        ((trend_prev < 0) & (trend <= 0) & (trend2 > 0)) |
+        ((trend_prev <= 0) & (trend >= 0) & (trend2 > 0))
+    )
+    trend_negative = (
+        ((trend_prev <= 0) & (trend < 0) & (trend2 < 0)) |
+        ((trend_prev > 0) & (trend >= 0) & (trend2 < 0)) |
+        ((trend_prev >= 0) & (trend <= 0) & (trend2 < 0))
+    )
+    hist_up = ((hist_diff > 0) & (di_difference_diff > 0)) | ((hist_diff_prev < 0) & (hist_diff >= 0))
+    hist_down = ((hist_diff < 0) & (di_difference_diff < 0)) | ((hist_diff_prev > 0) & (hist_diff <= 0))
+    cross_above = (
+        ((close_prev < R1) & (close > R1)) | ((close_prev < R2) & (close > R2)) | ((close_prev < R3) & (close > R3)) |
+        ((close_prev < S1) & (close > S1)) | ((close_prev < S2) & (close > S2)) | ((close_prev < S3) & (close > S3))
+    )
+    cross_below = (
+        ((close_prev > S1) & (close < S1)) | ((close_prev > S2) & (close < S2)) | ((close_prev > S3) & (close < S3)) |
+        ((close_prev > R1) & (close < R1)) | ((close_prev > R2) & (close < R2)) | ((close_prev > R3) & (close < R3))
+    )
+    expanding = (adx_difference_diff > 0) | (band_width_diff > 0)
+    contracting = (adx_difference_diff < 0) & (band_width_diff < 0)
+    return (READY
+            | TREND_POSITIVE * trend_positive | TREND_NEGATIVE * trend_negative
+            | HIST_UP * hist_up | HIST_DOWN * hist_down
+            | CROSS_ABOVE * cross_above | CROSS_BELOW * cross_below
+            | EXPANDING * expanding | CONTRACTING * contracting)
+
+
+class SignalState:
+    """
+    シグナル生成の状態（ポジション、エントリー価格、スコア、特別ポジションのフラグなど）です。
+    Initializations と同名の属性を持ち、from_object / apply_to で相互にコピーします。
+    """
+
+    __slots__ = STATE_FIELDS
+
+    def __init__(self, **values):
+        for field in STATE_FIELDS:
+            setattr(self, field, None)
+        self.entry_price = 0.0
+        self.special_entry_price = 0.0
+        self.original_entry_price = 0.0
+        self.special_entry_price_prev = 0.0
+        self.original_entry_price_prev = 0.0
+        for flag in ('special_sell_active', 'special_buy_active', 'prev_special_sell_active',
+                     'prev_special_buy_active', 'swap_signals',
+                     'special_sell_active_prev', 'special_buy_active_prev'):
+            setattr(self, flag, False)
+        for score in ('cumulative_score', 'previous_cumulative_score',
+                      'cumulative_score_prev', 'previous_cumulative_score_prev'):
+            setattr(self, score, 0)
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    @classmethod
+    def from_object(cls, source):
+        state = cls.__new__(cls)
+        for field in STATE_FIELDS:
+            setattr(state, field, getattr(source, field))
+        return state
+
+    def apply_to(self, target):
+        for field in STATE_FIELDS:
+            setattr(target, field, getattr(self, field))
+
+
+def _log_ratio(price, reference):
+    return np.log(price / reference)
+
+
+def step(st, close, close_prev, conditions, bar_count, gradients=None, preset=0):
+    """
+    1本の足についてシグナルを判定し、状態 st を更新します。
+    判定の順序（ヘッジ → 緊急決済・特別ポジション → 特別ポジション解消 → 通常シグナル）と条件は
+    TradingData.generate_signals の従来の実装と同じです。
+
+    Parameters:
+        st (SignalState): 状態（その場で更新される）
+        close, close_prev (float): 最新・1本前の終値
+        conditions (int): market_conditions() の条件ビット。READY を含まない場合は通常シグナルを判定しない
+        bar_count (int): interpolated_data の行数（position_entry_index の基準）
+        gradients (callable): 特別ポジション解消の判定時に呼ばれ、SPECIAL_EXIT_S の各系列について
+            9点スプラインの最新の傾き（データ不足の場合は None）を返す関数
+        preset (int): 最新行にすでに立っているシグナルのビット
+
+    Returns:
+        tuple: (シグナルのビットマスク, performance 列に書き込むスコア。書き込まない場合は None)
+    """
+    mask = preset
+    performance = None
+
+    # 前回の値を保持
+    st.special_sell_active_prev = st.special_sell_active
+    st.special_buy_active_prev = st.special_buy_active
+    st.signal_position_prev = st.signal_position
+    st.signal_position_prev2 = st.signal_position_prev
+    st.signal_position1_prev = st.signal_position1
+    st.signal_position1_prev2 = st.signal_position1_prev
+    st.signal_position2_prev = st.signal_position2
+    st.signal_position2_prev2 = st.signal_position2_prev
+    st.entry_price_prev = st.entry_price
+    st.buy_entry_price_prev = st.buy_entry_price
+    st.sell_entry_price_prev = st.sell_entry_price
+    st.cumulative_score_prev = st.cumulative_score
+    st.previous_cumulative_score_prev = st.previous_cumulative_score
+    st.special_entry_price_prev = st.special_entry_price
+    st.original_entry_price_prev = st.original_entry_price
+
+    prev_special_sell = st.prev_special_sell_active
+    prev_special_buy = st.prev_special_buy_active
+    held = None if st.position_entry_index is None else bar_count - st.position_entry_index
+
+    # ヘッジ売り・ヘッジ買いポジション生成
+    if held is not None and held >= 30 and st.signal_position2 is None:
+        if st.signal_position == 'buy' and not st.special_sell_active:
+            if _log_ratio(close, st.buy_entry_price) < -0.00158:
+                mask |= HEDGE_SELL
+                st.signal_position2 = 'hedge_sell'
+    if held is not None and held >= 30 and st.signal_position2 is None:
+        if st.signal_position == 'sell' and not st.special_buy_active:
+            if _log_ratio(close, st.sell_entry_price) > 0.00158:
+                mask |= HEDGE_BUY
+                st.signal_position2 = 'hedge_buy'
+
+    # 緊急決済と特別ポジション生成
+    if held is not None and held >= 60:
+        if st.signal_position == 'buy' and not st.special_sell_active:
+            if _log_ratio(close, st.buy_entry_price) < -0.005:
+                mask |= EMERGENCY_BUY_EXIT | HEDGE_SELL_EXIT | SPECIAL_SELL
+                st.special_sell_active = True
+                st.special_entry_price = close
+                st.original_entry_price = st.buy_entry_price
+                st.signal_position2 = None
+                st.signal_position = 'special_sell'
+                st.sell_entry_price = close
+    if held is not None and held >= 60:
+        if st.signal_position == 'sell' and not st.special_buy_active:
+            if _log_ratio(close, st.sell_entry_price) > 0.005:
+                mask |= EMERGENCY_SELL_EXIT | HEDGE_BUY_EXIT | SPECIAL_BUY
+                st.special_buy_active = True
+                st.special_entry_price = close
+                st.original_entry_price = st.sell_entry_price
+                st.signal_position2 = None
+                st.signal_position = 'special_buy'
+                st.buy_entry_price = close
+
+    # 特別ポジション解消と通常ポジション生成
+    if st.special_sell_active and prev_special_sell:
+        limit = -0.005 + _log_ratio(st.original_entry_price, st.special_entry_price)
+        if st.signal_position == 'special_sell' and (
+                _special_exit(gradients, rising=True) or _log_ratio(close, st.sell_entry_price) < limit):
+            mask |= SPECIAL_SELL_EXIT | BUY
+            st.special_sell_active = False
+            st.special_sell_active_prev = False
+            st.signal_position_prev = None
+            st.buy_entry_price = close
+            st.signal_position = 'buy'
+            st.position_entry_index = bar_count
+    if st.special_buy_active and prev_special_buy:
+        limit = 0.005 + _log_ratio(st.original_entry_price, st.special_entry_price)
+        if st.signal_position == 'special_buy' and (
+                _special_exit(gradients, rising=False) or _log_ratio(close, st.buy_entry_price) > limit):
+            mask |= SPECIAL_BUY_EXIT | SELL
+            st.special_buy_active = False
+            st.special_buy_active_prev = False
+            st.signal_position_prev = None
+            st.sell_entry_price = close
+            st.signal_position = 'sell'
+            st.position_entry_index = bar_count
+
+    # 通常のシグナル
+    if not st.special_sell_active and not st.special_buy_active and \
+            not prev_special_sell and not prev_special_buy:
+        if not conditions & READY:
+            return mask, performance
+
+        # 両建ての片側決済と、片側のみの状態からの両建て
+        if st.signal_position == 'sell' and st.signal_position1 == 'buy' and close != st.entry_price:
+            mask |= SELL_EXIT_LC | BUY_EXIT_LC
+            st.signal_position, st.signal_position1 = None, None
+            st.sell_entry_price, st.buy_entry_price = close, close
+        if st.signal_position == 'buy' and st.signal_position1 == 'sell' and close != st.entry_price:
+            mask |= BUY_EXIT_LC | SELL_EXIT_LC
+            st.signal_position, st.signal_position1 = None, None
+            st.sell_entry_price, st.buy_entry_price = close, close
+        if st.signal_position == 'sell' and st.signal_position1 is None and \
+                close == st.entry_price and close > close_prev:
+            mask |= BUY
+            st.signal_position1 = 'buy'
+            st.entry_price = close
+            st.position_entry_index = bar_count
+        if st.signal_position == 'buy' and st.signal_position1 is None and \
+                close == st.entry_price and close < close_prev:
+            mask |= SELL
+            st.signal_position1 = 'sell'
+            st.entry_price = close
+            st.position_entry_index = bar_count
+        if st.signal_position is None and st.signal_position1 == 'sell' and \
+                close == st.entry_price and close > close_prev:
+            mask |= BUY
+            st.signal_position = 'buy'
+            st.entry_price = close
+            st.position_entry_index = bar_count
+        if st.signal_position is None and st.signal_position1 == 'buy' and \
+                close == st.entry_price and close < close_prev:
+            mask |= SELL
+            st.signal_position = 'sell'
+            st.entry_price = close
+            st.position_entry_index = bar_count
+
+        # ボラティリティ拡大時はピボットの上抜けを上昇、縮小時は下抜けを上昇（反発）として扱う
+        contracting = False
+        if conditions & EXPANDING:
+            up = conditions & TREND_POSITIVE and conditions & (HIST_UP | CROSS_ABOVE)
+            down = conditions & TREND_NEGATIVE and conditions & (HIST_DOWN | CROSS_BELOW)
+        elif conditions & CONTRACTING:
+            contracting = True
+            up = conditions & TREND_POSITIVE and conditions & (HIST_UP | CROSS_BELOW)
+            down = conditions & TREND_NEGATIVE and conditions & (HIST_DOWN | CROSS_ABOVE)
+        else:
+            up = down = False
+
+        if not st.swap_signals:
+            if up:
+                mask, performance = _take_profit(st, 'sell', close, bar_count, mask, performance)
+            elif down:
+                mask, performance = _take_profit(st, 'buy', close, bar_count, mask, performance)
+        else:
+            # シグナルの条件を入れ替える
+            if up:
+                mask, performance = _take_profit(st, 'buy', close, bar_count, mask, performance)
+            elif down:
+                # 縮小時のこの分岐は従来から決済条件が成立しない（ポジションがない場合の両建てのみ）
+                mask, performance = _take_profit(st, 'sell', close, bar_count, mask, performance,
+                                                 entry_only=contracting)
+
+    # 現在の状態を前回の状態として更新
+    st.prev_special_sell_active = st.special_sell_active
+    st.prev_special_buy_active = st.special_buy_active
+    return mask, performance
+
+
+def _special_exit(gradients, rising):
+    """9点スプラインの傾きによる特別ポジションの解消条件"""
+    if gradients is None:
+        return False
+    g = gradients()
+
+    def le0(key):
+        return g[key] is not None and g[key] <= 0
+
+    def ge0(key):
+        return g[key] is not None and g[key] >= 0
+
+    if not (le0('band_width') and le0('adx_difference')):
+        return False
+    if rising:
+        return ge0('hist') and ge0('di_difference')
+    return le0('hist') and le0('di_difference')
+
+
+def _take_profit(st, side, close, bar_count, mask, performance, entry_only=False):
+    """
+    side（'sell' または 'buy'）の片側ポジションが含み益なら決済して両建てに入り直し、スコアを更新します。
+    含み損の場合はスコアを減らしてシグナルの条件を入れ替えます。ポジションがない場合は両建てを開始します。
+    """
+    other = 'buy' if side == 'sell' else 'sell'
+    exit_bit, hedge, hedge_exit_bit = (
+        (SELL_EXIT, 'hedge_buy', HEDGE_BUY_EXIT) if side == 'sell' else (BUY_EXIT, 'hedge_sell', HEDGE_SELL_EXIT)
+    )
+
+    if not entry_only:
+        # (signal_position, signal_position1) のどちらの脚に side があるか
+        for leg in (0, 1):
+            if leg == 0 and not (st.signal_position == side and st.signal_position1 is None):
+                continue
+            if leg == 1 and not (st.signal_position is None and st.signal_position1 == side):
+                continue
+            entry = st.sell_entry_price if side == 'sell' else st.buy_entry_price
+            if (close < entry) if side == 'sell' else (close > entry):
+                mask |= exit_bit
+                if leg == 0:
+                    st.signal_position = None
+                else:
+                    st.signal_position1 = None
+
+                # イグジットシグナル直後の値を保持
+                st.signal_position_prev, st.signal_position1_prev = st.signal_position, st.signal_position1
+                st.cumulative_score_prev = st.cumulative_score
+                st.previous_cumulative_score_prev = st.previous_cumulative_score
+
+                if st.signal_position2 == hedge:
+                    mask |= hedge_exit_bit
+                    st.signal_position2 = None
+                    st.signal_position2_prev = None
+
+                st.entry_price = close
+                mask |= BUY | SELL
+                st.signal_position, st.signal_position1 = (other, side) if leg == 0 else (side, other)
+                st.position_entry_index = bar_count
+
+                st.previous_cumulative_score = st.cumulative_score
+                st.cumulative_score += 1
+                performance = st.cumulative_score
+            elif close == entry:
+                # スコア 0、条件は入れ替えない
+                st.previous_cumulative_score = st.cumulative_score
+                performance = st.cumulative_score
+            elif (close > entry) if side == 'sell' else (close < entry):
+                # スコア -1、条件を入れ替える
+                st.previous_cumulative_score = st.cumulative_score
+                st.cumulative_score -= 1
+                st.swap_signals = not st.swap_signals
+                performance = st.cumulative_score
+
+    if st.signal_position is None and st.signal_position1 is None and not mask & (SELL_EXIT | BUY_EXIT):
+        st.entry_price = close
+        mask |= BUY | SELL
+        st.signal_position, st.signal_position1 = other, side
+        st.position_entry_index = bar_count
+    return mask, performance
+
+
+class _GradientRow:
+    """batch_signals で特別ポジション解消の判定時に、対象の足の傾きを返す"""
+
+    __slots__ = ('gradients', 'row')
+
+    def __init__(self, gradients):
+        self.gradients = {key: np.asarray(gradients[key], dtype=float) for key in SPECIAL_EXIT_S}
+        self.row = 0
+
+    def __call__(self):
+        return {key: values[self.row] for key, values in self.gradients.items()}
+
+
+def rolling_spline_gradients(series, kernel=None):
+    """
+    各足について、その足までの直近9点を平滑化したスプラインの最新の傾きをまとめて計算します。
+    TradingData.special_exit_gradients を全ての足について計算するのと同じです。
+
+    Parameters:
+        series (dict): SPECIAL_EXIT_S の各キーについて、足ごとに latest_data に追加される値の配列
+        kernel (SplineKernel): 平滑化に使うカーネル（None の場合は新たに作成する）
+
+    Returns:
+        dict: 各キーについて傾きの配列（9点に満たない足は NaN）
+    """
+    if kernel is None:
+        from spline_kernel import SplineKernel
+        kernel = SplineKernel()
+    gradients = {}
+    for key, s_param in SPECIAL_EXIT_S.items():
+        values = np.asarray(series[key], dtype=float)
+        gradient = np.full(len(values), np.nan)
+        if len(values) >= 9:
+            windows = np.lib.stride_tricks.sliding_window_view(values, 9)
+            gradient[8:] = kernel.smooth(windows, s_param)[1][:, -1]
+        gradients[key] = gradient
+    return gradients
+
+
+def batch_signals(close, trend_check_data, trend_check_data2, hist_diff, di_difference_diff,
+                  adx_difference_diff, band_width_diff, pivots=(0, 0, 0, 0, 0, 0), gradients=None, state=None):
+    """
+    interpolated_data の全ての行について、generate_signals を1行ずつ呼び出した場合と同じシグナルをまとめて計算します。
+    ポジションに依存しない条件は market_conditions で配列のまま計算し、状態の更新（step）のみを足ごとに行います。
+    発注結果による状態の変更（PostOrderProcessor）は含みません。
+
+    Parameters:
+        close, trend_check_data, trend_check_data2, hist_diff,
+        di_difference_diff, adx_difference_diff, band_width_diff (array-like): interpolated_data の各列（先頭行から）
+        pivots (tuple): R1, R2, R3, S1, S2, S3。それぞれスカラーまたは行ごとの配列
+        gradients (dict): 特別ポジション解消に使う傾きの配列（rolling_spline_gradients の戻り値を行に揃えたもの）。
+            None の場合は傾きによる解消条件を判定しない
+        state (SignalState): 初期状態（None の場合は初期値）
+
+    Returns:
+        tuple: (シグナル列名 → 行ごとの 0/1 の配列の dict, 行ごとの累積スコア（performance）の配列, 最終状態)
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    columns = [np.asarray(values, dtype=float) for values in (
+        trend_check_data, trend_check_data2, hist_diff, di_difference_diff, adx_difference_diff, band_width_diff
+    )]
+    trend, trend2, hist, di_diff, adx_diff, bw_diff = columns
+
+    # 3行目以降（generate_signals で trend_check_data が揃う行）の条件をまとめて計算
+    conditions = np.zeros(n, dtype=np.int64)
+    if n >= 3:
+        levels = [np.asarray(p, dtype=float)[2:] if np.ndim(p) else p for p in pivots]
+        conditions[2:] = market_conditions(
+            close[2:], close[1:-1], trend[:-2], trend[2:], trend2[2:], hist[2:], hist[1:-1],
+            di_diff[2:], adx_diff[2:], bw_diff[2:], *levels
+        )
+
+    st = state if state is not None else SignalState()
+    provider = _GradientRow(gradients) if gradients is not None else None
+    masks = np.zeros(n, dtype=np.int64)
+    performance = np.empty(n)
+    closes = close.tolist()
+    conditions = conditions.tolist()
+    if n:
+        performance[0] = st.cumulative_score
+    for i in range(1, n):
+        if provider is not None:
+            provider.row = i
+        masks[i] = step(st, closes[i], closes[i - 1], conditions[i], i + 1, provider)[0]
+        performance[i] = st.cumulative_score
+
+    signals = {col: (masks >> bit & 1).astype(np.int8) for bit, col in enumerate(SIGNAL_COLUMNS)}
+    return signals, performance, st
@@ -0,0 +1,221 @@
+# tick_recorder.py
+
+import datetime
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+
+JST = ZoneInfo("Asia/Tokyo")
+
+MAGIC = b"TSTICK01"
+# ヘッダー: マジック(8) + レコード長(4) + 予備(4) + レコード数(8) + 予備(40)
+HEADER = struct.Struct("<8sII Q 40x")
+COUNT_OFFSET = 16
+# レコード: 受信時刻ns, 取引所時刻ns, 現在値, 売買高, 最良買気配, 最良売気配
+RECORD = struct.Struct("<qqdddd")
+TICK_DTYPE = np.dtype([
+    ("ts_ns", "<i8"),
+    ("exch_ts_ns", "<i8"),
+    ("price", "<f8"),
+    ("volume", "<f8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+])
+assert TICK_DTYPE.itemsize == RECORD.size
+
+DEFAULT_CHUNK_RECORDS = 65536
+NAN = float("nan")
+
+
+def tick_path(directory, symbol, exchange=1, day=None):
+    """
+    銘柄・日付ごとのティックファイルのパスを返します。
+
+    Parameters:
+        directory (str | Path): 保存先ディレクトリ
+        symbol (str): 銘柄コード
+        exchange (int): 市場コード
+        day (datetime.date): 日付（省略時は当日）
+
+    Returns:
+        Path: ティックファイルのパス
+    """
+    if day is None:
+        day = datetime.datetime.now(JST).date()
+    return Path(directory) / f"{symbol}@{int(exchange)}_{day:%Y%m%d}.ticks"
+
+
+def parse_exchange_time(value):
+    """CurrentPriceTime (ISO 8601) をエポックnsに変換します。取得できない場合は 0 を返します。"""
+    if not value:
+        return 0
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=JST)
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+
+
+def _float(value):
+    return NAN if value is None else float(value)
+
+
+def read_ticks(path):
+    """
+    ティックファイルを読み込みます。
+
+    Parameters:
+        path (str | Path): ティックファイルのパス
+
+    Returns:
+        numpy.ndarray: TICK_DTYPE の構造化配列（記録済みのレコードのみ）
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        magic, record_size, _, count = HEADER.unpack(header)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"ティックファイルではありません: {path}")
+        data = f.read(count * RECORD.size)
+    return np.frombuffer(data, dtype=TICK_DTYPE, count=len(data) // RECORD.size).copy()
+
+
+class TickRecorder:
+    """
+    板情報のスナップショットを固定長レコードとしてメモリマップドファイルに追記します。
+
+    ファイルは銘柄・日付ごとに作成し、チャンク単位で事前に拡張しておくため、
+    通常の書き込みは mmap への pack_into とヘッダーのレコード数更新のみでシステムコールを伴いません。
+    レコード数はレコード本体の書き込み後に更新するため、途中で停止しても記録済みの範囲は読み出せます。
+    """
+
+    def __init__(self, directory, symbol, exchange=1, chunk_records=DEFAULT_CHUNK_RECORDS,
+                 clock=time.time_ns):
+        """
+        Parameters:
+            directory (str | Path): 保存先ディレクトリ
+            symbol (str): 銘柄コード
+            exchange (int): 市場コード
+            chunk_records (int): ファイルを拡張する単位（レコード数）
+            clock (callable): 受信時刻（エポックns）を返す関数
+        """
+        self.directory = Path(directory)
+        self.symbol = symbol
+        self.exchange = int(exchange)
+        self.chunk_records = int(chunk_records)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._file = None
+        self._mm = None
+        self._capacity = 0
+        self._day_end_ns = 0
+        self._last_exch_value = None
+        self._last_exch_ns = 0
+        self.path = None
+        self.count = 0
+
+    def record(self, board, ts_ns=None):
+        """
+        板情報を1レコードとして記録します。
+
+        kabusapi の BidPrice は最良売気配、AskPrice は最良買気配を表すため、
+        bid には AskPrice、ask には BidPrice を格納します。
+
+        Parameters:
+            board (dict): /board またはPUSH配信の板情報
+            ts_ns (int): 受信時刻（省略時は clock の値）
+        """
+        if ts_ns is None:
+            ts_ns = self._clock()
+        exch_value = board.get("CurrentPriceTime")
+        if exch_value != self._last_exch_value:
+            self._last_exch_value = exch_value
+            self._last_exch_ns = parse_exchange_time(exch_value)
+        with self._lock:
+            if ts_ns >= self._day_end_ns or self._mm is None:
+                self._open_for(ts_ns)
+            if self.count >= self._capacity:
+                self._grow()
+            RECORD.pack_into(
+                self._mm,
+                HEADER.size + self.count * RECORD.size,
+                ts_ns,
+                self._last_exch_ns,
+                _float(board.get("CurrentPrice")),
+                _float(board.get("TradingVolume")),
+                _float(board.get("AskPrice")),
+                _float(board.get("BidPrice")),
+            )
+            self.count += 1
+            struct.pack_into("<Q", self._mm, COUNT_OFFSET, self.count)
+
+    def _open_for(self, ts_ns):
+        """ts_ns の日付のファイルを開きます（日付が変わった場合は前日のファイルを閉じます）。"""
+        self._close()
+        day = datetime.datetime.fromtimestamp(ts_ns / 1e9, JST).date()
+        next_day = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(), JST)
+        self._day_end_ns = int(next_day.timestamp()) * 1_000_000_000
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = tick_path(self.directory, self.symbol, self.exchange, day)
+        exists = self.path.exists() and self.path.stat().st_size >= HEADER.size
+        self._file = open(self.path, "r+b" if exists else "w+b")
+        if exists:
+            magic, record_size, _, count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                self._file.close()
+                self._file = None
+                raise ValueError(f"ティックファイルではありません: {self.path}")
+            self.count = count
+            size = os.fstat(self._file.fileno()).st_size
+            self._capacity = (size - HEADER.size) // RECORD.size
+        else:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size, 0, 0))
+            self._file.flush()
+            self.count = 0
+            self._capacity = 0
+        if self._capacity <= self.count:
+            self._resize(self.count + self.chunk_records)
+        else:
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _grow(self):
+        self._resize(self._capacity + self.chunk_records)
+
+    def _resize(self, capacity):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.truncate(HEADER.size + capacity * RECORD.size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._capacity = capacity
+
+    def flush(self):
+        """記録済みのレコードをディスクへ書き出します。"""
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            # 事前拡張した未使用領域を切り詰める
+            self._file.truncate(HEADER.size + self.count * RECORD.size)
+            self._file.close()
+            self._file = None
+        self._capacity = 0
+
+    def close(self):
+        with self._lock:
+            self._close()
+            self._day_end_ns = 0
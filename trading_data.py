@@ -2,19 +2,25 @@
 
 from initializations import Initializations
 from order_executor import API_BASE_URL
+from kabus_transport import transport
+from board_cache import board_cache
+from rate_limiter import TRADING
+from indicators import IndicatorEngine, INDICATOR_COLUMNS
+from reference_data import ReferenceDataCache
+from spline_kernel import SplineKernel
+from signal_engine import (
+    SIGNAL_COLUMNS, SPECIAL_EXIT_S, BUY_EXIT, SELL_EXIT, SignalState, market_conditions, signal_columns, step
+)
 import requests
 import json
 import pandas as pd
 import numpy as np
 import datetime
-import holidays
 import time
 from scipy.interpolate import UnivariateSpline
 import logging
 import urllib.request
 import pprint
-import yfinance as yf
-from zoneinfo import ZoneInfo
 try:
     from IPython.display import clear_output, display
 except Exception:
@@ -24,9 +30,26 @@ except Exception:
         return None
 
 class TradingData:
-    def __init__(self, init: Initializations, token):
+    def __init__(self, init: Initializations, token, push_feed=None):
         self.init = init
         self.init.token = token
+        # PUSH配信（BoardPushFeed）。None または未接続の場合は /board をポーリング
+        self.push_feed = push_feed
+        self.push_timeout = 1.0
+        # 共有ボードキャッシュで許容する鮮度（秒）。ポーリング間隔より短くして自身は常に最新値を取得する
+        self.board_ttl = 0.0
+        # 受信した板情報を記録する TickRecorder（None の場合は記録しない）
+        self.tick_recorder = None
+        # 行のタイムスタンプに使う時刻関数。リプレイ時はティックの時刻に差し替える
+        self.clock = datetime.datetime.now
+        # 前営業日の (高値, 安値, 終値)。設定されている場合は yfinance を使わずにピボットを計算する
+        self.pivot_hlc = None
+        # 前営業日の参照データ（ReferenceDataCache）。None の場合は初回のピボット計算時に作成する
+        self.reference_data = None
+        # テクニカル指標を足ごとに差分更新するエンジン。None の場合は init.df 全体を pandas で再計算する
+        self.indicator_engine = IndicatorEngine()
+        # 4系列の平滑化スプラインをまとめて計算するカーネル。None の場合は系列・窓ごとに UnivariateSpline を使う
+        self.spline_kernel = SplineKernel()
 
         # ロギングの設定
         self.logger = self.init.logger
@@ -344,57 +367,98 @@ class TradingData:
 
 
     # 価格の取得
+    @property
+    def push_active(self):
+        """PUSH配信から価格を受信している場合は True"""
+        return self.push_feed is not None and self.push_feed.connected
+
     def fetch_current_price(self):
         """
-        最新の価格をAPIから取得し、pricesリストに追加します。
+        最新の価格を取得し、pricesリストに追加します。
+        PUSH配信が接続中であれば次の板情報の到着を待ち、
+        そうでなければ /board をポーリングします。
         previous_price と current_price を更新します。
         """
-        board_url = f"{self.init.api_base_url}/board/{self.init.symbol}@{self.init.exchange}"
-        headers = {'X-API-KEY': self.init.token}
-        try:
-            response = requests.get(board_url, headers=headers)
-            if response.status_code == 200:
-                board = response.json()
-                fetched_price = board.get('CurrentPrice')
-                if fetched_price is not None:
-                    self.init.prices.append(fetched_price)
-                    # self.logger.info(f"取得した価格: {fetched_price}")
-                    
-                    # previous_price と current_price を更新
-                    if self.init.current_price is not None:
-                        self.init.previous_price = self.init.current_price
-                    self.init.current_price = fetched_price
-                    return fetched_price
-                else:
-                    self.logger.warning("取得した価格が None です。")
-                    return None
-            else:
-                self.logger.error(f"ボードデータの取得に失敗しました: {response.status_code} {response.text}")
+        if self.push_active:
+            board = self.push_feed.get(timeout=self.push_timeout)
+            if board is None:
+                # 価格変化がない間は None を返し、呼び出し側のループに制御を戻す
                 return None
+            return self._apply_board(board)
+        return self.poll_current_price()
+
+    def poll_current_price(self):
+        """
+        /board をポーリングして最新の価格を取得し、pricesリストに追加します。
+        取得結果は共有ボードキャッシュを経由し、UI など他の読み手と共有されます。
+        """
+        try:
+            return self._apply_board(self.fetch_board())
+        except requests.exceptions.HTTPError as e:
+            self.logger.error(f"ボードデータの取得に失敗しました: {e}")
+            return None
         except requests.exceptions.RequestException as e:
             self.logger.error(f"価格取得中に例外が発生しました: {e}")
             return None
 
+    def fetch_board(self):
+        """
+        共有ボードキャッシュ経由で /board の板情報を取得します。
+
+        Returns:
+            dict: 板情報
+        """
+        board_url = f"{self.init.api_base_url}/board/{self.init.symbol}@{self.init.exchange}"
+
+        def load():
+            response = transport.request('GET', board_url, token=self.init.token, priority=TRADING)
+            response.raise_for_status()
+            return response.json()
+
+        return board_cache.get(self.init.symbol, self.init.exchange, load, max_age=self.board_ttl)
+
+    def _apply_board(self, board):
+        """
+        板情報から現在値を取り出し、pricesリストと previous_price / current_price を更新します。
+        """
+        if self.tick_recorder is not None:
+            self._record_tick(board)
+        fetched_price = board.get('CurrentPrice')
+        if fetched_price is not None:
+            self.init.prices.append(fetched_price)
+            # self.logger.info(f"取得した価格: {fetched_price}")
+
+            # previous_price と current_price を更新
+            if self.init.current_price is not None:
+                self.init.previous_price = self.init.current_price
+            self.init.current_price = fetched_price
+            return fetched_price
+        else:
+            self.logger.warning("取得した価格が None です。")
+            return None
+
+    def _record_tick(self, board):
+        """
+        板情報をティックファイルに記録します。記録に失敗した場合は以降の記録を停止し、売買は継続します。
+        """
+        try:
+            self.tick_recorder.record(board)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"ティックの記録に失敗したため記録を停止します: {e}")
+            self.tick_recorder = None
 
     # 価格リストを作成し、OHLCデータを生成
     def create_ohlc(self):
         if len(self.init.prices) == 4:
-            current_time = datetime.datetime.now()
-            ohlc = {
-                'open': self.init.prices[0],
-                'high': max(self.init.prices),
-                'low': min(self.init.prices),
-                'close': self.init.prices[-1]
-            }
-            new_data = pd.DataFrame([ohlc], index=[current_time])
-            # if not new_data.empty and not new_data.isna().all().all():
-            #     self.init.df = pd.concat([self.init.df, new_data], ignore_index=False)
-            # else:
-            #     self.logger.warning("新しいOHLCデータが空または全てNAのため、連結をスキップしました。")
-            # self.init.prices = []  # 価格リストをリセット
-
-            # ヘルパー関数を使用して安全に連結
-            self.init.df = self.safe_concat(self.init.df, new_data)
+            current_time = self.clock()
+            # 事前確保した OhlcStore に追記する（DataFrame の連結によるコピーは行わない）
+            self.init.df.append(
+                current_time,
+                self.init.prices[0],
+                max(self.init.prices),
+                min(self.init.prices),
+                self.init.prices[-1],
+            )
             self.init.prices = []  # 価格リストをリセット
 
     def calculate_buy_and_hold_equity(self):
@@ -404,7 +468,7 @@ class TradingData:
         """
         if self.init.first_quantity == 0:
             # 初期設定
-            self.init.first_price = self.init.df['close'].iloc[0]  # 初期価格を設定
+            self.init.first_price = self.init.df.column('close')[0]  # 初期価格を設定
             self.init.first_quantity = (self.init.first_balance // (self.init.first_price * 100)) * 100  # 100株単位で購入
             self.init.initial_stock_value = self.init.first_quantity * self.init.first_price
             self.init.first_cash = self.init.first_balance - self.init.initial_stock_value
@@ -417,21 +481,12 @@ class TradingData:
                 self.init.interpolated_data.loc[self.init.interpolated_data.index[-1], 'buy_and_hold_equity'] = self.init.buy_and_hold_equity
             else:
                 # interpolated_data が空の場合、新しい行を追加
-                current_time = datetime.datetime.now()
-                new_row = {'buy_and_hold_equity': self.init.buy_and_hold_equity}
-                new_row_df = pd.DataFrame([new_row], index=[current_time])
-                # new_row_dfが空でない場合のみ結合
-                # if not new_row_df.empty:
-                #     self.init.interpolated_data = pd.concat([self.init.interpolated_data, new_row_df])
-                new_row_df = new_row_df.dropna(axis=1, how='all')  # 全てNAの列を削除
-                self.init.interpolated_data = pd.concat([self.init.interpolated_data, new_row_df], ignore_index=False)
-
-                # ヘルパー関数を使用して安全に連結
-                # self.init.interpolated_data = self.safe_concat(self.init.interpolated_data, new_row_df)
+                current_time = self.clock()
+                self.init.interpolated_data.append(current_time, {'buy_and_hold_equity': self.init.buy_and_hold_equity})
         else:
             # Buy and Hold Equityを更新
             if not self.init.interpolated_data.empty:
-                latest_close = self.init.interpolated_data['close'].iloc[-1]
+                latest_close = self.init.interpolated_data.last('close')
                 self.init.buy_and_hold_equity = self.init.first_quantity * latest_close + self.init.first_cash
 
                 # 最新の行にエクイティカーブを追加
@@ -450,153 +505,99 @@ class TradingData:
         # メソッド呼び出しの確認
         self.init.logger.debug("calculate_pivot_points メソッドが呼び出されました。")
 
-        # 日本のタイムゾーンを設定
-        jst = ZoneInfo('Asia/Tokyo')
-        # 日本時間で現在の日付を取得
-        today = datetime.datetime.now(jst).date()
-        # 日本の祝日を取得
-        jp_holidays = holidays.Japan()
-        # 土日祝日を除外して直近の営業日を取得
-        while today.weekday() >= 5 or today in jp_holidays:  # 土日または祝日の場合
-            today -= datetime.timedelta(days=1)
+        if self.pivot_hlc is not None:
+            row_label = self.clock().strftime('%Y-%m-%d')
+            return self._apply_pivot_data(self._pivot_series(self.pivot_hlc), pivot_columns, row_label)
 
-        self.init.logger.debug(f"Today after adjusting for weekends/holidays: {today}")
+        # 前営業日の四本値は1日1回だけ取得し、以降はメモリ（再起動時はディスク）から参照する
+        if self.reference_data is None:
+            self.reference_data = ReferenceDataCache(self.init.symbol, exchange=self.init.exchange, logger=self.init.logger)
+        levels = self.reference_data.get()
+        if levels is None:
+            P = R1 = R2 = R3 = S1 = S2 = S3 = 0
+            return P, R1, R2, R3, S1, S2, S3
 
-        # 前営業日を取得
-        yesterday = today - datetime.timedelta(days=1)
-        while yesterday.weekday() >= 5 or yesterday in jp_holidays:
-            yesterday -= datetime.timedelta(days=1)
-        yesterday_str = yesterday.strftime('%Y-%m-%d')
-        today_str = today.strftime('%Y-%m-%d')
+        self.init.logger.debug(f"前営業日 ({levels['session']}) のデータを使用します。取得元: {levels['source']}")
+        data = pd.Series({'High': levels['high'], 'Low': levels['low'], 'Close': levels['close']})
+        return self._apply_pivot_data(data, pivot_columns, levels['session'])
 
-        self.init.logger.debug(f"Yesterday (trading day): {yesterday_str}")
-        self.init.logger.debug(f"Today (trading day): {today_str}")
 
-        # ティッカーシンボルを動的に生成
-        symbol = str(self.init.symbol)
-        ticker = f"{symbol}.T"
+    @staticmethod
+    def _pivot_series(hlc):
+        high, low, close = hlc
+        return pd.Series({'High': high, 'Low': low, 'Close': close})
 
-        self.init.logger.debug(f"Ticker: {ticker}")
+    def _apply_pivot_data(self, data, pivot_columns, row_label):
+        """
+        前営業日の高値・安値・終値からピボットポイントを計算し、interpolated_data の最新行に設定します。
 
+        Parameters:
+            data (Series): 'High', 'Low', 'Close' を含む前営業日のデータ
+            pivot_columns (list): ピボットポイントのカラム名
+            row_label (str): interpolated_data が空の場合に追加する行のインデックス
+
+        Returns:
+            tuple: P, R1, R2, R3, S1, S2, S3
+        """
         # カラムが存在しない場合、NaNで追加（念のため）
         for col in pivot_columns:
             if col not in self.init.interpolated_data.columns:
                 self.init.interpolated_data[col] = pd.NA
                 self.init.logger.debug(f"カラム '{col}' を interpolated_data に追加しました。")
 
-        try:
-            data = yf.download(
-                ticker,
-                start=yesterday_str,
-                end=(yesterday + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
-                interval='1d',
-                progress=False
-            )
-
-        except Exception as e:
-            self.init.logger.error(f"Error downloading data for {ticker} from {yesterday_str}: {e}")
-            P = R1 = R2 = R3 = S1 = S2 = S3 = 0
-            return P, R1, R2, R3, S1, S2, S3
-
-        if not data.empty:
-            if isinstance(data, pd.DataFrame):
-                data = data.iloc[0]  # 最初の行を選択
-                self.init.logger.debug("DataFrame からデータを選択")
-            elif isinstance(data, pd.Series):
-                self.init.logger.debug("Series からデータを選択")
-            else:
-                self.init.logger.error("取得したデータの形式が不正です。")
-                P = R1 = R2 = R3 = S1 = S2 = S3 = 0
-                return P, R1, R2, R3, S1, S2, S3
-        else:
-            # データが取得できなかった場合、過去5営業日のデータを試みる
-            self.init.logger.warning(f"Data for {yesterday_str} is empty. Trying to download data for the past 5 days.")
-            data = None
-            for i in range(1, 6):
-                attempt_date = yesterday - datetime.timedelta(days=i)
-                if attempt_date.weekday() >= 5 or attempt_date in jp_holidays:
-                    self.init.logger.debug(f"Skipping non-trading day: {attempt_date}")
-                    continue
-                attempt_date_str = attempt_date.strftime('%Y-%m-%d')
-                try:
-                    temp_data = yf.download(
-                        ticker,
-                        start=attempt_date_str,
-                        end=(attempt_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
-                        interval='1d',
-                        progress=False
-                    )
-                    if not temp_data.empty:
-                        data = temp_data.iloc[0]
-                        self.init.logger.debug(f"取得したデータの日付: {attempt_date_str}")
-                        break
-                    else:
-                        self.init.logger.debug(f"No data for {attempt_date_str}")
-                except Exception as e:
-                    self.init.logger.error(f"Error downloading data for {ticker} from {attempt_date_str}: {e}")
-            else:
-                self.init.logger.error(f"Yahoo Financeから{ticker}のデータを取得できませんでした。")
-                P = R1 = R2 = R3 = S1 = S2 = S3 = 0
-                return P, R1, R2, R3, S1, S2, S3
-
-        if data is not None:
-            # 高値、安値、終値を取得
-            high = data['High']
-            low = data['Low']
-            close = data['Close']
-            self.init.logger.debug(f"High: {high}, Low: {low}, Close: {close}")
-
-            # ピボットポイントの計算
-            P = (high + low + close) / 3
-            R1 = 2 * P - low
-            S1 = 2 * P - high
-            R2 = P + (high - low)
-            S2 = P - (high - low)
-            R3 = high + 2 * (P - low)
-            S3 = low - 2 * (high - P)
-
-            self.init.logger.debug(f"P: {P}, R1: {R1}, R2: {R2}, R3: {R3}, S1: {S1}, S2: {S2}, S3: {S3}")
-
-            # ピボットポイントをinterpolated_dataに追加または更新
-            new_row = {
-                'P': P,
-                'R1': R1,
-                'R2': R2,
-                'R3': R3,
-                'S1': S1,
-                'S2': S2,
-                'S3': S3
-            }
+        # 高値、安値、終値を取得
+        high = data['High']
+        low = data['Low']
+        close = data['Close']
+        self.init.logger.debug(f"High: {high}, Low: {low}, Close: {close}")
+
+        # ピボットポイントの計算
+        P = (high + low + close) / 3
+        R1 = 2 * P - low
+        S1 = 2 * P - high
+        R2 = P + (high - low)
+        S2 = P - (high - low)
+        R3 = high + 2 * (P - low)
+        S3 = low - 2 * (high - P)
+
+        self.init.logger.debug(f"P: {P}, R1: {R1}, R2: {R2}, R3: {R3}, S1: {S1}, S2: {S2}, S3: {S3}")
+
+        # ピボットポイントをinterpolated_dataに追加または更新
+        new_row = {
+            'P': P,
+            'R1': R1,
+            'R2': R2,
+            'R3': R3,
+            'S1': S1,
+            'S2': S2,
+            'S3': S3
+        }
 
-            # データフレームのカラムを確認
-            self.init.logger.debug(f"interpolated_data のカラム: {self.init.interpolated_data.columns.tolist()}")
+        # データフレームのカラムを確認
+        self.init.logger.debug(f"interpolated_data のカラム: {self.init.interpolated_data.columns.tolist()}")
 
-            if not self.init.interpolated_data.empty:
-                # 最新行のインデックスを取得
-                latest_index = self.init.interpolated_data.index[-1]
-                self.init.logger.debug(f"最新行のインデックス: {latest_index}")
-
-                # 最新行のピボットポイントカラムを更新
-                try:
-                    self.init.interpolated_data.loc[latest_index, pivot_columns] = list(new_row.values())
-                    self.init.logger.debug(f"最新行 ({latest_index}) のピボットポイントを更新しました。")
-                except Exception as e:
-                    self.init.logger.error(f"最新行の更新中にエラーが発生しました: {e}")
-            else:
-                # データフレームが空の場合、新しい行を追加
-                try:
-                    # 新しい行に日付をインデックスとして設定
-                    self.init.interpolated_data.loc[yesterday_str] = list(new_row.values())
-                    self.init.logger.debug(f"新しいピボットポイントをinterpolated_dataに追加しました。日付: {yesterday_str}")
-                except Exception as e:
-                    self.init.logger.error(f"新しい行の追加中にエラーが発生しました: {e}")
-
-            # 行数の確認
-            self.init.logger.debug(f"interpolated_dataの現在の行数: {len(self.init.interpolated_data)}")
+        if not self.init.interpolated_data.empty:
+            # 最新行のインデックスを取得
+            latest_index = self.init.interpolated_data.index[-1]
+            self.init.logger.debug(f"最新行のインデックス: {latest_index}")
 
+            # 最新行のピボットポイントカラムを更新
+            try:
+                self.init.interpolated_data.loc[latest_index, pivot_columns] = list(new_row.values())
+                self.init.logger.debug(f"最新行 ({latest_index}) のピボットポイントを更新しました。")
+            except Exception as e:
+                self.init.logger.error(f"最新行の更新中にエラーが発生しました: {e}")
         else:
-            # データが取得できなかった場合、すでに0を返している
-            pass
+            # データフレームが空の場合、新しい行を追加
+            try:
+                # 新しい行に日付をインデックスとして設定
+                self.init.interpolated_data.loc[row_label] = list(new_row.values())
+                self.init.logger.debug(f"新しいピボットポイントをinterpolated_dataに追加しました。日付: {row_label}")
+            except Exception as e:
+                self.init.logger.error(f"新しい行の追加中にエラーが発生しました: {e}")
+
+        # 行数の確認
+        self.init.logger.debug(f"interpolated_dataの現在の行数: {len(self.init.interpolated_data)}")
 
         return P, R1, R2, R3, S1, S2, S3
 
@@ -667,11 +668,39 @@ class TradingData:
         DMI・ADX
         のテクニカル指標を計算し、データフレームに追加します。
         """
-        self.calculate_bollinger_bands()
-        self.calculate_macd()
-        self.calculate_dmi_adx()
+        if self.indicator_engine is not None:
+            self.update_indicators()
+        else:
+            self.calculate_bollinger_bands()
+            self.calculate_macd()
+            self.calculate_dmi_adx()
         self.calculate_pivot_points()
 
+    def update_indicators(self):
+        """
+        init.df に追加された足だけを IndicatorEngine に渡してテクニカル指標を更新し、
+        値が変わった行のみを init.df に書き込みます。
+        結果は calculate_bollinger_bands / calculate_macd / calculate_dmi_adx と一致します。
+        """
+        store = self.init.df
+        if store.total < self.indicator_engine.count:
+            # init.df が作り直された場合は最初から計算し直す
+            self.indicator_engine = IndicatorEngine()
+        engine = self.indicator_engine
+
+        # リングバッファで破棄された足の数だけ、エンジンの行番号とストアの位置がずれる
+        offset = store.dropped
+        if engine.count < store.total:
+            highs = store.column('high')
+            lows = store.column('low')
+            closes = store.column('close')
+            for i in range(engine.count - offset, len(store)):
+                engine.update(highs[i], lows[i], closes[i])
+
+        start = max(engine.take_changes(), offset)
+        for col in INDICATOR_COLUMNS:
+            store.column(col, create=True)[start - offset:] = engine.column(col)[start:]
+
     # 最新のテクニカル指標データを更新
     def update_latest_9_data(self, band_width, hist, di_difference, adx_difference):
         """
@@ -695,29 +724,42 @@ class TradingData:
             # 各データについて区間中間点の補間データを計算し、データフレームに追加
             interpolated_row = {}
             derivative_row = {}
-            for key in ['band_width', 'hist', 'di_difference', 'adx_difference']:
-                spline_1 = self.apply_spline(self.init.latest_data_1[key], self.init.s_parameters[key])
-                spline_2 = self.apply_spline(self.init.latest_data_2[key], self.init.s_parameters[key])
-
-                interpolation, derivative = self.calculate_interpolated_data(
-                    spline_1[5],
-                    spline_2[6],
-                    np.gradient(spline_1)[5],
-                    np.gradient(spline_2)[6],
-                    np.gradient(np.gradient(spline_1))[5],
-                    np.gradient(np.gradient(spline_2))[6]
+            keys = ['band_width', 'hist', 'di_difference', 'adx_difference']
+            if self.spline_kernel is not None:
+                # 4系列 × 2窓の平滑化をまとめて1回で計算する（行 i が latest_data_1、行 i + 4 が latest_data_2）
+                values, diff1, diff2 = self.spline_kernel.smooth(
+                    [self.init.latest_data_1[key] for key in keys] + [self.init.latest_data_2[key] for key in keys],
+                    [self.init.s_parameters[key] for key in keys] * 2
                 )
+            for i, key in enumerate(keys):
+                if self.spline_kernel is not None:
+                    j = i + len(keys)
+                    interpolation, derivative = self.calculate_interpolated_data(
+                        values[i, 5], values[j, 6], diff1[i, 5], diff1[j, 6], diff2[i, 5], diff2[j, 6]
+                    )
+                else:
+                    spline_1 = self.apply_spline(self.init.latest_data_1[key], self.init.s_parameters[key])
+                    spline_2 = self.apply_spline(self.init.latest_data_2[key], self.init.s_parameters[key])
+
+                    interpolation, derivative = self.calculate_interpolated_data(
+                        spline_1[5],
+                        spline_2[6],
+                        np.gradient(spline_1)[5],
+                        np.gradient(spline_2)[6],
+                        np.gradient(np.gradient(spline_1))[5],
+                        np.gradient(np.gradient(spline_2))[6]
+                    )
                 interpolated_row[key] = interpolation * 10000  # 補間データを10000倍にする
                 derivative_row[key + '_diff'] = derivative
 
             # インデックスを時刻に変更（マイクロ秒を含む）
-            current_time = datetime.datetime.now()
+            current_time = self.clock()
 
             # 新しい行を作成して追加
             new_row = {
-                'close': self.init.df['close'].iloc[-1],
-                'upper_band': self.init.df['upper_band'].iloc[-1],
-                'lower_band': self.init.df['lower_band'].iloc[-1],
+                'close': self.init.df.last('close'),
+                'upper_band': self.init.df.last('upper_band'),
+                'lower_band': self.init.df.last('lower_band'),
                 'R1': self.init.R1,
                 'R2': self.init.R2,
                 'R3': self.init.R3,
@@ -747,19 +789,17 @@ class TradingData:
                 if signal_col not in new_row:
                     new_row[signal_col] = 0
 
-            # 新しい行のDataFrameを作成
-            new_row_df = pd.DataFrame([new_row], index=[current_time])
-            # new_row_dfが空でないかつ全てNAでない場合のみ結合
-            if not new_row_df.empty and not new_row_df.isna().all().all():
-                self.init.interpolated_data = pd.concat([self.init.interpolated_data, new_row_df], ignore_index=False)
+            # 全てNAでない場合のみ列指向ストアに追記（DataFrame の連結は行わない）
+            if not all(pd.isna(value) for value in new_row.values()):
+                self.init.interpolated_data.append(current_time, new_row)
             else:
                 self.logger.warning("新しい行データが空または全てNAのため、連結をスキップしました。")
 
             # trend_check_data の更新
             if len(self.init.interpolated_data) >= 3:
-                close_values = self.init.interpolated_data['close'].iloc[-3:]
+                close_values = self.init.interpolated_data.column('close')[-3:]
                 x = np.arange(len(close_values))
-                y = close_values.values
+                y = close_values
 
                 # 次数2の多項式近似を適用
                 coeffs = np.polyfit(x, y, 2)
@@ -832,15 +872,21 @@ class TradingData:
         return interpolation, derivative_value
 
     # スペシャルシグナルのexitの場合のみに使用
-    def check_spline_condition(self, key, s_param, comparison):
+    def _spline_gradient(self, key, s_param):
+        """latest_data[key] の直近9点を平滑化したスプラインの最新の傾き（9点未満の場合は None）"""
         if len(self.init.latest_data[key]) < 9:
-            return False
+            return None
         x = np.arange(9)
         y = self.init.latest_data[key][-9:]
         spline = UnivariateSpline(x, y, s=s_param)
         spline_values = spline(x)
         gradient_values = np.gradient(spline_values)
-        gradient = gradient_values[-1]
+        return gradient_values[-1]
+
+    def check_spline_condition(self, key, s_param, comparison):
+        gradient = self._spline_gradient(key, s_param)
+        if gradient is None:
+            return False
         if comparison == '<= 0':
             return gradient <= 0
         elif comparison == '>= 0':
@@ -848,10 +894,38 @@ class TradingData:
         else:
             return False
 
+    def special_exit_gradients(self):
+        """
+        特別ポジション解消の判定に使う4系列のスプラインの最新の傾きを返します。
+
+        Returns:
+            dict: SPECIAL_EXIT_S の各キーについて傾き（データ不足の場合は None）
+        """
+        keys = [key for key in SPECIAL_EXIT_S if len(self.init.latest_data[key]) >= 9]
+        gradients = dict.fromkeys(SPECIAL_EXIT_S)
+        if self.spline_kernel is None:
+            for key in keys:
+                gradients[key] = self._spline_gradient(key, SPECIAL_EXIT_S[key])
+        elif keys:
+            _, diff1, _ = self.spline_kernel.smooth(
+                [self.init.latest_data[key][-9:] for key in keys], [SPECIAL_EXIT_S[key] for key in keys]
+            )
+            for key, gradient in zip(keys, diff1[:, -1]):
+                gradients[key] = gradient
+        return gradients
+
+    @staticmethod
+    def _tail(data, column, count):
+        if hasattr(data, 'column'):
+            return data.column(column)[-count:]
+        return data[column].to_numpy()[-count:]
+
     # 売買シグナルの生成
     def generate_signals(self, data, R1, R2, R3, S1, S2, S3):
         """
         売買シグナルを生成します。
+        最新行の特徴量と init のシグナル状態を signal_engine.step に渡し、
+        結果のシグナル列と performance を最新行にまとめて書き込みます。
 
         Parameters:
             data (DataFrame): シグナルを生成するデータフレーム
@@ -861,1035 +935,47 @@ class TradingData:
         if len(data) < 2:
             return  # データが不足している場合は終了
 
-        
-
-        # 前回の値を保持
-        self.init.special_sell_active_prev = self.init.special_sell_active
-        self.init.special_buy_active_prev = self.init.special_buy_active
-        self.init.signal_position_prev = self.init.signal_position
-        self.init.signal_position_prev2 = self.init.signal_position_prev
-        self.init.signal_position1_prev = self.init.signal_position1
-        self.init.signal_position1_prev2 = self.init.signal_position1_prev
-        self.init.signal_position2_prev = self.init.signal_position2
-        self.init.signal_position2_prev2 = self.init.signal_position2_prev
-        self.init.entry_price_prev = self.init.entry_price
-        self.init.buy_entry_price_prev = self.init.buy_entry_price
-        self.init.sell_entry_price_prev = self.init.sell_entry_price
-        self.init.cumulative_score_prev = self.init.cumulative_score
-        self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-        self.init.special_entry_price_prev = self.init.special_entry_price
-        self.init.original_entry_price_prev = self.init.original_entry_price
-
-        current_index = data.index[-1]
-        current_close = data.at[current_index, 'close']
-        
-        current_index_prev = data.index[-2]
-        current_close_prev = data.at[current_index_prev, 'close']
-        
-        # print("current_close")
-        # print(current_close)
-
-        # time.sleep(10)
-
-        # メソッド開始時に前回の状態を保存
-        prev_special_sell = self.init.prev_special_sell_active
-        prev_special_buy = self.init.prev_special_buy_active
-
         # シグナル列の存在確認と初期化
-        signal_columns = [
-            'buy_signals', 'sell_signals',
-            'buy_exit_signals', 'sell_exit_signals',
-            'buy_exit_signals_lc', 'sell_exit_signals_lc',
-            'emergency_buy_exit_signals', 'emergency_sell_exit_signals',
-            'hedge_buy_signals', 'hedge_buy_exit_signals',
-            'hedge_sell_signals', 'hedge_sell_exit_signals',
-            'special_buy_signals', 'special_buy_exit_signals',
-            'special_sell_signals', 'special_sell_exit_signals'
-        ]
-
-        for col in signal_columns:
-            if col not in data.columns:
+        columns = data.columns
+        for col in SIGNAL_COLUMNS:
+            if col not in columns:
                 data[col] = 0
-                
-        # ヘッジ売りポジション生成シグナルの生成
-        if self.init.position_entry_index is not None and \
-            len(self.init.interpolated_data) - self.init.position_entry_index >= 30 and \
-                self.init.signal_position2 is None:
-            if self.init.signal_position == 'buy' and not self.init.special_sell_active:
-                if np.log(current_close / self.init.buy_entry_price) < -0.00158:
-                    
-                    data.at[current_index, 'hedge_sell_signals'] = 1
-                    self.init.signal_position2 = 'hedge_sell'
-                    
-        # ヘッジ買いポジション生成シグナルの生成
-        if self.init.position_entry_index is not None and \
-            len(self.init.interpolated_data) - self.init.position_entry_index >= 30 and \
-                self.init.signal_position2 is None:
-            if self.init.signal_position == 'sell' and not self.init.special_buy_active:
-                if np.log(current_close / self.init.sell_entry_price) > 0.00158:
-                   
-                    data.at[current_index, 'hedge_buy_signals'] = 1
-                    self.init.signal_position2 = 'hedge_buy'
-
-        # 緊急買いポジション決済シグナルと特別売りポジション生成シグナルの生成
-        if self.init.position_entry_index is not None and \
-            len(self.init.interpolated_data) - self.init.position_entry_index >= 60:
-            if self.init.signal_position == 'buy' and not self.init.special_sell_active:
-                if np.log(current_close / self.init.buy_entry_price) < -0.005:
-                    
-                    data.at[current_index, 'emergency_buy_exit_signals'] = 1
-                    self.init.special_sell_active = True
-                    self.init.signal_position = None
-                    self.init.special_entry_price = current_close
-                    self.init.original_entry_price = self.init.buy_entry_price
-                    # self.init.buy_entry_price = None
-                    
-                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                    self.init.signal_position2 = None
-                    
-                    data.at[current_index, 'special_sell_signals'] = 1
-                    self.init.signal_position = 'special_sell'
-                    self.init.sell_entry_price = current_close
-
-        # 緊急売りポジション決済シグナルと特別買いポジション生成シグナルの生成
-        if self.init.position_entry_index is not None and \
-            len(self.init.interpolated_data) - self.init.position_entry_index >= 60:
-            if self.init.signal_position == 'sell' and not self.init.special_buy_active:
-                if np.log(current_close / self.init.sell_entry_price) > 0.005:
-                    
-                    data.at[current_index, 'emergency_sell_exit_signals'] = 1
-                    self.init.special_buy_active = True
-                    self.init.signal_position = None
-                    self.init.special_entry_price = current_close
-                    self.init.original_entry_price = self.init.sell_entry_price
-                    # self.init.sell_entry_price = None
-                    
-                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                    self.init.signal_position2 = None
-                    
-                    data.at[current_index, 'special_buy_signals'] = 1
-                    self.init.signal_position = 'special_buy'
-                    self.init.buy_entry_price = current_close
-
-        # 特別売りポジション解消シグナルと通常の買いポジション生成シグナルの生成
-        if self.init.special_sell_active and prev_special_sell:
-            condition1 = self.check_spline_condition('band_width', 0.000185, '<= 0')
-            condition2 = self.check_spline_condition('adx_difference', 1.85, '<= 0')
-            condition3 = self.check_spline_condition('hist', 0.00000185, '>= 0')
-            condition4 = self.check_spline_condition('di_difference', 18.5, '>= 0')
-            K = -0.005 + np.log(self.init.original_entry_price / self.init.special_entry_price)
-            if self.init.signal_position == 'special_sell' and \
-                ((condition1 and condition2 and condition3 and condition4) or \
-                np.log(current_close / self.init.sell_entry_price) < K):
-                   
-                data.at[current_index, 'special_sell_exit_signals'] = 1
-                self.init.special_sell_active = False
-                self.init.signal_position = None
-                # self.init.special_entry_price = None
-                # self.init.original_entry_price = None
-                # self.init.sell_entry_price = None
-
-                # イグジットシグナル直後の値を保持 20241103
-                self.init.special_sell_active_prev = self.init.special_sell_active
-                self.init.signal_position_prev = self.init.signal_position
-
-                # 失効した場合、ポジション = None         
-                data.at[current_index, 'buy_signals'] = 1
-                self.init.buy_entry_price = current_close
-                self.init.signal_position = 'buy'
-                self.init.position_entry_index = len(self.init.interpolated_data)
-
-        # 特別買いポジション解消シグナルと通常の売りポジション生成シグナルの生成
-        if self.init.special_buy_active and prev_special_buy:
-            condition1 = self.check_spline_condition('band_width', 0.000185, '<= 0')
-            condition2 = self.check_spline_condition('adx_difference', 1.85, '<= 0')
-            condition3 = self.check_spline_condition('hist', 0.00000185, '<= 0')
-            condition4 = self.check_spline_condition('di_difference', 18.5, '<= 0')
-            K = 0.005 + np.log(self.init.original_entry_price / self.init.special_entry_price)
-            if self.init.signal_position == 'special_buy' and \
-                ((condition1 and condition2 and condition3 and condition4) or \
-                np.log(current_close / self.init.buy_entry_price) > K):
-                
-                data.at[current_index, 'special_buy_exit_signals'] = 1
-                self.init.special_buy_active = False
-                self.init.signal_position = None
-                # self.init.special_entry_price = None
-                # self.init.original_entry_price = None
-                # self.init.buy_entry_price = None
-
-                # イグジットシグナル直後の値を保持
-                self.init.special_buy_active_prev = self.init.special_buy_active
-                self.init.signal_position_prev = self.init.signal_position
-
-                data.at[current_index, 'sell_signals'] = 1
-                self.init.sell_entry_price = current_close
-                self.init.signal_position = 'sell'
-                self.init.position_entry_index = len(self.init.interpolated_data)
-
-        # 通常のシグナルの生成
-        if not self.init.special_sell_active and not self.init.special_buy_active and \
-            not prev_special_sell and not prev_special_buy:
-            if 'trend_check_data' not in data.columns or 'trend_check_data2' not in data.columns:
-                return  # 必要な列がない場合は終了
-
-            if len(data) < 3:
-                return  # データが不足している場合は終了
-
-            # インデックスリストを取得
-            index_list = data.index.tolist()
-
-            # 最新のデータを取得
-            i = len(data) - 1  # 最新の位置インデックス
-            current_index = index_list[i]
-
-            # 前回と前々回のデータを取得
-            if i - 2 >= 0:
-                trend_check_data_prev = data.at[index_list[i - 2], 'trend_check_data']
-            else:
-                trend_check_data_prev = data.at[index_list[0], 'trend_check_data']
-
-            # トレンドの方向を判定
-            trend_positive1 = trend_check_data_prev >= 0 and \
-                            data.at[current_index, 'trend_check_data'] > 0 and \
-                            data.at[current_index, 'trend_check_data2'] > 0
-
-            trend_positive2 = (
-                (trend_check_data_prev < 0 and
-                data.at[current_index, 'trend_check_data'] <= 0 and
-                data.at[current_index, 'trend_check_data2'] > 0) or
-                (trend_check_data_prev <= 0 and
-                data.at[current_index, 'trend_check_data'] >= 0 and
-                data.at[current_index, 'trend_check_data2'] > 0)
-            )
-
-            trend_negative1 = trend_check_data_prev <= 0 and \
-                            data.at[current_index, 'trend_check_data'] < 0 and \
-                            data.at[current_index, 'trend_check_data2'] < 0
-
-            trend_negative2 = (
-                (trend_check_data_prev > 0 and
-                data.at[current_index, 'trend_check_data'] >= 0 and
-                data.at[current_index, 'trend_check_data2'] < 0) or
-                (trend_check_data_prev >= 0 and
-                data.at[current_index, 'trend_check_data'] <= 0 and
-                data.at[current_index, 'trend_check_data2'] < 0)
-            )
-
-            # ヒストグラムのクロスオーバーを判定
-            if i - 1 >= 0:
-                hist_diff_prev = data.at[index_list[i - 1], 'hist_diff']
-            else:
-                hist_diff_prev = data.at[index_list[0], 'hist_diff']
 
-            hist_crossover_up1 = data.at[current_index, 'hist_diff'] > 0 and \
-                                data.at[current_index, 'di_difference_diff'] > 0
-            hist_crossover_up2 = hist_diff_prev < 0 and \
-                                data.at[current_index, 'hist_diff'] >= 0
-
-            hist_crossover_down1 = data.at[current_index, 'hist_diff'] < 0 and \
-                                data.at[current_index, 'di_difference_diff'] < 0
-            hist_crossover_down2 = hist_diff_prev > 0 and \
-                                data.at[current_index, 'hist_diff'] <= 0
-
-            # 価格がピボットポイントをクロスしたかを判定
-            if i - 1 >= 0:
-                close_prev = data.at[index_list[i - 1], 'close']
-            else:
-                close_prev = data.at[index_list[0], 'close']
-
-            close_crosses_above1 = (
-                (close_prev < R1 and current_close > R1) or
-                (close_prev < R2 and current_close > R2) or
-                (close_prev < R3 and current_close > R3)
-            )
-
-            close_crosses_above2 = (
-                (close_prev < S1 and current_close > S1) or
-                (close_prev < S2 and current_close > S2) or
-                (close_prev < S3 and current_close > S3)
-            )
-
-            close_crosses_below1 = (
-                (close_prev > S1 and current_close < S1) or
-                (close_prev > S2 and current_close < S2) or
-                (close_prev > S3 and current_close < S3)
-            )
-
-            close_crosses_below2 = (
-                (close_prev > R1 and current_close < R1) or
-                (close_prev > R2 and current_close < R2) or
-                (close_prev > R3 and current_close < R3)
+        current_index = data.index[-1]
+        current_close_prev, current_close = self._tail(data, 'close', 2)
+
+        # ポジションに依存しない条件
+        conditions = 0
+        if 'trend_check_data' in columns and 'trend_check_data2' in columns and len(data) >= 3:
+            # NumPy のスカラーより Python の float の比較の方が速い
+            trend_prev, _, trend = self._tail(data, 'trend_check_data', 3).tolist()
+            hist_diff_prev, hist_diff = self._tail(data, 'hist_diff', 2).tolist()
+            conditions = market_conditions(
+                float(current_close), float(current_close_prev), trend_prev, trend,
+                float(self._tail(data, 'trend_check_data2', 1)[0]), hist_diff, hist_diff_prev,
+                float(self._tail(data, 'di_difference_diff', 1)[0]),
+                float(self._tail(data, 'adx_difference_diff', 1)[0]),
+                float(self._tail(data, 'band_width_diff', 1)[0]),
+                R1, R2, R3, S1, S2, S3
             )
 
-            # position = self.init.signal_position
-
-            # シグナルの生成
-            if self.init.signal_position == 'sell' and self.init.signal_position1 == 'buy' and \
-                current_close != self.init.entry_price:
-                    data.at[current_index, 'sell_exit_signals_lc'], data.at[current_index, 'buy_exit_signals_lc'] = 1, 1
-                    self.init.signal_position, self.init.signal_position1 = None, None
-                    self.init.sell_entry_price, self.init.buy_entry_price = current_close
-            
-            if self.init.signal_position == 'buy' and self.init.signal_position1 == 'sell' and \
-                current_close != self.init.entry_price:
-                    data.at[current_index, 'buy_exit_signals_lc'], data.at[current_index, 'sell_exit_signals_lc'] = 1, 1
-                    self.init.signal_position, self.init.signal_position1 = None, None
-                    self.init.sell_entry_price, self.init.buy_entry_price = current_close, current_close
-            
-            if self.init.signal_position == 'sell' and self.init.signal_position1 is None and \
-                current_close == self.init.entry_price and current_close > current_close_prev:
-                    data.at[current_index, 'buy_signals'] = 1
-                    self.init.signal_position1 = 'buy'
-                    self.init.entry_price = current_close
-                    self.init.position_entry_index = len(self.init.interpolated_data)
-            
-            if self.init.signal_position == 'buy' and self.init.signal_position1 is None and \
-                current_close == self.init.entry_price and current_close < current_close_prev:
-                    data.at[current_index, 'sell_signals'] = 1
-                    self.init.signal_position1 = 'sell'
-                    self.init.entry_price = current_close
-                    self.init.position_entry_index = len(self.init.interpolated_data)
-                    
-            if self.init.signal_position is None and self.init.signal_position1 == 'sell' and \
-                current_close == self.init.entry_price and current_close > current_close_prev:
-                    data.at[current_index, 'buy_signals'] = 1
-                    self.init.signal_position = 'buy'
-                    self.init.entry_price = current_close
-                    self.init.position_entry_index = len(self.init.interpolated_data)
-            
-            if self.init.signal_position is None and self.init.signal_position1 == 'buy' and \
-                current_close == self.init.entry_price and current_close < current_close_prev:
-                    data.at[current_index, 'sell_signals'] = 1
-                    self.init.signal_position = 'sell'
-                    self.init.entry_price = current_close
-                    self.init.position_entry_index = len(self.init.interpolated_data)
-            
-            # if self.init.signal_position == 'sell' and self.init.signal_position1 == 'buy':
-            #     if current_close > self.init.entry_price:
-            #         data.at[current_index, 'sell_exit_signals_lc'] = 1
-            #         self.init.signal_position = None
-            #         self.init.buy_entry_price = current_close
-            #     if current_close < self.init.entry_price:
-            #         data.at[current_index, 'buy_exit_signals_lc'] = 1
-            #         self.init.signal_position1 = None
-            #         self.init.sell_entry_price = current_close
-                    
-            # if self.init.signal_position == 'buy' and self.init.signal_position1 == 'sell':
-            #     if current_close < self.init.entry_price:
-            #         data.at[current_index, 'buy_exit_signals_lc'] = 1
-            #         self.init.signal_position = None
-            #         self.init.sell_entry_price = current_close
-            #     if current_close > self.init.entry_price:
-            #         data.at[current_index, 'sell_exit_signals_lc'] = 1
-            #         self.init.signal_position1 = None
-            #         self.init.buy_entry_price = current_close
-                    
-            
-            if not self.init.swap_signals:
-                if data.at[current_index, 'adx_difference_diff'] > 0 or data.at[current_index, 'band_width_diff'] > 0:
-                    if (trend_positive1 or trend_positive2) and \
-                    (hist_crossover_up1 or hist_crossover_up2 or close_crosses_above1 or close_crosses_above2):
-                        if self.init.signal_position == 'sell' and self.init.signal_position1 is None:
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':  
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                    
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 =='sell':
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':  
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                    
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'sell_exit_signals'] != 1 and data.at[current_index, 'buy_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                    elif (trend_negative1 or trend_negative2) and \
-                    (hist_crossover_down1 or hist_crossover_down2 or close_crosses_below1 or close_crosses_below2):
-                        if self.init.signal_position == 'buy' and self.init.signal_position1 is None:
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'buy':
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'buy_exit_signals'] != 1 and data.at[current_index, 'sell_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                elif data.at[current_index, 'adx_difference_diff'] < 0 and data.at[current_index, 'band_width_diff'] < 0:
-                    if (trend_positive1 or trend_positive2) and \
-                    (hist_crossover_up1 or hist_crossover_up2 or close_crosses_below1 or close_crosses_below2):
-                        if self.init.signal_position == 'sell' and self.init.signal_position1 is None:
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy': 
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'sell':
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy': 
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'sell_exit_signals'] != 1 and data.at[current_index, 'buy_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                    elif (trend_negative1 or trend_negative2) and \
-                            (hist_crossover_down1 or hist_crossover_down2 or close_crosses_above1 or close_crosses_above2):
-                        if self.init.signal_position == 'buy' and self.init.signal_position1 is None:
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'buy':
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'buy_exit_signals'] != 1 and data.at[current_index, 'sell_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-            else:
-                # シグナルの条件を入れ替える
-                if data.at[current_index, 'adx_difference_diff'] > 0 or data.at[current_index, 'band_width_diff'] > 0:
-                    if (trend_positive1 or trend_positive2) and \
-                    (hist_crossover_up1 or hist_crossover_up2 or close_crosses_above1 or close_crosses_above2):
-                        if self.init.signal_position == 'buy' and self.init.signal_position1 is None:
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'buy':
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'buy_exit_signals'] != 1 and data.at[current_index, 'sell_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                    elif (trend_negative1 or trend_negative2) and \
-                            (hist_crossover_down1 or hist_crossover_down2 or close_crosses_below1 or close_crosses_below2):
-                        if self.init.signal_position == 'sell'  and self.init.signal_position1 is None:
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'sell':
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                
-                                data.loc[current_index, ['sell_signals', 'buy_signals']] = [1, 1]
-
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'sell_exit_signals'] != 1 and data.at[current_index, 'buy_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                elif data.at[current_index, 'adx_difference_diff'] < 0 and data.at[current_index, 'band_width_diff'] < 0:
-                    if (trend_positive1 or trend_positive2) and \
-                    (hist_crossover_up1 or hist_crossover_up2 or close_crosses_below1 or close_crosses_below2):
-                        if self.init.signal_position == 'buy' and self.init.signal_position1 is None:
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position1 == 'buy':
-                            # Buy Exit Signal Logic with price condition
-                            if current_close > self.init.buy_entry_price:
-                                data.at[current_index, 'buy_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.buy_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_sell':
-                                    data.at[current_index, 'hedge_sell_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.buy_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close < self.init.buy_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'buy_exit_signals'] != 1 and data.at[current_index, 'sell_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-                    elif (trend_negative1 or trend_negative2) and \
-                        (hist_crossover_down1 or hist_crossover_down2 or close_crosses_above1 or close_crosses_above2):
-                        if self.init.signal_position == 'sell' and self.init.signal_position is None:
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position_prev, self.init.signal_position1_prev = self.init.signal_position, self.init.signal_position1
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-                                
-                        if self.init.signal_position is None and self.init.signal_position == 'sell':
-                            # Sell Exit Signal Logic with price condition
-                            if current_close < self.init.sell_entry_price:
-                                data.at[current_index, 'sell_exit_signals'] = 1
-                                self.init.signal_position1 = None
-                                # self.init.sell_entry_price = None
-
-                                # イグジットシグナル直後の値を保持
-                                self.init.signal_position1_prev, self.init.signal_position_prev = self.init.signal_position1, self.init.signal_position
-                                self.init.cumulative_score_prev = self.init.cumulative_score
-                                self.init.previous_cumulative_score_prev = self.init.previous_cumulative_score
-                                
-                                if self.init.signal_position2 == 'hedge_buy':
-                                    data.at[current_index, 'hedge_buy_exit_signals'] = 1
-                                    self.init.signal_position2 = None
-                                    self.init.signal_position2_prev = self.init.signal_position2
-
-                                self.init.entry_price = current_close
-                                data.at[current_index, 'sell_signals'], data.at[current_index, 'buy_signals'] = 1, 1
-                                self.init.signal_position, self.init.signal_position1 = 'sell', 'buy'
-                                self.init.position_entry_index = len(self.init.interpolated_data)
-
-                                # Score calculation
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score += 1
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close == self.init.sell_entry_price:
-                                # Score 0, do not swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                            elif current_close > self.init.sell_entry_price:
-                                # Score -1, swap signals
-                                self.init.previous_cumulative_score = self.init.cumulative_score
-                                self.init.cumulative_score -= 1
-                                self.init.swap_signals = not self.init.swap_signals
-                                data.at[current_index, 'performance'] = self.init.cumulative_score
-
-                        if self.init.signal_position is None and self.init.signal_position1 is None and \
-                            data.at[current_index, 'sell_exit_signals'] != 1 and data.at[current_index, 'buy_exit_signals'] != 1:
-                            self.init.entry_price = current_close
-                            data.at[current_index, 'buy_signals'], data.at[current_index, 'sell_signals'] = 1, 1
-                            self.init.signal_position, self.init.signal_position1 = 'buy', 'sell'
-                            self.init.position_entry_index = len(self.init.interpolated_data)
-
-        # メソッドの最後で現在の状態を前回の状態として更新
-        self.init.prev_special_sell_active = self.init.special_sell_active
-        self.init.prev_special_buy_active = self.init.special_buy_active
\ No newline at end of file
+        # 最新行にすでに立っている決済シグナル（新規の両建ての判定に使う）
+        preset = 0
+        if self._tail(data, 'sell_exit_signals', 1)[0] == 1:
+            preset |= SELL_EXIT
+        if self._tail(data, 'buy_exit_signals', 1)[0] == 1:
+            preset |= BUY_EXIT
+
+        state = SignalState.from_object(self.init)
+        mask, performance = step(
+            state, current_close, current_close_prev, conditions,
+            len(self.init.interpolated_data), self.special_exit_gradients, preset
+        )
+        state.apply_to(self.init)
+
+        # 最新行への書き込み（足ごとに1回）
+        flagged = signal_columns(mask)
+        if flagged:
+            data.loc[current_index, flagged] = [1] * len(flagged)
+        if performance is not None:
+            data.at[current_index, 'performance'] = performance
\ No newline at end of file